@@ -4,6 +4,7 @@ import os
 import json
 import time
 import math
+from collections import OrderedDict
 
 
 # 2. 游戏初始化配置
@@ -470,37 +471,97 @@ def draw_mist(screen):
 
 
 
+MASTERSPARK_HALF_WIDTH = GRID_SIZE * 3 // 2  # Master Spark 半宽（像素），激光宽3格
+
+
+def ray_exit_distance(start, direction, width, height):
+    """
+    射线从 start 沿单位向量 direction 前进，返回离开 [0, width) × [0, height) 矩形时经过的距离。
+    """
+    distance = float("inf")
+    for s, d, limit in ((start[0], direction[0], width), (start[1], direction[1], height)):
+        if d > 0:
+            distance = min(distance, (limit - s) / d)
+        elif d < 0:
+            distance = min(distance, -s / d)
+    return max(distance, 0.0)
+
+
+def clip_polygon_rows(polygon, y0, y1):
+    """Sutherland–Hodgman：把凸多边形裁剪到水平带 y0 <= y <= y1 内"""
+    for keep, cross in ((lambda p: p[1] >= y0, y0), (lambda p: p[1] <= y1, y1)):
+        clipped = []
+        for i, p in enumerate(polygon):
+            q = polygon[i - 1]
+            if keep(p) != keep(q):
+                t = (cross - q[1]) / (p[1] - q[1])
+                clipped.append((q[0] + (p[0] - q[0]) * t, cross))
+            if keep(p):
+                clipped.append(p)
+        polygon = clipped
+        if not polygon:
+            break
+    return polygon
+
+
+def rasterize_beam(start, direction, half_width, length):
+    """
+    把起点 start、方向 direction、半宽 half_width、长度 length 的矩形光束精确栅格化。
+    逐行把光束多边形裁剪到该行的像素带内，裁剪结果的横向范围即为该行被覆盖的连续格子；
+    half_width 为 0 时退化为一条线段，即射线穿过的全部格子（包括逐像素采样会漏掉的擦角格子）。
+    返回 (格子集合, 位掩码)，第 y * MAP_WIDTH + x 位对应格子 (x, y)，只包含地图内的格子。
+    """
+    perp = (-direction[1], direction[0])
+    end = (start[0] + direction[0] * length, start[1] + direction[1] * length)
+    polygon = [
+        (start[0] + perp[0] * half_width, start[1] + perp[1] * half_width),
+        (end[0] + perp[0] * half_width, end[1] + perp[1] * half_width),
+        (end[0] - perp[0] * half_width, end[1] - perp[1] * half_width),
+        (start[0] - perp[0] * half_width, start[1] - perp[1] * half_width),
+    ]
+    # 消除浮点误差（例如正上方向的 cos 约为 1e-16），使正好落在格线上的边按格线处理
+    polygon = [(round(x, 9), round(y, 9)) for x, y in polygon]
+    cells = set()
+    mask = 0
+    for gy in range(MAP_HEIGHT):
+        y0, y1 = gy * GRID_SIZE, (gy + 1) * GRID_SIZE
+        clipped = clip_polygon_rows(polygon, y0, y1)
+        if not clipped:
+            continue
+        # 格子按 [x0, x1) × [y0, y1) 计算（与 int(x) // GRID_SIZE 相同），只碰到下边界的部分属于下一行
+        if min(p[1] for p in clipped) >= y1:
+            continue
+        xs = [p[0] for p in clipped]
+        lo = max(math.floor(min(xs) / GRID_SIZE), 0)
+        hi = min(math.floor(max(xs) / GRID_SIZE), MAP_WIDTH - 1)
+        if lo > hi:
+            continue
+        mask |= ((1 << (hi + 1)) - (1 << lo)) << (gy * MAP_WIDTH)
+        cells.update((gx, gy) for gx in range(lo, hi + 1))
+    return cells, mask
+
+
+def masterspark_cells(start, direction):
+    """
+    Master Spark 光束（宽192像素，即3格）覆盖的格子：从 start 出发、到中心线离开地图为止的矩形。
+    施放与瞄准预览共用此函数。返回 (格子集合, 位掩码)。
+    """
+    length = ray_exit_distance(start, direction, MAP_WIDTH * GRID_SIZE, MAP_HEIGHT * GRID_SIZE)
+    return rasterize_beam(start, direction, MASTERSPARK_HALF_WIDTH, length)
+
+
 def compute_masterspark_reveal():
     """
-    根据当前 Master Spark 状态，采样激光经过的所有网格。
-    激光宽度为192像素（3格），因此在采样时对中央射线左右分别采样（例如以-96到+96范围内，每隔32像素采样）。
+    根据当前 Master Spark 状态，计算激光经过的所有网格。
+    施放时栅格化一次并缓存在 masterspark 上。
     返回一个包含所有经过网格坐标的集合。
     """
-    reveal = set()
     if "masterspark" not in game_state:
-        return reveal
+        return set()
     ms = game_state["masterspark"]
-    start = ms["start_pos"]
-    direction = ms["direction"]
-    # 计算垂直方向单位向量
-    perp = (-direction[1], direction[0])
-    # 设定采样步长
-    step_d = 5  # 每5像素采样一次
-    # 设定横向采样范围：从 -96 到 +96（192像素宽）
-    offsets = [i for i in range(-96, 97, 32)]
-    # 最大采样距离：直到超出地图边界
-    max_distance = 10000
-    for d in range(0, max_distance, step_d):
-        pos_main = (start[0] + direction[0]*d, start[1] + direction[1]*d)
-        # 若超出地图范围则退出采样
-        if pos_main[0] < 0 or pos_main[0] >= MAP_WIDTH*GRID_SIZE or pos_main[1] < 0 or pos_main[1] >= MAP_HEIGHT*GRID_SIZE:
-            break
-        for offset in offsets:
-            pos = (pos_main[0] + perp[0]*offset, pos_main[1] + perp[1]*offset)
-            cell = (int(pos[0]) // GRID_SIZE, int(pos[1]) // GRID_SIZE)
-            reveal.add(cell)
-    return reveal
-
+    if "cells" not in ms:
+        ms["cells"], ms["mask"] = masterspark_cells(ms["start_pos"], ms["direction"])
+    return ms["cells"]
 
 
 
@@ -650,21 +711,11 @@ def draw_non_directional_laser_effect(screen):
 
 def get_cells_along_ray(start, direction):
     """
-    从 start 出发，沿 direction 每像素采样直到超出地图边界，
+    从 start 出发沿 direction 直到超出地图边界，
     返回射线经过的所有网格坐标（元组形式）。
     """
-    cells = set()
-    x, y = start
-    max_distance = 10000  # 足够大的数值
-    for d in range(0, max_distance):
-        pos_x = x + direction[0] * d
-        pos_y = y + direction[1] * d
-        # 若超出地图范围则退出
-        if pos_x < 0 or pos_x >= MAP_WIDTH * GRID_SIZE or pos_y < 0 or pos_y >= MAP_HEIGHT * GRID_SIZE:
-            break
-        cell = (int(pos_x) // GRID_SIZE, int(pos_y) // GRID_SIZE)
-        cells.add(cell)
-    return cells
+    length = ray_exit_distance(start, direction, MAP_WIDTH * GRID_SIZE, MAP_HEIGHT * GRID_SIZE)
+    return rasterize_beam(start, direction, 0, length)[0]
 
 def apply_masterspark_damage():
     import math
@@ -841,133 +892,158 @@ def draw_nondirectional_laser_indicator(screen):
 
 def draw_masterspark_indicator(screen):
     """
-    绘制 Master Spark 指示器：
-      - 从魔理沙中心出发，向鼠标方向延伸无限长的主射线
-      - 同时绘制两条平行射线，分别偏移+64像素和-64像素（垂直于射线）
-    采用预先放大4倍的采样图绘制（48×1→192×4），使用类笔刷的连续铺贴方式
+    绘制 Master Spark 指示器：从魔理沙中心向鼠标方向（按瞄准档位量化）延伸的3格宽光束，
+    图像与实际激光效果相同，由瞄准预览缓存提供，只在档位或魔理沙所在格变化时重新生成。
     """
-    import math
-    if game_state.get("selected_skill") != 4 or not game_state.get("aiming", False):
+    preview = aim_preview()
+    if preview is None or preview["kind"] != "masterspark":
         return
-    # 获取魔理沙中心
-    current_player = game_state["current_turn"]["active_player"]
-    marisa_pos = map_layout["start_positions"][CONTROLLED_INDEX]
-    marisa_center = (marisa_pos[0] * GRID_SIZE + GRID_SIZE // 2, marisa_pos[1] * GRID_SIZE + GRID_SIZE // 2)
-    # 计算从魔理沙中心到鼠标方向
-    mouse_pos = pygame.mouse.get_pos()
-    dx = mouse_pos[0] - marisa_center[0]
-    dy = mouse_pos[1] - marisa_center[1]
-    length = math.sqrt(dx*dx + dy*dy)
-    if length == 0:
-        return
-    direction = (dx/length, dy/length)
-    # 计算旋转角度（采样图默认正上）
-    angle = -math.degrees(math.atan2(direction[0], -direction[1]))
-    # 加载并放大采样图：原始48×1放大4倍得到192×4
-    sample_img = load_scaled_image("sample/skill/marisa/masterspark.png", (192, 4))
-    rotated_img = pygame.transform.rotate(sample_img, angle)
-    # 计算垂直方向单位向量
-    perp = (-direction[1], direction[0])
-    # 确定射线绘制长度（例如至窗口边界）
-    max_length = 10000
-    # 为保证连续性，每1像素步长绘制（可根据性能适当调整为2像素）
-    for d in range(0, max_length, 4):
-        pos_main = (marisa_center[0] + direction[0]*d, marisa_center[1] + direction[1]*d)
-        # 若超出窗口则结束
-        if pos_main[0] < 0 or pos_main[0] >= WINDOW_WIDTH or pos_main[1] < 0 or pos_main[1] >= WINDOW_HEIGHT:
-            break
-        # 绘制主射线
-        rect_main = rotated_img.get_rect(center=(int(pos_main[0]), int(pos_main[1])))
-        screen.blit(rotated_img, rect_main)
-        # 绘制上方平行射线（偏移+64像素）
-        pos_upper = (pos_main[0] + perp[0]*64, pos_main[1] + perp[1]*64)
-        rect_upper = rotated_img.get_rect(center=(int(pos_upper[0]), int(pos_upper[1])))
-        screen.blit(rotated_img, rect_upper)
-        # 绘制下方平行射线（偏移-64像素）
-        pos_lower = (pos_main[0] - perp[0]*64, pos_main[1] - perp[1]*64)
-        rect_lower = rotated_img.get_rect(center=(int(pos_lower[0]), int(pos_lower[1])))
-        screen.blit(rotated_img, rect_lower)
+    screen.blit(preview["surface"], preview["rect"])
 
+def build_masterspark_surface(start, direction):
     """
-    绘制 Master Spark 技能指示器：
-      - 主射线从魔理沙中心向鼠标方向延伸（无限长）
-      - 两条平行射线分别在主射线上下偏移 64 像素
-    使用采样图"sample/skill/marisa/masterspark.png"，原始尺寸48×1，放大四倍为192×4。
+    生成 Master Spark 光束图像：三条采样图（主射线与左右各偏移64像素）合成一条横截面，
+    沿射线方向拉伸到窗口边界后按方向旋转。返回 (图像, 绘制位置)。
     """
-    import math
-    if game_state.get("selected_skill") == 4 and game_state.get("aiming", False):
-        # 获取魔理沙中心
-        current_player = game_state["current_turn"]["active_player"]
-        marisa_pos = map_layout["start_positions"][CONTROLLED_INDEX]
-        marisa_center = (marisa_pos[0] * GRID_SIZE + GRID_SIZE // 2, marisa_pos[1] * GRID_SIZE + GRID_SIZE // 2)
-        # 计算从魔理沙中心到鼠标的方向
-        mouse_pos = pygame.mouse.get_pos()
-        dx = mouse_pos[0] - marisa_center[0]
-        dy = mouse_pos[1] - marisa_center[1]
-        length = math.sqrt(dx*dx + dy*dy)
-        if length == 0:
-            return
-        direction = (dx/length, dy/length)
-        # 计算旋转角度：采样图默认正上
-        angle = -math.degrees(math.atan2(direction[0], -direction[1]))
-        # 加载并放大采样图：原始48×1放大4倍为192×4
-        sample_img = load_scaled_image("sample/skill/marisa/masterspark.png", (192, 4))
-        rotated_img = pygame.transform.rotate(sample_img, angle)
-        # 计算垂直于射线的单位向量
-        perp = (-direction[1], direction[0])
-        
-        # 定义一个足够长的射线长度（如直到地图边界）
-        max_length = 10000
-        # 以较大的步长（例如步长取采样宽度 192）铺贴即可保证连续
-        step = 192  
-        for d in range(0, max_length, step):
-            # 主射线位置
-            pos_main = (marisa_center[0] + direction[0]*d, marisa_center[1] + direction[1]*d)
-            # 若超出屏幕则结束
-            if pos_main[0] < 0 or pos_main[0] >= WINDOW_WIDTH or pos_main[1] < 0 or pos_main[1] >= WINDOW_HEIGHT:
-                break
-            # 绘制主射线
-            rect_main = rotated_img.get_rect(center=(int(pos_main[0]), int(pos_main[1])))
-            screen.blit(rotated_img, rect_main)
-            # 绘制上方平行射线（偏移+64像素）
-            pos_upper = (pos_main[0] + perp[0]*64, pos_main[1] + perp[1]*64)
-            rect_upper = rotated_img.get_rect(center=(int(pos_upper[0]), int(pos_upper[1])))
-            screen.blit(rotated_img, rect_upper)
-            # 绘制下方平行射线（偏移-64像素）
-            pos_lower = (pos_main[0] - perp[0]*64, pos_main[1] - perp[1]*64)
-            rect_lower = rotated_img.get_rect(center=(int(pos_lower[0]), int(pos_lower[1])))
-            screen.blit(rotated_img, rect_lower)
+    sample_img = load_scaled_image("sample/skill/marisa/masterspark.png", (192, 4))
+    # 横截面：下方、主、上方三条射线依次偏移64像素，叠放顺序与逐像素铺贴时相同（主、上、下）
+    section = pygame.Surface((192 + 128, 4), pygame.SRCALPHA)
+    for offset in (64, 128, 0):
+        section.blit(sample_img, (offset, 0))
+    length = ray_exit_distance(start, direction, WINDOW_WIDTH, WINDOW_HEIGHT)
+    beam = pygame.transform.scale(section, (section.get_width(), max(int(length), 1)))
+    # 采样图默认正上
+    angle = -math.degrees(math.atan2(direction[0], -direction[1]))
+    rotated = pygame.transform.rotate(beam, angle)
+    center = (start[0] + direction[0] * length / 2, start[1] + direction[1] * length / 2)
+    return rotated, rotated.get_rect(center=(int(center[0]), int(center[1])))
+
 
 def draw_masterspark_effect(screen):
     """
     当 Master Spark 状态激活时，绘制实际激光效果。
-    绘制方式与指示器相似，但该效果在技能释放后持续显示2回合（每回合开始应用伤害）。
+    该效果在技能释放后持续显示2回合（每回合开始应用伤害）；光束图像在首次绘制时生成并缓存在 masterspark 上。
     """
-    import math
     if "masterspark" not in game_state:
         return
     ms = game_state["masterspark"]
-    direction = ms["direction"]
-    start = ms["start_pos"]
-    angle = -math.degrees(math.atan2(direction[0], -direction[1]))
-    sample_img = load_scaled_image("sample/skill/marisa/masterspark.png", (192, 4))
-    rotated_img = pygame.transform.rotate(sample_img, angle)
-    perp = (-direction[1], direction[0])
-    max_length = 10000
-    for d in range(0, max_length, 1):
-        pos_main = (start[0] + direction[0]*d, start[1] + direction[1]*d)
-        if pos_main[0] < 0 or pos_main[0] >= WINDOW_WIDTH or pos_main[1] < 0 or pos_main[1] >= WINDOW_HEIGHT:
-            break
-        rect_main = rotated_img.get_rect(center=(int(pos_main[0]), int(pos_main[1])))
-        screen.blit(rotated_img, rect_main)
-        
-        pos_upper = (pos_main[0] + perp[0]*64, pos_main[1] + perp[1]*64)
-        rect_upper = rotated_img.get_rect(center=(int(pos_upper[0]), int(pos_upper[1])))
-        screen.blit(rotated_img, rect_upper)
-        
-        pos_lower = (pos_main[0] - perp[0]*64, pos_main[1] - perp[1]*64)
-        rect_lower = rotated_img.get_rect(center=(int(pos_lower[0]), int(pos_lower[1])))
-        screen.blit(rotated_img, rect_lower)
+    if "surface" not in ms:
+        ms["surface"], ms["surface_rect"] = build_masterspark_surface(ms["start_pos"], ms["direction"])
+    screen.blit(ms["surface"], ms["surface_rect"])
+
+
+# 5.5 瞄准预览
+AIM_ANGLE_BUCKETS = 720      # 瞄准角度量化档数（每档0.5°），预览与施放都使用档位中心方向
+AIM_PREVIEW_CACHE_SIZE = 16  # 预览缓存条目上限（Master Spark 条目各含一张旋转后的光束图像）
+AIM_HIT_COLOR = (255, 64, 64)
+aim_preview_cache = OrderedDict()
+
+
+def quantize_aim(origin, target):
+    """
+    把从 origin 指向 target 的方向量化为 AIM_ANGLE_BUCKETS 档之一。
+    返回 (档位, 该档中心方向的单位向量)；两点重合时返回 (None, None)。
+    """
+    dx = target[0] - origin[0]
+    dy = target[1] - origin[1]
+    if dx == 0 and dy == 0:
+        return None, None
+    bucket = round(math.atan2(dy, dx) / (2 * math.pi) * AIM_ANGLE_BUCKETS) % AIM_ANGLE_BUCKETS
+    angle = bucket * 2 * math.pi / AIM_ANGLE_BUCKETS
+    return bucket, (math.cos(angle), math.sin(angle))
+
+
+def aim_kind():
+    """当前瞄准中的定向技能：'needle'、'amulet'、'masterspark'，其他情况返回 None"""
+    if not game_state.get("aiming", False):
+        return None
+    current_player = game_state["current_turn"]["active_player"]
+    character = game_state["players"][current_player]["character"]
+    skill = game_state.get("selected_skill")
+    if character == "marisa":
+        return "masterspark" if skill == 4 else None
+    return {1: "needle", 2: "amulet"}.get(skill)
+
+
+def trace_bullet(start, direction, speed, pierce):
+    """
+    按 update_bullets 的方式（每次前进 speed 像素后取所在格）预测子弹的飞行。
+    非穿透子弹停在第一个墙体或敌方所在格；穿透子弹一直飞出地图。
+    返回 (命中的格子列表, 终点像素位置)。
+    """
+    enemy_cell = map_layout["start_positions"][1]  # 与 update_bullets 的敌方判定一致
+    hits = []
+    x, y = start
+    while True:
+        x += direction[0] * speed
+        y += direction[1] * speed
+        cell = (int(x) // GRID_SIZE, int(y) // GRID_SIZE)
+        if not (0 <= cell[0] < MAP_WIDTH and 0 <= cell[1] < MAP_HEIGHT):
+            return hits, (x, y)
+        if cell in map_layout["walls"] or cell == enemy_cell:
+            if not hits or hits[-1] != cell:
+                hits.append(cell)
+            if not pierce:
+                return hits, (x, y)
+
+
+def build_aim_preview(kind, origin, direction):
+    """生成一个瞄准预览条目：命中格子、终点，以及 Master Spark 的光束图像"""
+    if kind == "masterspark":
+        cells, mask = masterspark_cells(origin, direction)
+        surface, rect = build_masterspark_surface(origin, direction)
+        return {"kind": kind, "direction": direction, "hits": cells, "mask": mask,
+                "surface": surface, "rect": rect}
+    hits, end = trace_bullet(origin, direction, GRID_SIZE // 8, pierce=(kind == "amulet"))
+    return {"kind": kind, "direction": direction, "hits": hits, "end": end}
+
+
+def aim_preview():
+    """
+    当前鼠标位置对应的瞄准预览；未在瞄准定向技能时返回 None。
+    按 (技能, 自机所在格, 角度档位) 缓存，子弹技能另以墙体布局与敌方位置为键，
+    鼠标在同一档内移动时直接复用，不重新生成图像、不重新追踪命中格子。
+    """
+    kind = aim_kind()
+    if kind is None:
+        return None
+    origin_cell = map_layout["start_positions"][CONTROLLED_INDEX]
+    origin = (origin_cell[0] * GRID_SIZE + GRID_SIZE // 2, origin_cell[1] * GRID_SIZE + GRID_SIZE // 2)
+    bucket, direction = quantize_aim(origin, pygame.mouse.get_pos())
+    if bucket is None:
+        return None
+    key = (kind, origin_cell, bucket)
+    if kind != "masterspark":
+        key += (tuple(map_layout["walls"]), map_layout["start_positions"][1])
+    preview = aim_preview_cache.get(key)
+    if preview is None:
+        preview = build_aim_preview(kind, origin, direction)
+        aim_preview_cache[key] = preview
+        if len(aim_preview_cache) > AIM_PREVIEW_CACHE_SIZE:
+            aim_preview_cache.popitem(last=False)
+    else:
+        aim_preview_cache.move_to_end(key)
+    preview["origin"] = origin
+    return preview
+
+
+def draw_aim_line(screen):
+    """
+    绘制瞄准线：子弹技能沿量化后的方向画到预测终点，并框出预测命中的格子；
+    其他瞄准状态仍从自机中心画到鼠标。
+    """
+    if not game_state.get("aiming", False):
+        return
+    preview = aim_preview()
+    if preview is None or preview["kind"] == "masterspark":
+        start_x = map_layout["start_positions"][CONTROLLED_INDEX][0] * GRID_SIZE + GRID_SIZE // 2
+        start_y = map_layout["start_positions"][CONTROLLED_INDEX][1] * GRID_SIZE + GRID_SIZE // 2
+        pygame.draw.line(screen, COLORS["RED"], (start_x, start_y), pygame.mouse.get_pos(), 2)
+        return
+    pygame.draw.line(screen, COLORS["RED"], preview["origin"], preview["end"], 2)
+    for cell in preview["hits"]:
+        rect = pygame.Rect(cell[0] * GRID_SIZE, cell[1] * GRID_SIZE, GRID_SIZE, GRID_SIZE)
+        pygame.draw.rect(screen, AIM_HIT_COLOR, rect, 2)
 
 
 
@@ -1226,15 +1302,10 @@ def handle_input(event):
             # 计算魔理沙中心位置
             marisa_pos = map_layout["start_positions"][CONTROLLED_INDEX]
             marisa_center = (marisa_pos[0] * GRID_SIZE + GRID_SIZE // 2, marisa_pos[1] * GRID_SIZE + GRID_SIZE // 2)
-            # 计算从魔理沙中心到鼠标位置的方向
-            mouse_pos = pygame.mouse.get_pos()
-            dx = mouse_pos[0] - marisa_center[0]
-            dy = mouse_pos[1] - marisa_center[1]
-            length = math.sqrt(dx*dx + dy*dy)
-            if length == 0:
+            # 计算从魔理沙中心到鼠标位置的方向（按瞄准档位量化，与指示器预览的光束一致）
+            _, direction = quantize_aim(marisa_center, pygame.mouse.get_pos())
+            if direction is None:
                 direction = (0, -1)  # 默认向上
-            else:
-                direction = (dx/length, dy/length)
             
             # 设置 Master Spark 状态，持续2回合
             game_state["masterspark"] = {
@@ -1246,7 +1317,14 @@ def handle_input(event):
             # 标记魔理沙在这2回合内无法移动
             game_state["masterspark_immobile"] = True
             
-            # 计算 Master Spark 经过的所有网格（宽3格）
+            # 计算 Master Spark 经过的所有网格（宽3格）；瞄准预览已算过同一方向时直接沿用
+            ms = game_state["masterspark"]
+            preview = aim_preview()
+            if preview is not None and preview["kind"] == "masterspark" and preview["direction"] == direction:
+                ms["cells"], ms["mask"] = preview["hits"], preview["mask"]
+                ms["surface"], ms["surface_rect"] = preview["surface"], preview["rect"]
+            else:
+                ms["surface"], ms["surface_rect"] = build_masterspark_surface(marisa_center, direction)
             game_state["masterspark_reveal"] = compute_masterspark_reveal()
             
             # 立即应用一次 Master Spark 伤害（当前回合）
@@ -1452,8 +1530,8 @@ def handle_input(event):
             dy_pixel = mouse_pixel[1] - start_pixel[1]
             if dx_pixel == 0 and dy_pixel == 0:
                 return
-            length = (dx_pixel**2 + dy_pixel**2)**0.5
-            direction = (dx_pixel/length, dy_pixel/length)
+            # 方向按瞄准档位量化，与瞄准线预测的命中格子一致
+            _, direction = quantize_aim(start_pixel, mouse_pixel)
             # 技能1：霰術「Persuasion Needle」
             if game_state["selected_skill"] == 1 and game_state["current_mana_input"] > 0:
                 if PLAYER_STATS[MANUAL_PLAYER]["mana"] >= game_state["current_mana_input"]:
@@ -1585,10 +1663,7 @@ def main():
         
         draw_mist(screen)
         
-        if game_state.get("aiming", False):
-            start_x = map_layout["start_positions"][CONTROLLED_INDEX][0] * GRID_SIZE + GRID_SIZE // 2
-            start_y = map_layout["start_positions"][CONTROLLED_INDEX][1] * GRID_SIZE + GRID_SIZE // 2
-            pygame.draw.line(screen, COLORS["RED"], (start_x, start_y), pygame.mouse.get_pos(), 2)
+        draw_aim_line(screen)
         draw_laser_effects(screen)
         draw_non_directional_laser_effect(screen)
         draw_bullets(screen)
@@ -0,0 +1,40 @@
+"""
+BeliefTracker 的行为测试：信念只使用己方看得到的信息。
+
+    python -m pytest -q tests
+"""
+import numpy as np
+
+from voyage.belief import BeliefTracker
+from voyage.engine import GameEngine, Move, Vision
+
+
+def make_map(size=(12, 9), spawns=((6, 4), (10, 4))):
+    return {
+        "size": list(size),
+        "spawn_points": {"blue": list(spawns[0]), "red": list(spawns[1])},
+        "terrain": {"grass": {"positions": []}, "walls": {"positions": [], "health": 5}},
+    }
+
+
+def test_opponent_vision_does_not_reveal_them():
+    engine = GameEngine(make_map())
+    tracker = BeliefTracker(engine, "P2")
+    engine.apply(Move((6, 3)))
+    engine.apply(Move((10, 5)))
+    before = tracker.sync(engine).probs.copy()
+    assert tracker.probability((6, 3)) < 0.5
+    # P1 的阴阳宝玉半径 5 覆盖了 P2，但 P2 自己的视野半径仍为 1，不能据此定位 P1
+    engine.apply(Vision(5))
+    tracker.sync(engine)
+    assert np.allclose(tracker.probs, before)
+    assert tracker.probability((6, 3)) < 0.5
+
+
+def test_own_vision_locates_opponent():
+    engine = GameEngine(make_map())
+    tracker = BeliefTracker(engine, "P1")
+    engine.apply(Move((6, 3)))
+    engine.apply(Move((10, 5)))
+    engine.apply(Vision(5))
+    assert tracker.sync(engine).probability((10, 5)) == 1.0
@@ -0,0 +1,222 @@
+"""
+GameEngine 的行为测试：激光与逐像素检测一致、子弹的逐步结算与立即结算一致、移动/建造/闪现的合法性、视野效果只属于施放者。
+
+    python -m pytest -q tests
+"""
+import math
+import os
+import random
+
+import pytest
+
+from voyage.ai import line_of_fire
+from voyage.engine import (
+    Amulet, Build, GameEngine, Laser, Move, Needle, NormalAttack, Scout, Teleport, Vision, load_map, opponent,
+)
+
+
+MAP_PATH = os.path.join(os.path.dirname(__file__), os.pardir, "map", "aokigahara.json")
+
+
+def make_map(size=(8, 6), spawns=((1, 2), (6, 2)), walls=(), health=5):
+    return {
+        "size": list(size),
+        "spawn_points": {"blue": list(spawns[0]), "red": list(spawns[1])},
+        "terrain": {
+            "grass": {"positions": []},
+            "walls": {"positions": [list(cell) for cell in walls], "health": health},
+        },
+    }
+
+
+def march_laser(engine, start_pos, direction, max_distance, enemy_cell):
+    """cast_laser 的参照实现：以 1 像素为步长逐点检测"""
+    for d in range(max_distance):
+        pos = (start_pos[0] + direction[0] * d, start_pos[1] + direction[1] * d)
+        cell = engine.pixel_cell(pos)
+        if not engine.in_bounds(cell):
+            return pos, None, None
+        if cell in engine.walls:
+            return pos, cell, None
+        if cell == enemy_cell:
+            return pos, None, cell
+    return (start_pos[0] + direction[0] * max_distance, start_pos[1] + direction[1] * max_distance), None, None
+
+
+def snapshot(engine):
+    return engine.stats, dict(engine.wall_health)
+
+
+# ---------------- 激光 ----------------
+def test_cast_laser_matches_pixel_march():
+    rng = random.Random(1969)
+    engine = GameEngine(load_map(MAP_PATH))
+    for _ in range(500):
+        start = (rng.uniform(0, engine.width * engine.grid_size - 1),
+                 rng.uniform(0, engine.height * engine.grid_size - 1))
+        angle = rng.choice([rng.uniform(0, 2 * math.pi), rng.randrange(8) * math.pi / 4])
+        direction = (math.cos(angle), math.sin(angle))
+        enemy_cell = (rng.randrange(engine.width), rng.randrange(engine.height))
+        distance = rng.choice([1000, rng.randrange(1, 400)])
+        assert (engine.cast_laser(start, direction, distance, enemy_cell)
+                == march_laser(engine, start, direction, distance, enemy_cell))
+
+
+# ---------------- 子弹 ----------------
+def fire_scenarios():
+    """(名称, 地图, 角色, 行动)：P1 的一次射击"""
+    return [
+        ("needle into wall", make_map(walls=[(4, 2)], health=2), "reimu", Needle((1.0, 0.0), 3)),
+        ("needle at enemy", make_map(), "reimu", Needle((1.0, 0.0), 2)),
+        ("amulet through walls", make_map(walls=[(3, 2), (4, 2)], health=1), "reimu", Amulet((1.0, 0.0))),
+        ("diagonal amulet", make_map(spawns=((1, 1), (4, 4)), walls=[(2, 2)]), "reimu", Amulet((0.6, 0.8))),
+        ("orbs at enemy", make_map(walls=[(3, 0)]), "reimu", NormalAttack((6, 2))),
+    ]
+
+
+@pytest.mark.parametrize("name, map_data, character, action", fire_scenarios())
+def test_settle_matches_resolve_projectiles(name, map_data, character, action):
+    engine = GameEngine(map_data, characters={"P1": character, "P2": "reimu"})
+    assert engine.apply(action, now=0.0)
+    settled = engine.copy()
+    settled.settle()
+    resolved = engine.copy()
+    resolved.resolve_projectiles()
+    assert not settled.has_projectiles() and not resolved.has_projectiles()
+    assert snapshot(settled) == snapshot(resolved)
+
+
+def test_needle_stops_at_first_wall():
+    engine = GameEngine(make_map(walls=[(3, 2), (4, 2)], health=5))
+    engine.apply(Needle((1.0, 0.0), 2), now=0.0)
+    engine.settle()
+    assert engine.wall_health[(3, 2)] == 3
+    assert engine.wall_health[(4, 2)] == 5
+    assert engine.stats["P2"]["hp"] == 20
+
+
+def test_amulet_damages_each_cell_once():
+    engine = GameEngine(make_map(walls=[(3, 2)], health=3))
+    engine.apply(Amulet((1.0, 0.0)), now=0.0)
+    mana = engine.stats["P1"]["mana"]
+    engine.settle()
+    assert engine.wall_health[(3, 2)] == 2
+    assert engine.stats["P2"]["hp"] == 19
+    assert engine.stats["P1"]["mana"] == mana + 1  # 命中敌方返还 1 灵力
+
+
+def test_bullet_in_flight_hits_wall_built_in_its_path():
+    engine = GameEngine(make_map())
+    engine.apply(Needle((1.0, 0.0), 1), now=0.0)
+    for _ in range(12):
+        engine.tick()
+    assert len(engine.projectiles) == 1  # 已出膛
+    # 轮到 P2：在子弹的弹道上建墙，飞行中的子弹应撞上新墙而不是穿过它命中 P2
+    assert engine.apply(Build((5, 2), 3), now=engine.state["sim_time"])
+    engine.settle()
+    assert engine.wall_health[(5, 2)] == 2
+    assert engine.stats["P2"]["hp"] == 20
+
+
+def test_bullet_in_flight_follows_moved_enemy():
+    engine = GameEngine(make_map(spawns=((1, 2), (6, 3))))
+    engine.apply(Needle((1.0, 0.0), 1), now=0.0)
+    for _ in range(12):
+        engine.tick()
+    assert len(engine.projectiles) == 1
+    # P2 走进弹道，飞行中的子弹应命中 P2
+    assert engine.apply(Move((6, 2)), now=engine.state["sim_time"])
+    engine.settle()
+    assert engine.stats["P2"]["hp"] == 19
+
+
+# ---------------- 行动合法性 ----------------
+@pytest.fixture
+def engine():
+    return GameEngine(make_map(spawns=((1, 2), (2, 2)), walls=[(1, 1)]))
+
+
+@pytest.mark.parametrize("target", [(1, 1), (2, 2), (3, 2), (-1, 2), (1, 4)])
+def test_illegal_move_is_rejected(engine, target):
+    assert engine.apply(Move(target)) == []
+    assert engine.unit_cell("P1") == (1, 2)
+    assert engine.active_player == "P1"
+
+
+def test_move_recovers_mana_only_in_straight_lines(engine):
+    mana = engine.stats["P1"]["mana"]
+    assert engine.apply(Move((1, 3)))
+    assert engine.unit_cell("P1") == (1, 3)
+    assert engine.stats["P1"]["mana"] == mana + 1
+    assert engine.active_player == "P2"
+    engine.apply(Move((3, 3)))
+    engine.apply(Move((0, 4)))
+    assert engine.stats["P1"]["mana"] == mana + 1
+
+
+@pytest.mark.parametrize("target", [(1, 1), (2, 2), (1, 2), (4, 2)])
+def test_illegal_build_ends_turn_without_wall(engine, target):
+    mana = engine.stats["P1"]["mana"]
+    events = engine.apply(Build(target, 2))
+    assert not any(event["type"] == "wall_built" for event in events)
+    assert engine.stats["P1"]["mana"] == mana
+    assert engine.active_player == "P2"
+
+
+def test_build_spends_mana(engine):
+    mana = engine.stats["P1"]["mana"]
+    events = engine.apply(Build((0, 3), 2))
+    assert {"type": "wall_built", "cell": (0, 3), "health": 2} in events
+    assert engine.wall_health[(0, 3)] == 2
+    assert engine.stats["P1"]["mana"] == mana - 2
+
+
+@pytest.mark.parametrize("target, mana", [((1, 1), 2), ((2, 2), 2), ((1, 2), 2), ((5, 2), 2), ((1, 9), 9), ((0, 0), 0)])
+def test_illegal_teleport_is_rejected(engine, target, mana):
+    before = engine.stats["P1"]["mana"]
+    assert engine.apply(Teleport(target, mana)) == []
+    assert engine.unit_cell("P1") == (1, 2)
+    assert engine.stats["P1"]["mana"] == before
+    assert engine.active_player == "P1"
+
+
+def test_teleport_moves_unit(engine):
+    before = engine.stats["P1"]["mana"]
+    events = engine.apply(Teleport((3, 4), 2))
+    assert {"type": "unit_moved", "player": "P1", "cell": (3, 4)} in events
+    assert engine.unit_cell("P1") == (3, 4)
+    assert engine.spatial.position(("unit", "P1")) == (3, 4)
+    assert engine.stats["P1"]["mana"] == before - 2
+    assert engine.active_player == opponent("P1")
+
+
+# ---------------- 视野 ----------------
+def test_vision_effects_only_apply_to_their_caster():
+    engine = GameEngine(make_map(size=(12, 9), spawns=((1, 4), (10, 4))))
+    before = engine.board.count(engine.vision_mask("P2"))
+    assert engine.apply(Vision(5))
+    assert engine.board.count(engine.vision_mask("P1")) > before
+    assert engine.board.count(engine.vision_mask("P2")) == before
+    assert engine.vision_boost("P2") is None
+
+
+def test_scout_and_laser_reveal_only_apply_to_their_caster():
+    engine = GameEngine(make_map(size=(12, 9), spawns=((1, 4), (10, 4))), characters={"P1": "reimu", "P2": "marisa"})
+    p1_view, p2_view = engine.vision_mask("P1"), engine.vision_mask("P2")
+    assert engine.apply(Scout())
+    assert engine.vision_mask("P1") == p1_view | engine.board.bit((10, 4))
+    assert engine.vision_mask("P2") == p2_view
+    assert engine.apply(Laser((5, 0)), now=0.0)
+    assert engine.vision_mask("P2") == p2_view | engine.board.cross((5, 0))
+    assert engine.vision_mask("P1") == p1_view
+
+
+
+# ---------------- 火力线 ----------------
+def test_line_of_fire_cache_distinguishes_map_sizes():
+    # 两张地图的墙体掩码相同（第 4 位）：4 格宽时为 (0, 1)，挡在上下两名单位之间；8 格宽时为 (4, 0)，不挡
+    narrow = GameEngine(make_map(size=(4, 3), spawns=((0, 0), (0, 2)), walls=[(0, 1)]))
+    wide = GameEngine(make_map(size=(8, 3), spawns=((0, 0), (0, 2)), walls=[(4, 0)]))
+    assert narrow.walls.mask == wide.walls.mask
+    assert not line_of_fire(narrow, "P1")
+    assert line_of_fire(wide, "P1")
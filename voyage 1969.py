@@ -4,6 +4,16 @@ import os
 import json
 import time
 import math
+from collections import OrderedDict
+
+from voyage.ai import AI_TIME_BUDGET, AlphaBetaAI
+from voyage.engine import (
+    GameEngine, Move, Build, Needle, Amulet, Laser, NormalAttack,
+    Teleport, Scout, Vision, BuySkill, Patrol
+)
+from voyage.projectiles import HEADING_BUCKETS
+from voyage.timestep import FixedTimestep
+from voyage.worker import BackgroundAI
 
 
 # 2. 游戏初始化配置
@@ -18,6 +28,7 @@ INFOBAR_WIDTH = 400              # 信息栏宽度
 WINDOW_WIDTH = MAP_WIDTH * GRID_SIZE + INFOBAR_WIDTH
 WINDOW_HEIGHT = (MAP_HEIGHT + SKILLBAR_HEIGHT) * GRID_SIZE
 LASER_CLEAR_EVENT = pygame.USEREVENT + 2
+ENEMY_RESULT_EVENT = pygame.USEREVENT + 3  # 后台 AI 搜索完成，event.job / event.action
 
 
 # 2.3 颜色定义
@@ -58,41 +69,14 @@ PLAYER_STATS = {
 }
 
 
-# 2.4.3 交互状态
-game_state = {
+# 2.4.3 交互状态（界面专用；回合、子弹、公告等规则状态由 4.1 的 engine 提供）
+ui_state = {
     "selected_skill": None,      # 当前选中技能编号
     "selected_character": None,  # 当前选中角色
     "hovered_skill": None,       # 悬停技能编号
     "current_mana_input": 0,     # 灵力输入框数值
-    "bullets": [],               # 活跃子弹列表
-    "bullet_queue": [],          # 子弹发射队列
-    "game_logs": ["遊戲開始"],    # 游戏公告日志
-    "last_shot_time": 0          # 最后发射时间
-}
-game_state["current_turn"] = {"turn_number": 1, "active_player": MANUAL_PLAYER}
-game_state["enemy_direction"] = 1  # 敵人初始向下移動
-# 统一管理玩家数据，spawn point 为 "P1" 和 "P2"
-game_state["players"] = {
-    "P1": {"character": P1_character, "hp": 20, "attack": 1, "mana": 20, "gold": 100},
-    "P2": {"character": P2_character, "hp": 20, "attack": 1, "mana": 20, "gold": 100}
-}
-game_state["unlocked_skills"] = {
-    "P1": {1: False, 2: False, 3: False, 4: False},
-    "P2": {1: False, 2: False, 3: False, 4: False}
+    "skill_purchase_pending": None  # 当前待购买技能的编号，初始为空
 }
-# 当前待购买技能的编号，初始为空
-game_state["skill_purchase_pending"] = None
-
-# ★ 1. 设置角色攻击力（避免硬编码P1/P2）
-# 更新 PLAYER_STATS 和 game_state["players"] 中的攻击力
-for pid, stats in PLAYER_STATS.items():
-    # 根据角色名判断，如果角色为 "marisa"，则攻击力设为 2
-    if (pid == "P1" and P1_character == "marisa") or (pid == "P2" and P2_character == "marisa"):
-         stats["attack"] = 2
-
-for pid, p in game_state["players"].items():
-    if p["character"] == "marisa":
-         p["attack"] = 2
 
 
 # 2.4.4 移动半径
@@ -109,9 +93,122 @@ except:
     FONT = pygame.font.SysFont("simsunnsimsun", 24)
 
 # 3.2 图像加载函数
-def load_scaled_image(path, size):
-    """加载并缩放图像资源"""
-    return pygame.transform.scale(pygame.image.load(path), size)
+SURFACE_CACHE_BUDGET = 64 * 1024 * 1024  # Surface 缓存的内存预算（字节）
+
+
+class SurfaceCache:
+    """
+    进程内共享的 Surface 缓存（LRU 淘汰）：
+      - 键由调用方决定，例如 ("image", path, size, convert)；
+      - 每个条目按像素占用的字节数计入 budget，超出预算时淘汰最久未使用的条目；
+      - hits / misses 统计命中情况，便于分析每帧的加载开销。
+    """
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """取出缓存的 Surface 并标记为最近使用；未命中时返回 None"""
+        surface = self._entries.get(key)
+        if surface is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return surface
+
+    def put(self, key, surface):
+        """存入 Surface；单个条目超过整个预算时不缓存"""
+        size = surface_bytes(surface)
+        if size > self.budget:
+            return surface
+        if key in self._entries:
+            self.used -= surface_bytes(self._entries.pop(key))
+        self._entries[key] = surface
+        self.used += size
+        while self.used > self.budget:
+            _, evicted = self._entries.popitem(last=False)
+            self.used -= surface_bytes(evicted)
+        return surface
+
+    def clear(self):
+        self._entries.clear()
+        self.used = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def surface_bytes(surface):
+    """Surface 像素数据占用的字节数"""
+    return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+
+surface_cache = SurfaceCache(SURFACE_CACHE_BUDGET)
+
+
+def convert_surface(surface, convert):
+    """按 convert 模式转换像素格式："alpha" 为 convert_alpha，"opaque" 为 convert，None 不转换"""
+    if convert == "alpha":
+        return surface.convert_alpha()
+    if convert == "opaque":
+        return surface.convert()
+    return surface
+
+
+def load_scaled_image(path, size, convert=None):
+    """
+    加载并缩放图像资源，结果按 (path, size, convert) 缓存在 surface_cache 中，
+    同一资源只解码、缩放一次。窗口尚未创建时无法转换像素格式，此时忽略 convert。
+    """
+    if pygame.display.get_surface() is None:
+        convert = None
+    key = ("image", path, tuple(size), convert)
+    img = surface_cache.get(key)
+    if img is None:
+        img = convert_surface(pygame.transform.scale(pygame.image.load(path), size), convert)
+        surface_cache.put(key, img)
+    return img
+
+# 3.2.1 文字渲染缓存
+# 字体光栅化（尤其是中日文字形）开销很大，渲染结果按 (文字, 颜色, 字体) 缓存，LRU 淘汰。
+TEXT_CACHE_BUDGET = 8 * 1024 * 1024
+text_cache = SurfaceCache(TEXT_CACHE_BUDGET)
+
+def render_text(text, color, font=None):
+    """渲染单行抗锯齿文字，同一 (text, color, font) 只光栅化一次"""
+    font = font or FONT
+    key = (text, tuple(color), font)
+    surface = text_cache.get(key)
+    if surface is None:
+        surface = text_cache.put(key, font.render(text, True, color))
+    return surface
+
+# 文字块缓存：name -> (lines, Surface)，内容不变时直接复用整块面板
+text_blocks = {}
+
+def render_text_block(name, lines, color, line_height=30, background=COLORS["BLACK"]):
+    """
+    把多行文字合成为一张 Surface（行距 line_height，底色 background），
+    只有 name 对应的内容变化时才重新合成。
+    """
+    lines = tuple(lines)
+    cached = text_blocks.get(name)
+    if cached is not None and cached[0] == lines:
+        return cached[1]
+    rendered = [render_text(line, color) for line in lines]
+    width = max((r.get_width() for r in rendered), default=0)
+    height = max(((i * line_height + r.get_height()) for i, r in enumerate(rendered)), default=0)
+    block = pygame.Surface((max(width, 1), max(height, 1)))
+    block.fill(background)
+    for i, r in enumerate(rendered):
+        block.blit(r, (0, i * line_height))
+    text_blocks[name] = (lines, block)
+    return block
 
 # 3.3 地图数据加载
 with open("map/aokigahara.json", "r", encoding="utf-8") as f:
@@ -127,112 +224,6 @@ wall_imgs = {
 wall_default = load_scaled_image(os.path.join("map", map_data["resources"]["wall_default"]), (GRID_SIZE, GRID_SIZE))
 start_img = load_scaled_image(os.path.join("map", map_data["resources"]["start_img"]), (GRID_SIZE, GRID_SIZE))
 
-# 99999999回合体系
-
-def switch_turn(action_type, extra_info=""):
-    """
-    统一管理回合切换：
-      - 记录本回合操作到 game_state["turn_history"]
-      - 生成公告
-      - 根据当前 active_player 切换到下一玩家
-        * 如果当前为手动玩家，则切换到自动玩家，并启动 auto_enemy_action 定时器；
-        * 如果当前为自动玩家，则先更新阴阳宝玉的视野提升效果，
-          清除侦察效果，再切换回手动玩家并增加回合数。
-    """
-    if "turn_history" not in game_state:
-        game_state["turn_history"] = []
-    active = game_state["current_turn"]["active_player"]
-    history_entry = {
-        "turn": game_state["current_turn"]["turn_number"],
-        "active_player": active,
-        "action": action_type,
-        "extra_info": extra_info,
-        "timestamp": time.time()
-    }
-    game_state["turn_history"].append(history_entry)
-    
-    # 根据 action_type 生成公告（这里保留原有逻辑）
-    current_character = game_state["players"][active]["character"]
-    if action_type == "move":
-        msg = f"{current_character} 進行了移動"
-    elif action_type == "build":
-        msg = f"{current_character} 進行了建造"
-    elif action_type == "needle":
-        msg = f"霰術：「Persuasion Needle」\n{current_character} 發射了封魔針"
-    elif action_type == "amulet":
-        msg = f"霊耗：「Homing Amulet」\n{current_character} 發射了符札"
-    elif action_type == "teleport":
-        msg = f"秘奧：「G Free」\n{current_character} 閃現到了\n半徑為[{extra_info}]內的一格"
-    elif action_type == "normal":
-        msg = f"{current_character} 發動了普通攻擊"
-    elif action_type == "vision":
-        msg = f"策法：「陰陽寶玉」\n{current_character} 獲得了\n半徑為[{extra_info}]的視野"
-    elif action_type == "scout":
-        msg = f"{current_character} 發動了偵察，\n暴露敵方位置1回合"
-    else:
-        msg = f"{current_character} 進行了行動"
-    add_announcement(msg)
-    finalize_turn_announcements()
-    
-    # 回合切换逻辑
-    if game_state["current_turn"]["active_player"] == MANUAL_PLAYER:
-        # 手动玩家操作结束后，切换到自动玩家，并启动 auto_enemy_action 定时器
-        game_state["current_turn"]["active_player"] = AUTO_PLAYER
-        pygame.time.set_timer(ENEMY_ACTION_EVENT, 1000, True)
-    else:
-        # 自动玩家操作结束后，更新阴阳宝玉效果、清除侦察效果，然后切换回手动玩家，并更新回合数
-        update_vision_boost()  # 关键：更新视野提升效果的剩余回合数
-        if "recon_position" in game_state:
-            del game_state["recon_position"]
-        game_state["current_turn"]["active_player"] = MANUAL_PLAYER
-        game_state["current_turn"]["turn_number"] += 1
-
-
-
-# 公告系統相關函數
-# ================= 回合與公告系統 =================
-
-def add_announcement(msg):
-    """新增公告訊息，暫存公告只保留當前回合的訊息"""
-    game_state["announcements"] = [msg]
-
-def finalize_turn_announcements():
-    """結算公告：將暫存公告複製到 game_logs，並清空暫存公告"""
-    game_state["game_logs"] = game_state["announcements"][:]
-    game_state["announcements"] = []
-
-def finish_turn(action_type, extra_info=""):
-    switch_turn(action_type, extra_info)
-
-
-
-
-
-def auto_enemy_action():
-    """
-    自动控制敌方单位的简单移动。
-    使用 ENEMY_INDEX 指定自动操作单位在 map_layout["start_positions"] 中的位置。
-    """
-    enemy_pos = list(map_layout["start_positions"][ENEMY_INDEX])
-    direction = game_state.get("enemy_direction", 1)
-    if enemy_pos[1] + direction < 0 or enemy_pos[1] + direction >= MAP_HEIGHT:
-        direction = -direction
-        game_state["enemy_direction"] = direction
-    enemy_pos[1] += direction
-    map_layout["start_positions"][ENEMY_INDEX] = tuple(enemy_pos)
-    
-    enemy_character = game_state["players"][ENEMY_PLAYER]["character"]
-    enemy_msg = f"{enemy_character} 進行了移動"
-    add_announcement(enemy_msg)
-    finalize_turn_announcements()
-    
-    switch_turn("enemy_move")
-
-
-
-
-
-
 # 3.5 角色资源加载
 def load_character_image(character, selected=False):
     """加载角色图像，支持选中状态"""
@@ -243,6 +234,33 @@ def load_character_image(character, selected=False):
         img = pygame.image.load(f"sample/character/{character}/{character}.png")
     return pygame.transform.scale(img, (GRID_SIZE, GRID_SIZE))
 
+# 角色立绘登记表：(character, selected) -> Surface，整个会话只解析、加载一次
+character_sprites = {}
+
+def make_placeholder_sprite():
+    """缺少立绘的角色（如只有部分素材的 aya）使用的占位图：灰底红框"""
+    img = pygame.Surface((GRID_SIZE, GRID_SIZE), pygame.SRCALPHA)
+    img.fill((*COLORS["GRAY"], 160))
+    pygame.draw.rect(img, COLORS["RED"], img.get_rect(), 2)
+    return img
+
+def get_character_sprite(character, selected=False):
+    """
+    从登记表取角色立绘；首次请求时加载并 convert_alpha。
+    找不到素材的角色只在首次解析时回退到占位图，之后每帧直接命中登记表，不再抛出异常。
+    """
+    key = (character, selected)
+    img = character_sprites.get(key)
+    if img is None:
+        try:
+            img = load_character_image(character, selected)
+        except (FileNotFoundError, pygame.error):
+            img = make_placeholder_sprite()
+        if pygame.display.get_surface() is not None:
+            img = img.convert_alpha()
+        character_sprites[key] = img
+    return img
+
 # 3.6 技能图标加载
 def load_skill_icons(character):
     """加载指定角色的全套技能图标"""
@@ -258,17 +276,99 @@ def load_skill_icons(character):
 
 
 # 4. 游戏数据结构初始化
-# 4.1 地图布局数据
-map_layout = {
-    "start_positions": [tuple(pos) for pos in map_data["spawn_points"].values()],
-    "grass": [tuple(pos) for pos in map_data["terrain"]["grass"]["positions"]],
-    "walls": [tuple(pos) for pos in map_data["terrain"]["walls"]["positions"]]
-}
+# 4.1 规则核心
+# 地图布局、玩家数值、墙体生命值与回合/子弹/效果状态都由无界面的 GameEngine 持有，
+# 下面的全局名称只是它们的别名，绘制代码照常读取。
+# ★ 角色攻击力（魔理沙为 2）由 GameEngine 根据角色设置，避免硬编码 P1/P2
+def create_engine():
+    """按开局配置创建规则核心；界面交互状态并入其 state"""
+    new_engine = GameEngine(
+        map_data,
+        characters={"P1": P1_character, "P2": P2_character},
+        stats=INITIAL_PLAYER_STATS,
+        first_player=MANUAL_PLAYER,
+        grid_size=GRID_SIZE,
+        skill_cost=SKILL_COST,
+        movement_radius=MOVEMENT_RADIUS
+    )
+    # 界面交互状态与规则状态放在同一字典中
+    new_engine.state.update(ui_state)
+    return new_engine
+
+def bind_engine(new_engine):
+    """让下面的全局别名指向 new_engine（开局与重新开局时调用）"""
+    global engine, PLAYER_STATS, map_layout, wall_health, wall_total, game_state
+    engine = new_engine
+    PLAYER_STATS = engine.stats
+    map_layout = engine.map_layout
+    wall_health = engine.wall_health
+    wall_total = engine.wall_total
+    game_state = engine.state
+
+INITIAL_PLAYER_STATS = PLAYER_STATS
+bind_engine(create_engine())
+
+# 4.2 规则结算与事件处理
+def handle_engine_events(events):
+    """根据规则核心返回的事件更新界面：重绘地形格、设置激光与敌方行动定时器"""
+    for event in events:
+        if event["type"] in ("wall_built", "wall_damaged", "wall_destroyed"):
+            mark_terrain_dirty(event["cell"])
+        elif event["type"] == "laser":
+            # 一次性定时器事件，激光显示时间结束后清除激光效果
+            pygame.time.set_timer(LASER_CLEAR_EVENT, event["duration"], True)
+        elif event["type"] == "turn" and event["active_player"] == AUTO_PLAYER:
+            # 手动玩家操作结束后，切换到自动玩家；思考时间即为敌方行动前的等待
+            pygame.event.post(pygame.event.Event(ENEMY_ACTION_EVENT))
+
+def apply_action(action):
+    """由当前回合玩家执行行动，处理结算事件并返回事件列表"""
+    events = engine.apply(action)
+    handle_engine_events(events)
+    return events
+
+def ended_turn(events):
+    return any(event["type"] == "turn" for event in events)
+
+# 敌方 AI：在后台进程中对规则核心的快照做搜索，每回合最多思考 AI_TIME_BUDGET 秒；
+# 思考期间主循环照常处理事件、推进子弹与绘制，搜索结果以 ENEMY_RESULT_EVENT 送回
+# ENEMY_AI 为 AlphaBetaAI（对信念中最可能的位置做完整搜索）或 functools.partial(voyage.mcts.MCTSAI, workers=1)
+# （按信念对迷雾中的位置采样；搜索已在后台进程中，不再嵌套进程池，取消与 F5 才能及时打断搜索）
+ENEMY_AI = AlphaBetaAI
+enemy_ai = BackgroundAI(time_budget=AI_TIME_BUDGET, factory=ENEMY_AI)
+
+def post_enemy_result(job, action):
+    """后台线程中调用：把搜索结果作为 pygame 事件送回主循环"""
+    pygame.event.post(pygame.event.Event(ENEMY_RESULT_EVENT, job=job, action=action))
+
+def auto_enemy_action():
+    """轮到自动玩家时开始在后台思考"""
+    if game_state["current_turn"]["active_player"] != AUTO_PLAYER or enemy_ai.thinking:
+        return
+    enemy_ai.submit(engine, AUTO_PLAYER, post_enemy_result)
 
-# 4.2 墙体生命值初始化
-wall_health = {tuple(pos): map_data["terrain"]["walls"]["health"] for pos in map_layout["walls"]}
-# 新增：记录墙体的总生命值（初始地图中所有墙体总生命值均为5）
-wall_total = {tuple(pos): map_data["terrain"]["walls"]["health"] for pos in map_layout["walls"]}
+def apply_enemy_result(event):
+    """执行后台搜索出的行动；购买技能不结束回合，随后继续思考"""
+    if not enemy_ai.is_current(event.job) or game_state["current_turn"]["active_player"] != AUTO_PLAYER:
+        return
+    events = apply_action(event.action) if event.action is not None else []
+    if not events:
+        # 搜索出错或行动未被执行时退回巡逻，保证回合能够结束
+        events = apply_action(Patrol())
+    if not ended_turn(events):
+        auto_enemy_action()
+
+def reset_game():
+    """F5：取消 AI 的思考与所有定时器，重新开局"""
+    enemy_ai.cancel()
+    pygame.time.set_timer(ENEMY_ACTION_EVENT, 0)
+    pygame.time.set_timer(LASER_CLEAR_EVENT, 0)
+    pygame.event.clear((ENEMY_ACTION_EVENT, ENEMY_RESULT_EVENT, LASER_CLEAR_EVENT))
+    bind_engine(create_engine())
+    sim_clock.reset()
+    mark_terrain_dirty()
+    fog_state["key"] = None
+    range_state["key"] = None
 
 
 # 4.3 技能信息配置
@@ -294,7 +394,8 @@ def draw_info_panel(screen, mouse_pos):
     pygame.draw.rect(screen, COLORS["BLACK"], info_rect)
     
     # 在面板頂部顯示當前回合資訊（全局信息，不受迷霧影響）
-    turn_info = FONT.render(f"回合: {game_state['current_turn']['turn_number']} {game_state['current_turn']['active_player']}", True, COLORS["WHITE"])
+    thinking = "  思考中…" if enemy_ai.thinking else ""
+    turn_info = render_text(f"回合: {game_state['current_turn']['turn_number']} {game_state['current_turn']['active_player']}{thinking}", COLORS["WHITE"])
     screen.blit(turn_info, (MAP_WIDTH * GRID_SIZE + 20, 0))
     
     # 計算滑鼠所在的格子（根據像素座標）
@@ -306,7 +407,7 @@ def draw_info_panel(screen, mouse_pos):
     in_map_area = (mouse_pos[0] < MAP_WIDTH * GRID_SIZE and mouse_pos[1] < MAP_HEIGHT * GRID_SIZE)
     
     # 5.1.2 座標顯示：始終顯示具體坐標，如果在地圖內則顯示 "座標: A1"，否則正常顯示
-    coord_text = FONT.render(f"座標: {chr(65 + grid_x)}{grid_y + 1}", True, COLORS["WHITE"])
+    coord_text = render_text(f"座標: {chr(65 + grid_x)}{grid_y + 1}", COLORS["WHITE"])
     screen.blit(coord_text, (MAP_WIDTH * GRID_SIZE + 20, 20))
     
     # 5.1.3 懸停信息顯示（角色/技能/地形）
@@ -326,28 +427,15 @@ def draw_info_panel(screen, mouse_pos):
         hover_text = f"牆體生命值: {current_hp} / {total_hp}"
     
     # 在地圖區域內僅顯示可見格的懸停信息；非地圖區域則直接顯示（通常不會觸發此邏輯）
-    if in_map_area:
-        if is_cell_visible(cell, map_layout["start_positions"][CONTROLLED_INDEX], P1_vision_radius) and hover_text:
-            y_offset = 50
-            for line in hover_text.split("\n"):
-                rendered_line = FONT.render(line, True, COLORS["WHITE"])
-                screen.blit(rendered_line, (MAP_WIDTH * GRID_SIZE + 20, y_offset))
-                y_offset += 30
-    else:
-        if hover_text:
-            y_offset = 50
-            for line in hover_text.split("\n"):
-                rendered_line = FONT.render(line, True, COLORS["WHITE"])
-                screen.blit(rendered_line, (MAP_WIDTH * GRID_SIZE + 20, y_offset))
-                y_offset += 30
+    if hover_text and (is_cell_revealed(cell) or not in_map_area):
+        hover_block = render_text_block("hover", hover_text.split("\n"), COLORS["WHITE"])
+        screen.blit(hover_block, (MAP_WIDTH * GRID_SIZE + 20, 50))
 
     # 5.1.4 遊戲日誌顯示（全球信息，不受視野影響）
     pygame.draw.line(screen, COLORS["WHITE"], (MAP_WIDTH * GRID_SIZE, WINDOW_HEIGHT // 3),
                      (WINDOW_WIDTH, WINDOW_HEIGHT // 3), 3)
-    y_offset = WINDOW_HEIGHT // 3 + 20
-    for log in game_state["game_logs"][-5:]:
-        screen.blit(FONT.render(log, True, COLORS["WHITE"]), (MAP_WIDTH * GRID_SIZE + 20, y_offset))
-        y_offset += 30
+    log_block = render_text_block("logs", game_state["game_logs"][-5:], COLORS["WHITE"])
+    screen.blit(log_block, (MAP_WIDTH * GRID_SIZE + 20, WINDOW_HEIGHT // 3 + 20))
 
     # 5.1.5 玩家狀態顯示（全球信息）
     pygame.draw.line(screen, COLORS["WHITE"], (MAP_WIDTH * GRID_SIZE, WINDOW_HEIGHT * 2 // 3),
@@ -359,23 +447,21 @@ def draw_info_panel(screen, mouse_pos):
         f"金幣: {PLAYER_STATS[MANUAL_PLAYER]['gold']}"
     ]
 
-    y_offset = WINDOW_HEIGHT * 2 // 3 + 20
-    for stat in stats:
-        screen.blit(FONT.render(stat, True, COLORS["WHITE"]), (MAP_WIDTH * GRID_SIZE + 20, y_offset))
-        y_offset += 30
+    stats_block = render_text_block("stats", stats, COLORS["WHITE"])
+    screen.blit(stats_block, (MAP_WIDTH * GRID_SIZE + 20, WINDOW_HEIGHT * 2 // 3 + 20))
 
     # 5.1.6 靈力輸入框繪製
     input_box = pygame.Rect(10 * GRID_SIZE, 9 * GRID_SIZE, GRID_SIZE, GRID_SIZE)
     pygame.draw.rect(screen, COLORS["WHITE"], input_box)
     pygame.draw.rect(screen, COLORS["GRAY"], input_box, 3)
-    mana_text = FONT.render(str(game_state["current_mana_input"]), True, COLORS["BLACK"])
+    mana_text = render_text(str(game_state["current_mana_input"]), COLORS["BLACK"])
     screen.blit(mana_text, mana_text.get_rect(center=input_box.center))
 
 
 
 def load_skillbar():
     path = os.path.join("map", "skillbar.png")
-    return pygame.transform.scale(pygame.image.load(path), (MAP_WIDTH * GRID_SIZE, SKILLBAR_HEIGHT * GRID_SIZE))
+    return load_scaled_image(path, (MAP_WIDTH * GRID_SIZE, SKILLBAR_HEIGHT * GRID_SIZE))
 skillbar_img = load_skillbar()
 
 # 5.2 技能栏绘制
@@ -396,25 +482,64 @@ def draw_skill_bar(screen):
             screen.blit(icon, (x * GRID_SIZE, y * GRID_SIZE))
         # 如果技能未解锁，但正处于购买待确认状态，则显示 levelup.png 图标
         elif game_state["skill_purchase_pending"] == idx:
-            icon = load_scaled_image("sample/skill/levelup.png", (GRID_SIZE, GRID_SIZE))
+            icon = load_scaled_image("sample/skill/levelup.png", (GRID_SIZE, GRID_SIZE), "alpha")
             screen.blit(icon, (x * GRID_SIZE, y * GRID_SIZE))
         # 否则保持空白，不绘制任何内容
 
 
 # 5.3 主地图绘制
+# 静态地形层：地面、草丛与墙体预先绘制到一张 Surface 上，每帧只需一次 blit。
+# 墙体被建造、受损或击碎时只重绘对应的格子；换地图时整层重建。
+terrain_layer = {
+    "surface": None,   # 预渲染的地形 Surface
+    "map": None,       # 生成该层时的地图标识，变化时整层重建
+    "dirty": set(),    # 待重绘的格子
+    "version": 0       # 每次地形变化加一，供画面刷新判断是否需要整屏更新
+}
+
+def mark_terrain_dirty(cell=None):
+    """标记地形格需要重绘；cell 为 None 时整层重建"""
+    terrain_layer["version"] += 1
+    if cell is None:
+        terrain_layer["surface"] = None
+    else:
+        terrain_layer["dirty"].add(cell)
+
+def render_terrain_cell(surface, cell, grass_cells):
+    """在地形层上重绘单个格子：地面 → 草丛 → 墙体"""
+    x, y = cell
+    pos = (x * GRID_SIZE, y * GRID_SIZE)
+    surface.blit(ground_img, pos)
+    if cell in grass_cells:
+        surface.blit(grass_img, pos)
+    if cell in map_layout["walls"]:
+        surface.blit(wall_imgs.get(wall_health.get(cell, 5), wall_default), pos)
+
+def update_terrain_layer():
+    """按需重建整层或重绘脏格，返回最新的地形 Surface"""
+    map_key = (id(map_data), MAP_WIDTH, MAP_HEIGHT, GRID_SIZE)
+    grass_cells = set(map_layout["grass"])
+    if terrain_layer["surface"] is None or terrain_layer["map"] != map_key:
+        surface = pygame.Surface((MAP_WIDTH * GRID_SIZE, MAP_HEIGHT * GRID_SIZE))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        for y in range(MAP_HEIGHT):
+            for x in range(MAP_WIDTH):
+                render_terrain_cell(surface, (x, y), grass_cells)
+        terrain_layer["surface"] = surface
+        terrain_layer["map"] = map_key
+        terrain_layer["dirty"].clear()
+    elif terrain_layer["dirty"]:
+        for cell in terrain_layer["dirty"]:
+            if 0 <= cell[0] < MAP_WIDTH and 0 <= cell[1] < MAP_HEIGHT:
+                render_terrain_cell(terrain_layer["surface"], cell, grass_cells)
+        terrain_layer["dirty"].clear()
+    return terrain_layer["surface"]
+
 def draw_game_map(screen):
     """绘制游戏主地图"""
-    # 5.3.1 绘制基础地形
-    for y in range(MAP_HEIGHT):
-        for x in range(MAP_WIDTH):
-            screen.blit(ground_img, (x*GRID_SIZE, y*GRID_SIZE))
-    
-    # 5.3.2 绘制特殊地形
-    for x, y in map_layout["grass"]:
-        screen.blit(grass_img, (x*GRID_SIZE, y*GRID_SIZE))
-    for x, y in map_layout["walls"]:
-        img = wall_imgs.get(wall_health.get((x,y), 5), wall_default)
-        screen.blit(img, (x*GRID_SIZE, y*GRID_SIZE))
+    # 5.3.1 绘制基础地形与特殊地形（预渲染的地形层）
+    screen.blit(update_terrain_layer(), (0, 0))
     
     # 5.3.3 绘制玩家角色
     if len(map_layout["start_positions"]) >= 2:
@@ -422,7 +547,7 @@ def draw_game_map(screen):
             x, y = pos
             char = P1_character if i == 0 else P2_character
             selected = game_state["selected_character"] == f"P{i+1}"
-            img = load_character_image(char, selected)
+            img = get_character_sprite(char, selected)
             screen.blit(img, (x*GRID_SIZE, y*GRID_SIZE))
 
 
@@ -445,38 +570,56 @@ def is_cell_visible(cell, center, radius):
     dy = abs(cell[1] - center[1])
     return max(dx, dy) <= radius
 
-def draw_mist(screen):
+# 迷雾层：整张地图的迷雾预先绘制到一张透明 Surface 上，
+# 只有当手控单位位置、视野提升、侦察或激光暴露变化时才重建，每帧只需一次 blit。
+# 重建时同时生成可见性掩码，信息面板与各指示器都通过 is_cell_revealed 查询。
+fog_state = {
+    "key": None,       # 生成迷雾层时的视野状态
+    "surface": None,   # 迷雾覆盖层
+    "visible": 0       # 可见性位掩码（见 voyage.bitboard）
+}
+
+def fog_key():
+    """影响迷雾的全部状态；与上次不同时需要重建迷雾层"""
+    # 视野半径（含视野提升）、侦察与激光暴露只取手控玩家自己施放的效果
+    return (
+        map_layout["start_positions"][CONTROLLED_INDEX],
+        *engine.vision_effects(MANUAL_PLAYER),
+        MAP_WIDTH, MAP_HEIGHT, GRID_SIZE
+    )
+
+def update_fog():
     """
-    绘制迷雾：对于不在视野内的每个格子绘制迷雾。
+    按需重建迷雾层与可见性掩码：对于不在视野内的每个格子绘制迷雾。
     如果该格子被侦察（recon_position）暴露，或处于激光暴露（laser_reveal）的行或列，
-    则不绘制迷雾，从而达到视野暴露效果。
+    则不绘制迷雾，从而达到视野暴露效果。视野以棋盘距离（Chebyshev distance）计算。
     """
+    key = fog_key()
+    if key == fog_state["key"]:
+        return fog_state
+    p1_center, vision_radius, recon_position, laser_reveal = key[:4]
     # 加载并缩放迷雾图像
-    mist_img = load_scaled_image("map/mist.png", (GRID_SIZE, GRID_SIZE))
-    
-    # 获取玩家所在的中心格（用于视野判定）
-    p1_center = map_layout["start_positions"][CONTROLLED_INDEX]
-    
-    # 视野半径：如果存在视野提升效果，则使用提升后的半径，否则使用默认半径
-    vision_radius = game_state["vision_boost"]["radius"] if "vision_boost" in game_state else P1_vision_radius
+    mist_img = load_scaled_image("map/mist.png", (GRID_SIZE, GRID_SIZE), "alpha")
+    surface = pygame.Surface((MAP_WIDTH * GRID_SIZE, MAP_HEIGHT * GRID_SIZE), pygame.SRCALPHA)
+    # 视野范围、侦察暴露的格子与激光暴露的整行整列（激光暴露时，全行或全列均不绘制迷雾）
+    visible = engine.reveal_mask(p1_center, vision_radius, recon_position, laser_reveal)
 
-    # 遍历地图上每个格子
-    for y in range(MAP_HEIGHT):
-        for x in range(MAP_WIDTH):
-            cell = (x, y)
-            
-            # 判断该格子是否被侦察暴露
-            recon_revealed = ("recon_position" in game_state and cell == game_state["recon_position"])
-            # 判断该格子是否被激光暴露（激光暴露时，全行或全列均不绘制迷雾）
-            laser_revealed = ("laser_reveal" in game_state and (x == game_state["laser_reveal"][0] or y == game_state["laser_reveal"][1]))
-            
-            # 如果该格子被侦察或激光暴露，则不绘制迷雾
-            if recon_revealed or laser_revealed:
-                continue
-            
-            # 如果该格子不在玩家视野内，则绘制迷雾
-            if not is_cell_visible(cell, p1_center, vision_radius):
-                screen.blit(mist_img, (x * GRID_SIZE, y * GRID_SIZE))
+    # 该格子不在玩家视野内，绘制迷雾
+    for x, y in engine.board.cells(engine.board.full & ~visible):
+        surface.blit(mist_img, (x * GRID_SIZE, y * GRID_SIZE))
+
+    fog_state["key"] = key
+    fog_state["surface"] = surface
+    fog_state["visible"] = visible
+    return fog_state
+
+def is_cell_revealed(cell):
+    """查询可见性网格：格子在视野内或被侦察/激光暴露时返回 True，地图外的格子返回 False"""
+    return engine.board.contains(update_fog()["visible"], cell)
+
+def draw_mist(screen):
+    """绘制迷雾：整张迷雾层一次 blit"""
+    screen.blit(update_fog()["surface"], (0, 0))
 
 
 
@@ -486,94 +629,106 @@ def draw_mist(screen):
 
 
 # 5.4 子弹系统
+# 子弹以固定步长模拟（每步前进 speed 像素，发射队列按模拟时间出膛），与渲染帧率无关：
+# 每帧按经过的真实时间补跑若干步，绘制时在上一步与当前步之间插值。
+sim_clock = FixedTimestep()
+
 def update_bullets():
-    """
-    更新子弹状态：
-      - 技能2的子弹具有穿透效果，每个实体仅受一次伤害判定；
-      - 技能1及普通攻击（"normal"）在遇到实体时造成伤害后消失。
-      
-    当墙体被击碎（wall_health[cell] <= 0）时，
-    根据该墙体的总生命值 N（记录在 wall_total 中），
-    击碎该墙体的机体（即子弹的 "owner" 属性所指玩家）会获得 4 * N 金币。
-    """
-    current_time = time.time()
-    if game_state["bullet_queue"] and current_time - game_state["last_shot_time"] > 0.1:
-        new_bullet = game_state["bullet_queue"].pop(0)
-        if new_bullet.get("skill") == 2:
-            new_bullet["hit_entities"] = set()
-        game_state["bullets"].append(new_bullet)
-        game_state["last_shot_time"] = current_time
-
-    for bullet in game_state["bullets"][:]:
-        # 更新子弹位置
-        bullet["pos"] = (
-            bullet["pos"][0] + bullet["direction"][0] * bullet["speed"],
-            bullet["pos"][1] + bullet["direction"][1] * bullet["speed"]
-        )
-        grid_x = int(bullet["pos"][0]) // GRID_SIZE
-        grid_y = int(bullet["pos"][1]) // GRID_SIZE
-        if not (0 <= grid_x < MAP_WIDTH and 0 <= grid_y < MAP_HEIGHT):
-            game_state["bullets"].remove(bullet)
-            continue
-
-        cell = (grid_x, grid_y)
-
-        # 检查是否撞到墙体
-        if cell in map_layout["walls"]:
-            # 若子弹属于技能1或普通攻击（"normal"）
-            if bullet.get("skill") in [1, "normal"]:
-                wall_health[cell] -= 1
-                # 当墙体生命值耗尽时，执行奖励逻辑
-                if wall_health[cell] <= 0:
-                    N = wall_total.get(cell, 5)
-                    owner = bullet.get("owner")
-                    if owner:
-                        PLAYER_STATS[owner]["gold"] += 4 * N
-                    map_layout["walls"].remove(cell)
-                game_state["bullets"].remove(bullet)
-                continue
-
-            # 若子弹属于技能2（穿透效果）
-            elif bullet.get("skill") == 2:
-                if cell not in bullet["hit_entities"]:
-                    wall_health[cell] -= 1
-                    bullet["hit_entities"].add(cell)
-                    if wall_health[cell] <= 0:
-                        N = wall_total.get(cell, 5)
-                        owner = bullet.get("owner")
-                        if owner:
-                            PLAYER_STATS[owner]["gold"] += 4 * N
-                        map_layout["walls"].remove(cell)
-                # 技能2子弹穿透墙体，不消失
-
-        # 检查是否撞到敌方：根据子弹归属动态判断
-        owner = bullet.get("owner")
-        enemy_id = "P2" if owner == "P1" else "P1"  # 敌方玩家ID
-        enemy_index = 0 if enemy_id == "P1" else 1     # 对应起始位置索引
-        enemy_cell = map_layout["start_positions"][enemy_index]
-        if cell == enemy_cell:
-            if bullet.get("skill") in [1, "normal"]:
-                PLAYER_STATS[enemy_id]["hp"] -= 1
-                game_state["bullets"].remove(bullet)
-                continue
-            elif bullet.get("skill") == 2:
-                if cell not in bullet["hit_entities"]:
-                    PLAYER_STATS[enemy_id]["hp"] -= 1
-                    PLAYER_STATS[owner]["mana"] += 1  # 命中敌方返还 1 灵力
-                    bullet["hit_entities"].add(cell)
+    """按经过的时间推进子弹与发射队列；命中、击碎墙体与奖励由规则核心结算"""
+    for _ in range(sim_clock.advance()):
+        handle_engine_events(engine.tick())
 
 
 def update_non_directional_laser_effect():
-    if "non_directional_laser_effect" in game_state:
-        effect = game_state["non_directional_laser_effect"]
-        if time.time() - effect["created_at"] > effect["duration"]:
-            del game_state["non_directional_laser_effect"]
-            if "laser_reveal" in game_state:
-                del game_state["laser_reveal"]
-
+    engine.update_effects(time.time())
+
+
+# 5.4.0 旋转图像缓存
+# 弹幕与激光的方向在发射后不再改变，旋转结果按 (图像, 量化角度) 缓存。
+# ROTATION_BUCKETS 为一周的角度分桶数，越大越精确、占用内存越多；
+# 缓存使用独立的内存预算，不会挤掉 surface_cache 中的基础素材。
+# 分桶与子弹池的朝向分桶（ProjectilePool.heading）一致，子弹可直接按分桶取图。
+ROTATION_BUCKETS = HEADING_BUCKETS
+ROTATION_CACHE_BUDGET = 16 * 1024 * 1024
+rotation_cache = SurfaceCache(ROTATION_CACHE_BUDGET)
+
+def angle_bucket(angle):
+    """把角度（度）量化为 [0, ROTATION_BUCKETS) 内的分桶编号"""
+    return round(angle * ROTATION_BUCKETS / 360) % ROTATION_BUCKETS
+
+def bucket_angle(bucket):
+    """分桶编号对应的旋转角度（度）"""
+    return bucket * 360 / ROTATION_BUCKETS
+
+def get_rotated_sprite(path, size, angle):
+    """取出旋转到 angle（按 ROTATION_BUCKETS 量化）的精灵图，同一分桶只旋转一次"""
+    return get_bucket_sprite(path, size, angle_bucket(angle))
+
+def get_bucket_sprite(path, size, bucket):
+    """取出旋转到分桶 bucket 的精灵图"""
+    key = (path, tuple(size), bucket)
+    sprite = rotation_cache.get(key)
+    if sprite is None:
+        sprite = pygame.transform.rotate(load_scaled_image(path, size, "alpha"), bucket_angle(bucket))
+        rotation_cache.put(key, sprite)
+    return sprite
+
+# 5.4.1 光束渲染
+# 激光采样图是一条“指向上方”的横截面刷子。以前沿光束方向每隔 1 像素铺贴一次旋转后的刷子，
+# 一条光束就要上千次 blit；现在把铺贴结果生成为一张拉伸、旋转好的 Surface，
+# 按 (刷子, 角度分桶, 长度) 缓存在 surface_cache 中，每条光束每帧只需一次 blit。
+THIN_LASER_BRUSH = ("sample/skill/marisa/thinlaser.png", (64, 4))   # 16×1 采样放大 4 倍
+FAT_LASER_BRUSH = ("sample/skill/marisa/fatlaser.png", (64, 16))    # 非定向激光使用的粗刷子
+
+def beam_angle(direction):
+    """计算旋转角度，使采样图的正上方与光束方向对齐"""
+    return -math.degrees(math.atan2(direction[0], -direction[1]))
+
+def build_beam_surface(brush, length):
+    """
+    生成未旋转的竖直光束，等价于把刷子从 y=0 到 y=length 以 1 像素步长逐次铺贴。
+    中段的每一行都叠加了全部 h 行刷子、彼此相同，因此只铺贴出头尾，中段由一行拉伸而成。
+    """
+    w, h = brush.get_size()
+    beam = pygame.Surface((w, length + h), pygame.SRCALPHA)
+    if length < 2 * h:
+        for d in range(length + 1):
+            beam.blit(brush, (0, d))
+        return beam
+    sample = pygame.Surface((w, 3 * h - 2), pygame.SRCALPHA)
+    for d in range(2 * h - 1):
+        sample.blit(brush, (0, d))
+    beam.blit(sample, (0, 0), pygame.Rect(0, 0, w, h - 1))
+    middle = sample.subsurface(pygame.Rect(0, h - 1, w, 1))
+    beam.blit(pygame.transform.scale(middle, (w, length - h + 2)), (0, h - 1))
+    beam.blit(sample, (0, length + 1), pygame.Rect(0, 2 * h - 1, w, h - 1))
+    return beam
+
+def get_beam_surface(brush_spec, angle, length):
+    """从缓存取出 (刷子, 角度分桶, 长度) 对应的旋转光束，未命中时生成一次"""
+    bucket = angle_bucket(angle)
+    key = ("beam", brush_spec, bucket, length)
+    beam = surface_cache.get(key)
+    if beam is None:
+        brush = load_scaled_image(*brush_spec, "alpha")
+        beam = pygame.transform.rotate(build_beam_surface(brush, length), bucket_angle(bucket))
+        surface_cache.put(key, beam)
+    return beam
+
+def draw_beam(screen, brush_spec, start_pos, direction, beam_length):
+    """
+    从 start_pos 沿 direction 绘制长度为 beam_length 的光束（一次 blit），
+    外观与逐像素铺贴刷子相同。返回绘制区域。
+    """
+    length = int(beam_length)
+    beam = get_beam_surface(brush_spec, beam_angle(direction), length)
+    center = (int(start_pos[0] + direction[0] * length / 2),
+              int(start_pos[1] + direction[1] * length / 2))
+    rect = beam.get_rect(center=center)
+    screen.blit(beam, rect)
+    return rect
 
 def draw_non_directional_laser_effect(screen):
-    import pygame
     if "non_directional_laser_effect" not in game_state:
         return
     effect = game_state["non_directional_laser_effect"]
@@ -582,141 +737,54 @@ def draw_non_directional_laser_effect(screen):
     row_center_y = target_cell[1] * GRID_SIZE + GRID_SIZE // 2
     col_center_x = target_cell[0] * GRID_SIZE + GRID_SIZE // 2
 
-    # 加载 fatlaser 采样图，并放大至合适尺寸
-    # 假设我们希望激光的“刷子”尺寸为 64×16（你可以根据实际美术资源调整）
-    # 对于横向激光：由于采样默认正上，旋转90度得到水平效果
-    horizontal_laser = load_scaled_image("sample/skill/marisa/fatlaser.png", (64, 16))
-    horizontal_laser = pygame.transform.rotate(horizontal_laser, 90)
-    # 对于竖向激光：直接使用采样图（或根据需要旋转）
-    vertical_laser = load_scaled_image("sample/skill/marisa/fatlaser.png", (64, 16))
-    # 为了确保无缝效果，采用1像素步长铺贴（由于地图区域不大，性能可接受）
-    
-    # 横向激光：覆盖整个地图宽度
-    for x in range(0, MAP_WIDTH * GRID_SIZE):
-        pos = (x, row_center_y)
-        rect = horizontal_laser.get_rect(center=pos)
-        screen.blit(horizontal_laser, rect)
-        
-    # 竖向激光：覆盖整个地图高度
-    for y in range(0, MAP_HEIGHT * GRID_SIZE):
-        pos = (col_center_x, y)
-        rect = vertical_laser.get_rect(center=pos)
-        screen.blit(vertical_laser, rect)
-
-
-
+    # 横向激光：覆盖整个地图宽度（由右向左，刷子旋转 90 度得到水平效果）
+    mark_dirty(draw_beam(screen, FAT_LASER_BRUSH, (MAP_WIDTH * GRID_SIZE - 1, row_center_y), (-1, 0), MAP_WIDTH * GRID_SIZE - 1))
+    # 竖向激光：覆盖整个地图高度（由下向上，直接使用采样图方向）
+    mark_dirty(draw_beam(screen, FAT_LASER_BRUSH, (col_center_x, MAP_HEIGHT * GRID_SIZE - 1), (0, -1), MAP_HEIGHT * GRID_SIZE - 1))
 
-def update_vision_boost():
-    """
-    当回合切换时调用，减少视野提升效果剩余回合数，
-    如果剩余回合数耗尽则撤销该效果。
-    """
-    if "vision_boost" in game_state:
-        game_state["vision_boost"]["remaining"] -= 1
-        if game_state["vision_boost"]["remaining"] <= 0:
-            del game_state["vision_boost"]
 
 
-import math
-
-def cast_laser(start_pos, direction, max_distance=1000):
-    """
-    从 start_pos 出发，沿 direction 以每像素步长检测，
-    遇到墙体或敌方单位时返回当前点以及碰撞信息。
-    """
-    x, y = start_pos
-    collided_wall = None
-    collided_enemy = None
-    for d in range(0, max_distance):
-        curr_x = x + direction[0] * d
-        curr_y = y + direction[1] * d
-        grid_x = int(curr_x) // GRID_SIZE
-        grid_y = int(curr_y) // GRID_SIZE
-        if not (0 <= grid_x < MAP_WIDTH and 0 <= grid_y < MAP_HEIGHT):
-            return (curr_x, curr_y), collided_wall, collided_enemy
-        cell = (grid_x, grid_y)
-        # 检查墙体碰撞
-        if cell in map_layout["walls"]:
-            collided_wall = cell
-            return (curr_x, curr_y), collided_wall, collided_enemy
-        # 检查敌方碰撞：如果当前玩家为 MANUAL_PLAYER，则敌方在 map_layout["start_positions"][ENEMY_INDEX]，反之则在 CONTROLLED_INDEX
-        current_player = game_state["current_turn"]["active_player"]
-        enemy_index = ENEMY_INDEX if current_player == MANUAL_PLAYER else CONTROLLED_INDEX
-        enemy_cell = map_layout["start_positions"][enemy_index]
-        if cell == enemy_cell:
-            collided_enemy = cell
-            return (curr_x, curr_y), collided_wall, collided_enemy
-    return (x + direction[0]*max_distance, y + direction[1]*max_distance), collided_wall, collided_enemy
-
-def update_laser_effects():
-    current_time = time.time()
-    if "laser_effects" in game_state:
-        game_state["laser_effects"] = [
-            laser for laser in game_state["laser_effects"]
-            if current_time - laser["created_at"] < laser["duration"]
-        ]
 
 def draw_laser_effects(screen):
-    import math
     if "laser_effects" not in game_state:
         return
-    # 加载采样图，并放大至 64×4（16×1 原始采样放大4倍）
-    sample_img = load_scaled_image("sample/skill/marisa/thinlaser.png", (64, 4))
     for laser in game_state["laser_effects"]:
         start_pos = laser["start_pos"]
         end_pos = laser["end_pos"]
         dx = end_pos[0] - start_pos[0]
         dy = end_pos[1] - start_pos[1]
         beam_length = math.sqrt(dx*dx + dy*dy)
-        # 计算旋转角度，使采样图的正上方与激光方向对齐
-        angle = -math.degrees(math.atan2(laser["direction"][0], -laser["direction"][1]))
-        rotated_img = pygame.transform.rotate(sample_img, angle)
-        # 沿直线以 1 像素步长绘制，确保连续无空隙
-        for d in range(0, int(beam_length) + 1):
-            pos_x = start_pos[0] + laser["direction"][0] * d
-            pos_y = start_pos[1] + laser["direction"][1] * d
-            rect = rotated_img.get_rect(center=(int(pos_x), int(pos_y)))
-            screen.blit(rotated_img, rect)
+        # 整条激光由缓存的光束 Surface 一次绘制（采样图 16×1 放大至 64×4）
+        mark_dirty(draw_beam(screen, THIN_LASER_BRUSH, start_pos, laser["direction"], beam_length))
 
 
 
 
+BULLET_SPRITES = {
+    "normal": "sample/skill/reimu/yinyangorb.png",
+    1: "sample/skill/reimu/reimuneedle.png",
+    2: "sample/skill/reimu/reimuamulet.png"
+}
+
+# 各技能子弹按朝向分桶排列的旋转图像，首次用到时从 rotation_cache 取出
+bullet_rotations = {}
+
 def draw_bullets(screen):
-    import math
-    for bullet in game_state["bullets"]:
-        # 如果是魔理沙的普通攻击激光
-        if bullet.get("skill") == "normal" and game_state["players"][bullet["owner"]]["character"] == "marisa":
-            # 加载采样图并放大4倍：原始 16×1 变为 64×4
-            sample_img = load_scaled_image("sample/skill/marisa/thinlaser.png", (64, 4))
-            # 计算旋转角度：采样图默认“指向上方”，根据子弹方向旋转
-            angle = -math.degrees(math.atan2(bullet["direction"][0], -bullet["direction"][1]))
-            rotated_img = pygame.transform.rotate(sample_img, angle)
-            # 从激光起点到尖端
-            start_pos = bullet["start_pos"]
-            tip = bullet["pos"]
-            dx = tip[0] - start_pos[0]
-            dy = tip[1] - start_pos[1]
-            beam_length = math.sqrt(dx*dx + dy*dy)
-            # 沿激光方向每隔1像素铺贴一次采样图（保证无空隙）
-            for d in range(0, int(beam_length) + 1):
-                pos_x = start_pos[0] + bullet["direction"][0] * d
-                pos_y = start_pos[1] + bullet["direction"][1] * d
-                rect = rotated_img.get_rect(center=(int(pos_x), int(pos_y)))
-                screen.blit(rotated_img, rect)
-        else:
-            # 其他技能子弹或角色（如灵梦）的绘制逻辑保持原有方式
-            if bullet.get("skill") == "normal":
-                bullet_img = load_scaled_image("sample/skill/reimu/yinyangorb.png", (40, 40))
-            elif bullet.get("skill") == 1:
-                bullet_img = load_scaled_image("sample/skill/reimu/reimuneedle.png", (40, 40))
-            elif bullet.get("skill") == 2:
-                bullet_img = load_scaled_image("sample/skill/reimu/reimuamulet.png", (40, 40))
-            else:
-                bullet_img = load_scaled_image("sample/skill/reimu/default_bullet.png", (40, 40))
-            angle = -math.degrees(math.atan2(bullet["direction"][0], -bullet["direction"][1]))
-            rotated_bullet = pygame.transform.rotate(bullet_img, angle)
-            rect = rotated_bullet.get_rect(center=(int(bullet["pos"][0]), int(bullet["pos"][1])))
-            screen.blit(rotated_bullet, rect)
+    """
+    绘制子弹池中的全部子弹（位置在上一模拟步与当前步之间插值）。
+    子弹池在出膛时算好朝向分桶，每帧按分桶直接取出旋转图像，不再求角度或查询 LRU；
+    魔理沙的普通攻击是瞬时激光，由 draw_laser_effects 绘制。
+    """
+    for pos, heading, skill, owner in engine.projectiles.render_list(sim_clock.alpha):
+        rotations = bullet_rotations.get(skill)
+        if rotations is None:
+            rotations = bullet_rotations[skill] = [None] * ROTATION_BUCKETS
+        rotated_bullet = rotations[heading]
+        if rotated_bullet is None:
+            path = BULLET_SPRITES.get(skill, "sample/skill/reimu/default_bullet.png")
+            rotated_bullet = rotations[heading] = get_bucket_sprite(path, (40, 40), heading)
+        rect = rotated_bullet.get_rect(center=(int(pos[0]), int(pos[1])))
+        mark_dirty(screen.blit(rotated_bullet, rect))
 
 
 
@@ -738,8 +806,9 @@ def draw_mouse_indicator(screen):
     # 檢查是否左鍵按下
     left_pressed = pygame.mouse.get_pressed()[0]
     thickness = 3 if left_pressed else 1
-    # 繪製黑色邊框
+    # 繪製黑色邊框（該格所有指示器都畫在此範圍內）
     pygame.draw.rect(screen, COLORS["BLACK"], rect, thickness)
+    mark_dirty(rect)
 
 def draw_nondirectional_laser_indicator(screen):
     """
@@ -756,6 +825,63 @@ def draw_nondirectional_laser_indicator(screen):
 
 
 
+# 5.4.2 射程范围
+# 移动、建造与闪现的可达格子以位掩码（见 voyage.bitboard）预先算好，
+# 只有手控单位/敌方位置、灵力输入或墙体布局变化时才重新计算；
+# 同时为每种范围生成一张半透明覆盖层，瞄准时整片显示可达区域。
+RANGE_OVERLAY_COLOR = (255, 255, 255, 48)
+
+range_state = {
+    "key": None,      # 计算范围时的状态
+    "masks": {},      # kind -> 可达格子掩码
+    "overlays": {}    # kind -> 半透明覆盖层
+}
+
+def range_key():
+    """影响可达范围的全部状态"""
+    return (
+        tuple(map_layout["start_positions"]),
+        game_state["current_mana_input"],
+        map_layout["walls"].version
+    )
+
+def range_targets(kind):
+    """
+    手控单位的可达格子掩码：
+      - "move"：移动半径内、无墙体且无其他角色的格子；
+      - "build"：灵力输入为半径、无墙体且无单位的格子；
+      - "teleport"：灵力输入为半径、无墙体的格子（不含自机所在格）。
+    """
+    key = range_key()
+    if key != range_state["key"]:
+        range_state["key"] = key
+        range_state["masks"] = {}
+        range_state["overlays"] = {}
+    masks = range_state["masks"]
+    if kind not in masks:
+        mana_input = game_state["current_mana_input"]
+        if kind == "move":
+            masks[kind] = engine.move_targets(MANUAL_PLAYER)
+        elif kind == "build":
+            masks[kind] = engine.build_targets(MANUAL_PLAYER, mana_input)
+        else:
+            masks[kind] = engine.teleport_targets(MANUAL_PLAYER, mana_input)
+    return masks[kind]
+
+def is_range_target(kind, cell):
+    return engine.board.contains(range_targets(kind), cell)
+
+def draw_range_overlay(screen, kind):
+    """整片绘制可达区域；覆盖层按范围缓存，状态不变时每帧只需一次 blit"""
+    mask = range_targets(kind)
+    overlay = range_state["overlays"].get(kind)
+    if overlay is None:
+        overlay = pygame.Surface((MAP_WIDTH * GRID_SIZE, MAP_HEIGHT * GRID_SIZE), pygame.SRCALPHA)
+        for x, y in engine.board.cells(mask):
+            overlay.fill(RANGE_OVERLAY_COLOR, (x * GRID_SIZE, y * GRID_SIZE, GRID_SIZE, GRID_SIZE))
+        range_state["overlays"][kind] = overlay
+    screen.blit(overlay, (0, 0))
+
 def draw_teleport_indicator(screen):
     """
     繪製技能4（瞬間移動）指示器：
@@ -765,86 +891,59 @@ def draw_teleport_indicator(screen):
     if game_state.get("aiming", False) and game_state.get("selected_skill") == 4:
         mouse_pos = pygame.mouse.get_pos()
         target_cell = (mouse_pos[0] // GRID_SIZE, mouse_pos[1] // GRID_SIZE)
-        start_cell = map_layout["start_positions"][CONTROLLED_INDEX]
-        dx = target_cell[0] - start_cell[0]
-        dy = target_cell[1] - start_cell[1]
-        allowed = game_state["current_mana_input"]
-        valid = True
-        if max(abs(dx), abs(dy)) > allowed or (dx == 0 and dy == 0):
-            valid = False
-        if target_cell[0] < 0 or target_cell[0] >= MAP_WIDTH or target_cell[1] < 0 or target_cell[1] >= MAP_HEIGHT:
-            valid = False
-        if target_cell in map_layout["walls"]:
-            valid = False
-        color = COLORS["WHITE"] if valid else COLORS["RED"]
+        color = COLORS["WHITE"] if is_range_target("teleport", target_cell) else COLORS["RED"]
         rect = pygame.Rect(target_cell[0] * GRID_SIZE, target_cell[1] * GRID_SIZE, GRID_SIZE, GRID_SIZE)
         pygame.draw.rect(screen, color, rect, 3)
 
 def draw_teleport_line(screen):
     """
     繪製技能4瞬間移動的瞄準線：
-      - 從自機中心指向滑鼠當前所在格的中心。
-      - 若目標格在允許移動範圍內（Chebyshev 距離 <= current_mana_input），線條顏色為白色；
-        否則為紅色。
+      - 從自機中心指向滑鼠當前所在格的中心，整片可閃現區域以半透明覆蓋。
+      - 若目標格可以閃現（與指示器判定相同），線條顏色為白色；否則為紅色。
     """
     if game_state.get("aiming", False) and game_state.get("selected_skill") == 4:
+        draw_range_overlay(screen, "teleport")
         mouse_pos = pygame.mouse.get_pos()
         target_cell = (mouse_pos[0] // GRID_SIZE, mouse_pos[1] // GRID_SIZE)
         start_cell = map_layout["start_positions"][CONTROLLED_INDEX]
-        dx = target_cell[0] - start_cell[0]
-        dy = target_cell[1] - start_cell[1]
-        allowed = game_state["current_mana_input"]
-        # 判斷目標格是否在允許範圍內：使用 Chebyshev 距離判斷
-        color = COLORS["WHITE"] if max(abs(dx), abs(dy)) <= allowed else COLORS["RED"]
+        color = COLORS["WHITE"] if is_range_target("teleport", target_cell) else COLORS["RED"]
         start_center = (start_cell[0] * GRID_SIZE + GRID_SIZE // 2,
                         start_cell[1] * GRID_SIZE + GRID_SIZE // 2)
         target_center = (target_cell[0] * GRID_SIZE + GRID_SIZE // 2,
                          target_cell[1] * GRID_SIZE + GRID_SIZE // 2)
-        pygame.draw.line(screen, color, start_center, target_center, 3)
+        mark_dirty(pygame.draw.line(screen, color, start_center, target_center, 3))
 
 def draw_build_indicator(screen):
     """
     繪製建造指示器：
-      - 當處於建造模式時，以當前機體所在格為中心，
+      - 當處於建造模式時，以當前機體所在格為中心，整片可建造區域以半透明覆蓋；
       - 根據滑鼠當前所在的整數格判定：若目標格在允許建造範圍內（Chebyshev 距離 <= game_state["current_mana_input"]
-        且目標格不為機體所在格）、位於地圖內且未有牆體，則指示器為白色；否則為紅色。
+        且目標格不為機體所在格）、位於地圖內且沒有牆體或機體，則指示器為白色；否則為紅色。
     """
     if game_state.get("building", False):
+        draw_range_overlay(screen, "build")
         mouse_pos = pygame.mouse.get_pos()
         target_cell = (mouse_pos[0] // GRID_SIZE, mouse_pos[1] // GRID_SIZE)
-        center_cell = map_layout["start_positions"][CONTROLLED_INDEX]
-        dx = target_cell[0] - center_cell[0]
-        dy = target_cell[1] - center_cell[1]
-        allowed = game_state.get("current_mana_input", 0)
-        valid = True
-        # 判定範圍：若超過 allowed 或目標格為中心則視為不合法
-        if allowed <= 0 or max(abs(dx), abs(dy)) > allowed or (dx == 0 and dy == 0):
-            valid = False
-        # 判定是否在地圖內
-        if target_cell[0] < 0 or target_cell[0] >= MAP_WIDTH or target_cell[1] < 0 or target_cell[1] >= MAP_HEIGHT:
-            valid = False
-        # 判定目標格是否已有牆體
-        if target_cell in map_layout["walls"]:
-            valid = False
-        color = COLORS["WHITE"] if valid else COLORS["RED"]
+        color = COLORS["WHITE"] if is_range_target("build", target_cell) else COLORS["RED"]
         rect = pygame.Rect(target_cell[0] * GRID_SIZE, target_cell[1] * GRID_SIZE, GRID_SIZE, GRID_SIZE)
         pygame.draw.rect(screen, color, rect, 3)
 
 def draw_vision_indicator(screen):
     """
-    當存在視野提升效果（vision_boost）時，
+    當手控玩家自己施放的視野提升效果（vision_boost）存在時，
     根據 vision_boost["remaining"] 顯示視野指示器：
       - 若 remaining 在 1 到 10 之間，使用 no1.png 至 no10.png；
       - 否則使用 no.png。
     指示器被放大至單元格大小，並顯示在機體正上方一格的位置。
     """
-    if "vision_boost" in game_state:
-        remaining = game_state["vision_boost"]["remaining"]
+    boost = engine.vision_boost(MANUAL_PLAYER)
+    if boost:
+        remaining = boost["remaining"]
         if 1 <= remaining <= 10:
             path = os.path.join("sample", "number", f"no{remaining}.png")
         else:
             path = os.path.join("sample", "number", "no.png")
-        indicator_img = load_scaled_image(path, (GRID_SIZE, GRID_SIZE))
+        indicator_img = load_scaled_image(path, (GRID_SIZE, GRID_SIZE), "alpha")
         unit_cell = map_layout["start_positions"][CONTROLLED_INDEX]  # 玩家所在格，根据测试变量自动切换
 
         pos_x = unit_cell[0] * GRID_SIZE
@@ -862,7 +961,8 @@ def handle_input(event):
     """
     處理所有使用者輸入，包括機體移動、技能瞄準、普通攻擊、建造與技能3（策法「陰陽寶玉」）。
     全局右鍵點擊（event.button == 3）取消所有選擇。
-    僅允許當前回合的玩家（P1）操作，行動完成後自動結算公告並切換回合。
+    僅允許當前回合的玩家（P1）操作；點擊被翻譯為行動交給 engine 結算，
+    公告與回合切換由 engine 完成。
     """
     # 若当前回合不是手动玩家，则直接返回
     if game_state["current_turn"]["active_player"] != MANUAL_PLAYER:
@@ -872,13 +972,6 @@ def handle_input(event):
     current_player = game_state["current_turn"]["active_player"]
     character = game_state["players"][current_player]["character"]
 
-    # 后续逻辑中就可以直接使用 current_player 和 character 了
-    # …（例如处理鼠标点击、移动、攻击等逻辑）
-    # 若當前回合不是 P1，則忽略 P1 輸入
-
-    
-
-
     # 全局右鍵取消所有狀態
     if event.type == pygame.MOUSEBUTTONDOWN and event.button == 3:
         game_state["moving"] = False
@@ -896,20 +989,12 @@ def handle_input(event):
     target_cell = (grid_x, grid_y)
     unit_cell = map_layout["start_positions"][CONTROLLED_INDEX]  # 玩家所在格
     unit_rect = pygame.Rect(unit_cell[0]*GRID_SIZE, unit_cell[1]*GRID_SIZE, GRID_SIZE, GRID_SIZE)
-    
-        
 
-    # ------------------ 侦察模式 ------------------
-    # 技能侦察：点击 (0,9) 触发
-
-    
-    
-    # ---------------- 新增：技能购买逻辑（仅左键点击触发） ----------------
+    # ---------------- 技能购买逻辑（仅左键点击触发） ----------------
     if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
         if target_cell in SKILL_POSITIONS:
             # 根据点击位置确定技能编号（1~4）
             skill_number = SKILL_POSITIONS.index(target_cell) + 1
-            current_player = game_state["current_turn"]["active_player"]
             # 如果该技能已经解锁，则直接进入技能使用流程
             if game_state["unlocked_skills"][current_player][skill_number]:
                 game_state["selected_skill"] = skill_number
@@ -921,205 +1006,47 @@ def handle_input(event):
                 game_state["skill_purchase_pending"] = skill_number
                 return
             else:
-                # 第二次点击：确认购买，检查金币是否充足
-                if PLAYER_STATS[current_player]["gold"] >= SKILL_COST:
-                    PLAYER_STATS[current_player]["gold"] -= SKILL_COST
-                    game_state["unlocked_skills"][current_player][skill_number] = True
-                    add_announcement(f"{game_state['players'][current_player]['character']} 解锁技能 {SKILL_INFO[target_cell][0]}")
-                else:
-                    add_announcement("金币不足，无法购买技能")
+                # 第二次点击：确认购买，金币是否充足由 engine 检查
+                for engine_event in apply_action(BuySkill(skill_number)):
+                    if engine_event["type"] == "skill_unlocked":
+                        engine.add_announcement(f"{character} 解锁技能 {SKILL_INFO[target_cell][0]}")
                 # 清除待购买状态
                 game_state["skill_purchase_pending"] = None
                 return
 
+    # ------------------ 魔理沙非定向激光（技能2） ------------------
     if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-        if game_state.get("selected_skill") == 2:
-            # 计算点击的单元格坐标
-            grid_x = mouse_pos[0] // GRID_SIZE
-            grid_y = mouse_pos[1] // GRID_SIZE
-            target_cell = (grid_x, grid_y)
+        if game_state.get("selected_skill") == 2 and character == "marisa":
             # 仅检查是否在地图范围内
             if grid_x < 0 or grid_x >= MAP_WIDTH or grid_y < 0 or grid_y >= MAP_HEIGHT:
                 return
-
-            current_player = game_state["current_turn"]["active_player"]
-            character = game_state["players"][current_player]["character"]
-            if character == "marisa":
-                # 固定消耗2灵力
-                if PLAYER_STATS[current_player]["mana"] < 2:
-                    add_announcement("灵力不足，无法释放激光")
-                    game_state["selected_skill"] = None
-                    return
-                PLAYER_STATS[current_player]["mana"] -= 2
-
-                damage = 1  # 激光伤害固定1
-
-                # 对目标行上所有单元格进行墙体伤害处理
-                for x in range(MAP_WIDTH):
-                    cell = (x, grid_y)
-                    if cell in map_layout["walls"]:
-                        wall_health[cell] -= damage
-                        if wall_health[cell] <= 0:
-                            N = wall_total.get(cell, 5)
-                            PLAYER_STATS[current_player]["gold"] += 4 * N
-                            map_layout["walls"].remove(cell)
-                # 对目标列上进行处理
-                for y in range(MAP_HEIGHT):
-                    cell = (grid_x, y)
-                    if cell in map_layout["walls"]:
-                        wall_health[cell] -= damage
-                        if wall_health[cell] <= 0:
-                            N = wall_total.get(cell, 5)
-                            PLAYER_STATS[current_player]["gold"] += 4 * N
-                            map_layout["walls"].remove(cell)
-                # 敌方处理：若敌方机体在目标行或列上
-                enemy_id = AUTO_PLAYER if current_player == MANUAL_PLAYER else MANUAL_PLAYER
-                enemy_cell = map_layout["start_positions"][ENEMY_INDEX if current_player == MANUAL_PLAYER else CONTROLLED_INDEX]
-                if enemy_cell[0] == grid_x or enemy_cell[1] == grid_y:
-                    PLAYER_STATS[enemy_id]["hp"] -= damage
-
-                # 记录激光视觉效果对象，持续500毫秒（0.5秒）
-                game_state["non_directional_laser_effect"] = {
-                    "target_cell": target_cell,
-                    "created_at": time.time(),
-                    "duration": 0.5  # 单位：秒
-                }
-                # 记录视野暴露标记：这里根据全图流要求，可设置为全局暴露（你也可以不设置，让激光效果本身决定视觉效果）
-                game_state["laser_reveal"] = target_cell
-
-                add_announcement("魔理沙釋放了激光")
-                finish_turn("non_directional_laser")
-                game_state["selected_skill"] = None
-                return
-
-
-
-
+            # 固定消耗2灵力；灵力不足时 engine 只发出公告
+            apply_action(Laser(target_cell))
+            game_state["selected_skill"] = None
+            return
 
     # ------------------ 普通攻擊判斷 ------------------
     if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-        if ((target_cell in map_layout["walls"]) or 
+        if ((target_cell in map_layout["walls"]) or
             (target_cell in map_layout["start_positions"] and target_cell != unit_cell)):
-            dx = grid_x - unit_cell[0]
-            dy = grid_y - unit_cell[1]
-            if max(abs(dx), abs(dy)) <= MOVEMENT_RADIUS:
-                current_player = game_state["current_turn"]["active_player"]
-                character = game_state["players"][current_player]["character"]
-            # 在普通攻击的分支中（当角色为魔理沙时）
-            if character == "marisa":
-                attack_power = 2
-                PLAYER_STATS[current_player]["attack"] = 2
-
-                start_pixel = (unit_cell[0]*GRID_SIZE + GRID_SIZE//2, unit_cell[1]*GRID_SIZE + GRID_SIZE//2)
-                target_center = (grid_x*GRID_SIZE + GRID_SIZE//2, grid_y*GRID_SIZE + GRID_SIZE//2)
-                dx_pixel = target_center[0] - start_pixel[0]
-                dy_pixel = target_center[1] - start_pixel[1]
-                length = math.sqrt(dx_pixel**2 + dy_pixel**2)
-                if length != 0:
-                    direction = (dx_pixel/length, dy_pixel/length)
-                    # 使用 cast_laser 投射激光，获得终点
-                    end_pos, collided_wall, collided_enemy = cast_laser(start_pixel, direction)
-                    
-                    # 创建激光效果对象，记录起点、终点、方向、创建时间及持续时间（单位：毫秒）
-                    laser_effect = {
-                        "start_pos": start_pixel,
-                        "end_pos": end_pos,
-                        "direction": direction,
-                        "created_at": time.time(),
-                        "duration": 500,  # 激光显示200毫秒
-                        "owner": current_player,
-                    }
-                    if "laser_effects" not in game_state:
-                        game_state["laser_effects"] = []
-                    game_state["laser_effects"].append(laser_effect)
-                    
-                    # 设置一次性定时器事件，200毫秒后触发清除激光效果
-                    pygame.time.set_timer(LASER_CLEAR_EVENT, laser_effect["duration"], True)
-                    
-                    # 对墙体或敌人进行伤害处理（逻辑与之前保持一致）
-                    if collided_wall:
-                        wall_health[collided_wall] -= attack_power
-                        if wall_health[collided_wall] <= 0:
-                            N = wall_total.get(collided_wall, 5)
-                            PLAYER_STATS[current_player]["gold"] += 4 * N
-                            map_layout["walls"].remove(collided_wall)
-                    if collided_enemy:
-                        enemy_id = AUTO_PLAYER if current_player == MANUAL_PLAYER else MANUAL_PLAYER
-                        PLAYER_STATS[enemy_id]["hp"] -= attack_power
-
-                    add_announcement(f"{game_state['players'][current_player]['character']} 發動了普通攻擊")
-                    finish_turn("normal")
-                    return
-                else:
-                    # 非魔理沙角色（例如灵梦）继续原有的子弹逻辑……
-                    num_bullets = PLAYER_STATS[current_player]["attack"]
-                    start_pixel = (unit_cell[0]*GRID_SIZE + GRID_SIZE//2, unit_cell[1]*GRID_SIZE + GRID_SIZE//2)
-                    target_center = (grid_x*GRID_SIZE + GRID_SIZE//2, grid_y*GRID_SIZE + GRID_SIZE//2)
-                    dx_pixel = target_center[0] - start_pixel[0]
-                    dy_pixel = target_center[1] - start_pixel[1]
-                    length = math.sqrt(dx_pixel**2 + dy_pixel**2)
-                    if length != 0:
-                        direction = (dx_pixel/length, dy_pixel/length)
-                        bullet_speed = (GRID_SIZE/8)/2
-                        bullets = [{
-                            "pos": (start_pixel[0], start_pixel[1]),
-                            "direction": direction,
-                            "speed": bullet_speed,
-                            "skill": "normal",
-                            "owner": current_player
-                        } for _ in range(num_bullets)]
-                        game_state["bullet_queue"].extend(bullets)
-                        add_announcement(f"{game_state['players'][current_player]['character']} 發動了普通攻擊")
-                        finish_turn("normal")
-                        return
-
+            # 魔理沙發射瞬時激光；灵梦的普通攻击不在此处触发
+            if character == "marisa" and apply_action(NormalAttack(target_cell)):
+                return
 
     # ------------------ 移動模式 ------------------
     if game_state.get("moving", False):
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-            dx = grid_x - unit_cell[0]
-            dy = grid_y - unit_cell[1]
-            if grid_x < 0 or grid_x >= MAP_WIDTH or grid_y < 0 or grid_y >= MAP_HEIGHT:
-                pass
-            elif target_cell in map_layout["walls"]:
-                pass
-            # 若目標格屬於其他角色（敵方），則移動無效（普通攻擊已處理）
-            elif (target_cell in map_layout["start_positions"]) and (target_cell != unit_cell):
-                pass
-            elif max(abs(dx), abs(dy)) <= MOVEMENT_RADIUS and (dx != 0 or dy != 0):
-                map_layout["start_positions"][CONTROLLED_INDEX] = (grid_x, grid_y)
-                if dx == 0 or dy == 0:
-                    PLAYER_STATS[MANUAL_PLAYER]["mana"] += 1
+            # 越界、墙体、敌方所在格或超出移动半径时 engine 不执行移动
+            if apply_action(Move(target_cell)):
                 game_state["moving"] = False
-                add_announcement(f"{P1_character} 進行了移動")
-                finish_turn("move")
-            else:
-                pass
         return
 
     # ------------------ 建造模式 ------------------
     if game_state.get("building", False):
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-            center_cell = unit_cell  # 以玩家当前所在格为中心
-            dx = grid_x - center_cell[0]
-            dy = grid_y - center_cell[1]
-            if grid_x < 0 or grid_x >= MAP_WIDTH or grid_y < 0 or grid_y >= MAP_HEIGHT:
-                pass
-            elif target_cell in map_layout["walls"]:
-                pass
-            elif target_cell in map_layout["start_positions"]:
-                pass
-            elif max(abs(dx), abs(dy)) <= game_state["current_mana_input"] and not (dx == 0 and dy == 0):
-                if PLAYER_STATS[MANUAL_PLAYER]["mana"] >= game_state["current_mana_input"]:
-                    mana_used = game_state["current_mana_input"]
-                    PLAYER_STATS[MANUAL_PLAYER]["mana"] -= mana_used
-                    map_layout["walls"].append(target_cell)
-                    wall_health[target_cell] = mana_used
-                    wall_total[target_cell] = mana_used
+            # 以玩家当前所在格为中心；无论建造是否成功都结束回合
+            apply_action(Build(target_cell, game_state["current_mana_input"]))
             game_state["building"] = False
-            add_announcement(f"{P1_character} 進行了建造")
-            finish_turn("build")
-
 
     # ------------------ 技能及其他操作 ------------------
     if event.type == pygame.MOUSEMOTION:
@@ -1131,54 +1058,31 @@ def handle_input(event):
                     game_state["hovered_skill"] = i
                     break
     elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-        # 【修改說明】：技能3（策法「陰陽寶玉」）直接觸發，不需點選機體
+        # 技能3（策法「陰陽寶玉」）直接觸發，不需點選機體
         if game_state.get("hovered_skill") == 3:
             if game_state.get("current_mana_input", 0) > 0:
                 game_state["selected_skill"] = 3
-                if PLAYER_STATS[MANUAL_PLAYER]["mana"] >= game_state["current_mana_input"]:
-                    mana_used = game_state["current_mana_input"]
-                    PLAYER_STATS[MANUAL_PLAYER]["mana"] -= mana_used
-                    # 設定視野提升效果：持續回合數和擴展視野半徑均為 mana_used
-                    game_state["vision_boost"] = {"remaining": mana_used, "radius": mana_used}
-                    add_announcement(f"策法：「陰陽寶玉」\n靈夢獲得了\n半徑為[{mana_used}]的視野")
-                    finish_turn("vision", extra_info=str(mana_used))
+                apply_action(Vision(game_state["current_mana_input"]))
                 game_state["selected_skill"] = None
             return
 
-        # 以下其他技能分支保持不變……
-        # （此處省略其他技能分支，請保留原有處理邏輯）
-
-
-
-
         # 若點擊在建造按鈕 (0,10)，則進入建造模式
         if (grid_x, grid_y) == (0, 10) and game_state.get("current_mana_input", 0) > 0:
             game_state["building"] = True
             return
         # ------------------ 侦察模式 ------------------
-        # 技能侦察：点击 (0,9) 触发
+        # 技能侦察：点击 (0,9) 触发，固定消耗 1 点灵力
         if (grid_x, grid_y) == (0, 9):
-            # 每次点击前先清除之前的侦察效果，防止残留
-            if "recon_position" in game_state:
-                del game_state["recon_position"]
-            # 检查手控玩家的灵力（固定消耗 1 点灵力，非 current_mana_input 判断）
-            if PLAYER_STATS[MANUAL_PLAYER]["mana"] >= 1:
-                PLAYER_STATS[MANUAL_PLAYER]["mana"] -= 1
-                # 将敌方单位位置（由 ENEMY_INDEX 确定）记录为侦察目标
-                game_state["recon_position"] = map_layout["start_positions"][ENEMY_INDEX]
-                add_announcement("偵察：敵方機體位置已暴露1回合")
-                finish_turn("scout")
+            apply_action(Scout())
             return
 
-
-
         # 若點擊在自己的機體上則進入移動模式
         if unit_rect.collidepoint(mouse_pos):
             game_state["moving"] = True
             game_state["aiming"] = False
             return
 
-        # 其餘技能（技能1、2、4）處理不變
+        # 其餘技能（技能1、2、4）
         if game_state.get("aiming", False):
             start_pixel = (unit_cell[0]*GRID_SIZE + GRID_SIZE//2, unit_cell[1]*GRID_SIZE + GRID_SIZE//2)
             mouse_pixel = pygame.mouse.get_pos()
@@ -1188,42 +1092,17 @@ def handle_input(event):
                 return
             length = (dx_pixel**2 + dy_pixel**2)**0.5
             direction = (dx_pixel/length, dy_pixel/length)
+            mana_input = game_state["current_mana_input"]
             # 技能1：霰術「Persuasion Needle」
-            if game_state["selected_skill"] == 1 and game_state["current_mana_input"] > 0:
-                if PLAYER_STATS[MANUAL_PLAYER]["mana"] >= game_state["current_mana_input"]:
-                    PLAYER_STATS[MANUAL_PLAYER]["mana"] -= game_state["current_mana_input"]
-                    game_state["bullet_queue"] = [{
-                        "pos": (start_pixel[0], start_pixel[1]),
-                        "direction": direction,
-                        "speed": GRID_SIZE//8,
-                        "skill": 1,
-                        "owner": game_state["current_turn"]["active_player"]  # 添加子弹归属
-  
-                    } for _ in range(game_state["current_mana_input"])]
+            if game_state["selected_skill"] == 1 and mana_input > 0:
+                if ended_turn(apply_action(Needle(direction, mana_input))):
                     game_state["current_mana_input"] = 0
-                    add_announcement("霰術：「Persuasion Needle」\n靈夢發射了封魔針")
-                    finish_turn("needle")
             # 技能2：霊耗「Homing Amulet」
             elif game_state["selected_skill"] == 2:
-                if PLAYER_STATS[MANUAL_PLAYER]["mana"] >= 1:
-                    PLAYER_STATS[MANUAL_PLAYER]["mana"] -= 1
-                    game_state["bullet_queue"].append({
-                        "pos": (start_pixel[0], start_pixel[1]),
-                        "direction": direction,
-                        "speed": GRID_SIZE//8,
-                        "skill": 2,
-                        "owner": game_state["current_turn"]["active_player"]
-                    })
-                    add_announcement("霊耗：「Homing Amulet」\n靈夢發射了符札")
-                    finish_turn("amulet")
+                apply_action(Amulet(direction))
             # 技能4：秘奧「G Free」
-            elif game_state["selected_skill"] == 4 and game_state["current_mana_input"] > 0:
-                if PLAYER_STATS[MANUAL_PLAYER]["mana"] >= game_state["current_mana_input"]:
-                    mana_used = game_state["current_mana_input"]
-                    PLAYER_STATS[MANUAL_PLAYER]["mana"] -= mana_used
-                    map_layout["start_positions"][CONTROLLED_INDEX] = (grid_x, grid_y)
-                    add_announcement(f"秘奧：「G Free」\n靈夢閃現到了半徑為[{mana_used}]內的一格")
-                    finish_turn("teleport", extra_info=str(mana_used))
+            elif game_state["selected_skill"] == 4 and mana_input > 0:
+                apply_action(Teleport(target_cell, mana_input))
             game_state["aiming"] = False
             game_state["selected_skill"] = None
         else:
@@ -1246,46 +1125,127 @@ def handle_input(event):
                 game_state["current_mana_input"] = min(max_mana, game_state["current_mana_input"] + 1)
 
 
-
-
-
-
-
-
 def draw_movement_indicator(screen):
     """
-    繪製機體移動指示器：
+    繪製機體移動指示器（整片可移動區域以半透明覆蓋）：
       - 若滑鼠所在格超出允許移動範圍（MOVEMENT_RADIUS）則顯示黑色；
       - 若在範圍內但該格被「實體」佔據（牆體或其他角色，除自己外）則顯示紅色；
       - 若在範圍內且可移動，則顯示白色。
     """
     if game_state.get("moving", False):
+        draw_range_overlay(screen, "move")
         mouse_pos = pygame.mouse.get_pos()
         target_cell = (mouse_pos[0] // GRID_SIZE, mouse_pos[1] // GRID_SIZE)
         unit_cell = map_layout["start_positions"][CONTROLLED_INDEX]  # 玩家當前位置
-        dx = target_cell[0] - unit_cell[0]
-        dy = target_cell[1] - unit_cell[1]
-        
-        # 如果超出地圖邊界，視為無效，顯示黑色
-        if target_cell[0] < 0 or target_cell[0] >= MAP_WIDTH or target_cell[1] < 0 or target_cell[1] >= MAP_HEIGHT:
-            color = COLORS["BLACK"]
-        # 超出允許移動範圍（或為原地）則顯示黑色
-        elif max(abs(dx), abs(dy)) > MOVEMENT_RADIUS or (dx == 0 and dy == 0):
-            color = COLORS["BLACK"]
+        # 移動半徑內的地圖格（不含原地）
+        in_range = engine.board.chebyshev(unit_cell, MOVEMENT_RADIUS) & ~engine.board.bit(unit_cell)
+        if is_range_target("move", target_cell):
+            color = COLORS["WHITE"]
+        elif engine.board.contains(in_range, target_cell):
+            color = COLORS["RED"]
         else:
-            # 如果該格被牆體或其他角色佔據（除了自己），則顯示紅色
-            if target_cell in map_layout["walls"] or (target_cell in map_layout["start_positions"] and target_cell != unit_cell):
-                color = COLORS["RED"]
-            else:
-                color = COLORS["WHITE"]
+            color = COLORS["BLACK"]
         rect = pygame.Rect(target_cell[0] * GRID_SIZE, target_cell[1] * GRID_SIZE, GRID_SIZE, GRID_SIZE)
         pygame.draw.rect(screen, color, rect, 3)
 
 
 
 
+# 6. 脏矩形刷新
+# 每帧仍在后台缓冲区完整绘制，但只把变化的区域提交给显示器：
+#   - 鼠标所在格（各指示器都画在该格内）、瞄准线、子弹与光束由绘制函数 mark_dirty；
+#   - 悬停格变化时，信息面板的坐标/悬停区域随之刷新；
+#   - 本帧的区域与上一帧的区域一起提交，以擦除移走的内容；
+#   - 场景签名（回合、单位、地形、迷雾、面板内容、技能栏状态等）变化，或脏区域总面积
+#     超过窗口的 DIRTY_FULL_FLIP_RATIO 时，退回整屏 flip。
+DIRTY_FULL_FLIP_RATIO = 0.5
+
+frame_dirty = {
+    "rects": [],         # 本帧变化的区域
+    "previous": [],      # 上一帧变化的区域
+    "signature": None,   # 上一帧的场景签名
+    "hover_cell": None   # 上一帧鼠标所在格
+}
+
+def mark_dirty(rect):
+    """登记本帧发生变化的屏幕区域，返回 rect 方便链式调用"""
+    frame_dirty["rects"].append(pygame.Rect(rect))
+    return rect
+
+def mark_hover_dirty(mouse_pos):
+    """悬停格变化时刷新信息面板上方的坐标与悬停信息区域"""
+    cell = (mouse_pos[0] // GRID_SIZE, mouse_pos[1] // GRID_SIZE)
+    if cell != frame_dirty["hover_cell"]:
+        frame_dirty["hover_cell"] = cell
+        mark_dirty(pygame.Rect(MAP_WIDTH * GRID_SIZE, 0, INFOBAR_WIDTH, WINDOW_HEIGHT // 3))
+
+def scene_signature():
+    """除鼠标悬停与子弹以外，所有影响画面的状态；变化时需要整屏刷新"""
+    current_player = game_state["current_turn"]["active_player"]
+    return (
+        game_state["current_turn"]["turn_number"],
+        current_player,
+        tuple(map_layout["start_positions"]),
+        terrain_layer["version"],
+        fog_state["key"],
+        tuple(game_state["game_logs"][-5:]),
+        tuple(PLAYER_STATS[MANUAL_PLAYER].values()),
+        tuple(game_state["unlocked_skills"][current_player].values()),
+        game_state["selected_skill"],
+        game_state["hovered_skill"],
+        game_state["skill_purchase_pending"],
+        game_state["current_mana_input"],
+        game_state["selected_character"],
+        game_state.get("aiming", False),
+        game_state.get("building", False),
+        game_state.get("moving", False),
+        (engine.vision_boost(MANUAL_PLAYER) or {}).get("remaining"),
+        len(game_state.get("laser_effects", [])),
+        "non_directional_laser_effect" in game_state
+    )
+
+def present_frame(full_redraw=False):
+    """把本帧画面提交给显示器：变化不大时 display.update(rects)，否则整屏 flip"""
+    signature = scene_signature()
+    rects = frame_dirty["previous"] + frame_dirty["rects"]
+    window_area = WINDOW_WIDTH * WINDOW_HEIGHT
+    dirty_area = sum(r.width * r.height for r in rects)
+    if full_redraw or signature != frame_dirty["signature"] or dirty_area > window_area * DIRTY_FULL_FLIP_RATIO:
+        pygame.display.flip()
+    elif rects:
+        pygame.display.update(rects)
+    frame_dirty["previous"] = frame_dirty["rects"]
+    frame_dirty["rects"] = []
+    frame_dirty["signature"] = signature
+
+
 # 7. 主游戏循环
 # 7. 主游戏循环
+IDLE_WAIT_MS = 250  # 无动画时阻塞等待事件的最长时间（毫秒），超时后仍会重绘一次
+
+def has_active_animations():
+    """子弹、发射队列或激光效果仍在进行时需要满帧率刷新"""
+    return bool(
+        engine.has_projectiles()
+        or game_state.get("laser_effects")
+        or "non_directional_laser_effect" in game_state
+    )
+
+def next_events():
+    """
+    取出本帧要处理的事件：
+      - 有动画时立即返回（可能为空），保持 60 FPS 渲染；
+      - 否则阻塞在 pygame.event.wait 上，直到鼠标、按键或定时器事件到达（或超时），
+        棋盘静止时不再占满 CPU。等待的时间不计入模拟时钟，
+        否则下一次发射会在第一帧补跑多步，子弹不从枪口出现、发射队列提前出膛。
+    """
+    if has_active_animations():
+        return pygame.event.get()
+    first = pygame.event.wait(IDLE_WAIT_MS)
+    sim_clock.reset()
+    events = [] if first.type == pygame.NOEVENT else [first]
+    return events + pygame.event.get()
+
 def main():
     screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
     pygame.display.set_caption("Voyage1969")
@@ -1297,8 +1257,12 @@ def main():
     
     running = True
     while running:
-        # 事件处理部分
-        for event in pygame.event.get():
+        # 事件处理部分（空闲时阻塞等待事件）
+        full_redraw = False
+        for event in next_events():
+            # 除鼠标移动外的事件（点击、定时器、窗口事件等）都可能改变整个画面
+            if event.type != pygame.MOUSEMOTION:
+                full_redraw = True
             if event.type == pygame.QUIT:
                 running = False
             elif event.type == LASER_CLEAR_EVENT:
@@ -1306,6 +1270,10 @@ def main():
                 game_state["laser_effects"] = []
             elif event.type == ENEMY_ACTION_EVENT:
                 auto_enemy_action()
+            elif event.type == ENEMY_RESULT_EVENT:
+                apply_enemy_result(event)
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F5:
+                reset_game()
             else:
                 handle_input(event)
         
@@ -1321,6 +1289,7 @@ def main():
         draw_game_map(screen)
         draw_skill_bar(screen)
         draw_info_panel(screen, pygame.mouse.get_pos())
+        mark_hover_dirty(pygame.mouse.get_pos())
         
         # 绘制迷雾层（背景）
         draw_mist(screen)
@@ -1329,7 +1298,7 @@ def main():
         if game_state.get("aiming", False) and game_state.get("selected_skill") in [1, 2]:
             start_x = map_layout["start_positions"][CONTROLLED_INDEX][0] * GRID_SIZE + GRID_SIZE // 2
             start_y = map_layout["start_positions"][CONTROLLED_INDEX][1] * GRID_SIZE + GRID_SIZE // 2
-            pygame.draw.line(screen, COLORS["RED"], (start_x, start_y), pygame.mouse.get_pos(), 2)
+            mark_dirty(pygame.draw.line(screen, COLORS["RED"], (start_x, start_y), pygame.mouse.get_pos(), 2))
 
         draw_laser_effects(screen)
         draw_non_directional_laser_effect(screen)
@@ -1343,10 +1312,11 @@ def main():
         draw_mouse_indicator(screen)
         draw_movement_indicator(screen)
         
-        # 刷新屏幕和控制帧率
-        pygame.display.flip()
+        # 刷新屏幕（只提交变化的区域）和控制帧率
+        present_frame(full_redraw)
         clock.tick(60)
         
+    enemy_ai.shutdown()
     pygame.quit()
 
 
@@ -0,0 +1,30 @@
+"""
+Voyage 1969 的无界面核心。
+
+voyage.engine 中的 GameEngine 持有全部规则状态，不依赖 pygame；
+主程序（voyage 1969.py）只负责输入与绘制。
+"""
+from voyage.engine import (
+    GameEngine,
+    load_map,
+    Move,
+    Build,
+    Needle,
+    Amulet,
+    Laser,
+    NormalAttack,
+    Teleport,
+    Scout,
+    Vision,
+    BuySkill,
+    Patrol,
+)
+from voyage.ai import AlphaBetaAI
+from voyage.belief import BeliefTracker
+from voyage.mcts import MCTSAI
+from voyage.bitboard import Bitboard
+from voyage.projectiles import ProjectilePool
+from voyage.spatial import SpatialHash
+from voyage.timestep import FixedTimestep
+from voyage.walls import WallStore
+from voyage.worker import BackgroundAI
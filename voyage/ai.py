@@ -0,0 +1,329 @@
+"""
+搜索式 AI：在 GameEngine 的内存拷贝上做 alpha-beta 搜索，为自动玩家选择行动，从不改动正在进行的对局。
+
+  - 迭代加深：从 1 层开始逐层加深，直到用完每回合的时间预算，采用最后一次完整搜索的最佳行动；
+  - 置换表：按局面键保存（深度、估值、边界类型、最佳行动），既用于剪枝也用于下一层的着法排序；
+  - 着法排序：置换表行动、同层的杀手行动，再按历史启发分与静态先验排序；
+  - 每个行动之后用 GameEngine.resolve_projectiles 立即结算子弹，搜索中的局面没有飞行中的子弹；
+  - 不读取迷雾中对方的准确位置：根局面中的对方放在信念（voyage.belief）中概率最大的格子上。
+
+候选行动只包含界面上能做出的行动：技能须已解锁，定向技能瞄准对方中心，灵力投入取 MANA_OPTIONS 中的档位。
+侦察与视野只影响信息，而搜索把根局面当作完整状态，因此不作为候选。
+"""
+import math
+import time
+
+from voyage.belief import track
+from voyage.engine import (
+    Amulet, Build, BuySkill, Laser, Move, Needle, NormalAttack, Patrol, Teleport,
+    chebyshev, opponent
+)
+
+
+AI_TIME_BUDGET = 0.8         # 每回合思考时间（秒），取代原先固定 1000 毫秒的敌方行动延迟
+MAX_SEARCH_DEPTH = 32        # 迭代加深的层数上限
+MANA_OPTIONS = (1, 2, 3, 5)  # 封魔针与建造考虑的灵力投入档位（另加全部灵力）
+TELEPORT_RADIUS = 3          # 闪现考虑的最大半径
+ATTACK_RADIUS = 2            # 魔理沙普通攻击考虑的墙体半径
+TABLE_SIZE = 200000          # 置换表条目上限，超出时清空
+LINE_CACHE_SIZE = 100000     # 火力线缓存条目上限，超出时清空
+
+WIN_SCORE = 100000
+HP_WEIGHT = 10.0
+MANA_WEIGHT = 1.0
+GOLD_WEIGHT = 0.05
+SKILL_WEIGHT = 3.0
+TEMPO_WEIGHT = 0.5           # 火力线畅通时，轮到行动的一方预期打出的伤害按此比例计入
+
+# 置换表边界类型
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+# 火力线缓存：(地图尺寸, 格子像素, 自机格, 对方格, 墙体掩码) -> 是否畅通
+# 缓存在进程内跨对局保留，同一掩码在不同宽度的地图上代表不同的墙体布局，因此键中带上地图尺寸
+_line_cache = {}
+
+
+class SearchTimeout(Exception):
+    """时间预算用尽，中止本层搜索"""
+
+
+def aim(engine, player):
+    """自机中心指向对方中心的单位向量；两者重合时返回 None"""
+    start = engine.cell_center(engine.unit_cell(player))
+    target = engine.cell_center(engine.unit_cell(opponent(player)))
+    dx = target[0] - start[0]
+    dy = target[1] - start[1]
+    length = math.sqrt(dx * dx + dy * dy)
+    if length == 0:
+        return None
+    return (dx / length, dy / length)
+
+
+def line_of_fire(engine, player):
+    """从自机中心射向对方中心的直线是否在碰到墙体之前命中对方（按格子与墙体布局缓存）"""
+    me, op = engine.unit_cell(player), engine.unit_cell(opponent(player))
+    key = (engine.width, engine.height, engine.grid_size, me, op, engine.walls.mask)
+    clear = _line_cache.get(key)
+    if clear is None:
+        direction = aim(engine, player)
+        clear = False
+        if direction is not None:
+            _, _, enemy = engine.cast_laser(engine.cell_center(me), direction, enemy_cell=op)
+            clear = enemy is not None
+        if len(_line_cache) >= LINE_CACHE_SIZE:
+            _line_cache.clear()
+        _line_cache[key] = clear
+    return clear
+
+
+def firepower(engine, player):
+    """火力线畅通时 player 下一次行动最多能造成的伤害"""
+    stats = engine.stats[player]
+    unlocked = engine.state["unlocked_skills"][player]
+    damage = 0
+    if engine.character(player) == "marisa":
+        damage = engine.marisa_attack  # 普通攻击的瞬时激光
+    elif unlocked[2] and stats["mana"] >= 1:
+        damage = 1  # 符札
+    if unlocked[1]:
+        damage = max(damage, stats["mana"])
+    return damage
+
+
+def evaluate(engine, player):
+    """以 player 的视角评估局面：生命、灵力、金币、已解锁技能，以及火力线上的先手优势"""
+    op = opponent(player)
+    me_stats, op_stats = engine.stats[player], engine.stats[op]
+    unlocked = engine.state["unlocked_skills"]
+    score = (HP_WEIGHT * (me_stats["hp"] - op_stats["hp"])
+             + MANA_WEIGHT * (me_stats["mana"] - op_stats["mana"])
+             + GOLD_WEIGHT * (me_stats["gold"] - op_stats["gold"])
+             + SKILL_WEIGHT * (sum(unlocked[player].values()) - sum(unlocked[op].values())))
+    active = engine.active_player
+    if line_of_fire(engine, active):
+        tempo = TEMPO_WEIGHT * HP_WEIGHT * firepower(engine, active)
+        score += tempo if active == player else -tempo
+    return score
+
+
+def position_key(engine):
+    """置换表的局面键：行动方、单位位置、墙体、双方数值、已解锁技能与巡逻方向"""
+    stats = engine.stats
+    unlocked = engine.state["unlocked_skills"]
+    return (
+        engine.active_player,
+        tuple(engine.map_layout["start_positions"]),
+        engine.walls.key(),
+        tuple((s["hp"], s["mana"], s["gold"], s["attack"]) for s in stats.values()),
+        tuple(tuple(u.values()) for u in unlocked.values()),
+        engine.state.get("enemy_direction", 1),
+    )
+
+
+def candidate_actions(engine, player):
+    """
+    player 在当前局面下的候选行动（按静态先验从高到低）。
+    与界面一致：技能1为封魔针，技能2灵梦为符札、魔理沙为非定向激光，技能4为闪现，普通攻击只有魔理沙可用。
+    """
+    stats = engine.stats[player]
+    mana = stats["mana"]
+    unlocked = engine.state["unlocked_skills"][player]
+    marisa = engine.character(player) == "marisa"
+    board = engine.board
+    enemy_cell = engine.unit_cell(opponent(player))
+    direction = aim(engine, player)
+    mana_options = sorted({m for m in MANA_OPTIONS + (mana,) if 0 < m <= mana})
+    actions = []
+
+    # 攻击
+    if marisa:
+        actions.append(NormalAttack(enemy_cell))
+        center = engine.unit_cell(player)
+        actions += [NormalAttack(cell) for cell in board.cells(engine.walls.mask & board.chebyshev(center, ATTACK_RADIUS))]
+    if direction is not None and unlocked[1]:
+        actions += [Needle(direction, m) for m in reversed(mana_options)]
+    if unlocked[2]:
+        if marisa and mana >= 2:
+            actions.append(Laser(enemy_cell))
+        elif not marisa and mana >= 1 and direction is not None:
+            actions.append(Amulet(direction))
+
+    # 购买技能（不结束回合）
+    if stats["gold"] >= engine.skill_cost:
+        actions += [BuySkill(skill) for skill in (1, 2, 4) if not unlocked[skill]]
+
+    # 移动与闪现
+    actions += [Move(cell) for cell in board.cells(engine.move_targets(player))]
+    if unlocked[4] and mana > 0:
+        center = engine.unit_cell(player)
+        radius = min(mana, TELEPORT_RADIUS)
+        actions += [Teleport(cell, chebyshev(cell, center)) for cell in board.cells(engine.teleport_targets(player, radius))]
+
+    # 在自机周围一格建造掩体
+    cover = board.cells(engine.build_targets(player, 1))
+    actions += [Build(cell, m) for m in mana_options for cell in cover]
+
+    return actions or [Patrol()]
+
+
+class AlphaBetaAI:
+    """
+    迭代加深 alpha-beta 搜索。
+
+    参数:
+      time_budget: 每次 choose 的思考时间（秒）
+      max_depth: 迭代加深的层数上限
+      should_stop: 可选的无参函数，返回 True 时提前结束搜索（用于取消后台思考）
+    """
+
+    def __init__(self, time_budget=AI_TIME_BUDGET, max_depth=MAX_SEARCH_DEPTH, should_stop=None):
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.should_stop = should_stop
+        self.table = {}
+        self.history = {}
+        self.killers = {}
+        self.belief = None  # 对方位置的信念，每次 choose 前同步
+        self.player = None
+        self.deadline = 0.0
+        self.nodes = 0
+        self.depth_reached = 0
+
+    def choose(self, engine, player=None):
+        """在 engine 的拷贝上搜索，返回 player（缺省为当前行动方）的最佳行动"""
+        start = time.perf_counter()
+        self.deadline = start + self.time_budget
+        self.player = player or engine.active_player
+        self.nodes = 0
+        self.depth_reached = 0
+        self.killers = {}
+        if len(self.table) > TABLE_SIZE:
+            self.table.clear()
+
+        self.belief = track(self.belief, engine, self.player)
+        root = engine.copy()
+        root.state.pop("turn_history", None)
+        root.set_unit_cell(opponent(self.player), self.belief.most_likely())
+        root.resolve_projectiles()
+        actions = candidate_actions(root, self.player)
+        best = actions[0]
+        if len(actions) == 1:
+            return best
+        for depth in range(1, self.max_depth + 1):
+            try:
+                value, action = self._root(root, actions, depth)
+            except SearchTimeout:
+                break
+            best = action
+            self.depth_reached = depth
+            # 已经找到必胜或必败的着法，不必再加深
+            if abs(value) >= WIN_SCORE - self.max_depth:
+                break
+            if time.perf_counter() >= self.deadline:
+                break
+        return best
+
+    def _root(self, engine, actions, depth):
+        """根节点：上一层的最佳行动排在最前"""
+        entry = self.table.get(position_key(engine))
+        if entry and entry[3] in actions:
+            actions.remove(entry[3])
+            actions.insert(0, entry[3])
+        alpha, beta = -math.inf, math.inf
+        best_value, best_action = -math.inf, actions[0]
+        for action in actions:
+            child = self._child(engine, action)
+            if child is None:
+                continue
+            value = self._search(child, depth - 1, alpha, beta, 1)
+            if value > best_value:
+                best_value, best_action = value, action
+            alpha = max(alpha, value)
+        self.table[position_key(engine)] = (depth, best_value, EXACT, best_action)
+        return best_value, best_action
+
+    def _child(self, engine, action):
+        """执行行动并结算子弹后的新局面；行动无效（状态未改变）时返回 None"""
+        child = engine.copy()
+        if not child.apply(action):
+            return None
+        child.resolve_projectiles()
+        return child
+
+    def _search(self, engine, depth, alpha, beta, ply):
+        self.nodes += 1
+        if not self.nodes & 127 and (time.perf_counter() >= self.deadline
+                                     or (self.should_stop is not None and self.should_stop())):
+            raise SearchTimeout()
+        if engine.is_over():
+            winner = engine.winner()
+            if winner is None:
+                return 0.0
+            return WIN_SCORE - ply if winner == self.player else ply - WIN_SCORE
+        if depth == 0:
+            return evaluate(engine, self.player)
+
+        key = position_key(engine)
+        entry = self.table.get(key)
+        tt_action = None
+        if entry:
+            entry_depth, value, flag, tt_action = entry
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return value
+                if flag == LOWER:
+                    alpha = max(alpha, value)
+                elif flag == UPPER:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+
+        # 购买技能不结束回合，因此每层按实际行动方决定取最大还是最小
+        maximizing = engine.active_player == self.player
+        alpha0, beta0 = alpha, beta
+        best_value = -math.inf if maximizing else math.inf
+        best_action = None
+        for action in self._ordered(engine, tt_action, ply):
+            child = self._child(engine, action)
+            if child is None:
+                continue
+            value = self._search(child, depth - 1, alpha, beta, ply + 1)
+            if maximizing:
+                if value > best_value:
+                    best_value, best_action = value, action
+                alpha = max(alpha, value)
+            else:
+                if value < best_value:
+                    best_value, best_action = value, action
+                beta = min(beta, value)
+            if alpha >= beta:
+                self._record_cutoff(action, depth, ply)
+                break
+
+        if best_action is None:
+            return evaluate(engine, self.player)
+        if best_value <= alpha0:
+            flag = UPPER
+        elif best_value >= beta0:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (depth, best_value, flag, best_action)
+        return best_value
+
+    def _ordered(self, engine, tt_action, ply):
+        """置换表行动、本层杀手行动，其余按历史启发分排序（同分保持静态先验顺序）"""
+        actions = candidate_actions(engine, engine.active_player)
+        # 置换表行动也可能是杀手行动，去重（保持顺序）以免同一子节点搜索两次
+        first = [a for a in dict.fromkeys((tt_action, *self.killers.get(ply, ()))) if a is not None]
+        history = self.history
+        rest = sorted((a for a in actions if a not in first), key=lambda a: -history.get(a, 0))
+        return [a for a in first if a in actions] + rest
+
+    def _record_cutoff(self, action, depth, ply):
+        killers = self.killers.setdefault(ply, [])
+        if action not in killers:
+            killers.insert(0, action)
+            del killers[2:]
+        self.history[action] = self.history.get(action, 0) + depth * depth
@@ -0,0 +1,195 @@
+"""
+信念状态：某一方对迷雾中对方位置的概率估计。
+
+概率保存在一个按 y * width + x 排列的 NumPy 数组中（与 voyage.bitboard 的位序相同），
+每回合只用己方看得到的信息更新：
+  - 预测：根据公开的回合记录（turn_history 中对方的行动类型与公告参数）扩散概率，
+    移动按移动半径、闪现按公告中的半径均匀扩散到非墙体格子，巡逻为上下各一半；
+  - 观察：己方视野（含己方阴阳宝玉的视野提升）、己方侦察暴露的格子与己方激光暴露的行列。
+    对方在视野中时概率集中到该格，否则视野内的格子概率清零后重新归一化；
+  - "敌方在此周围" 之类的公告与其他线索通过 observe_near / observe_cells 加入。
+移动的转移矩阵按 (墙体与自机位置, 半径) 构造一次后缓存，预测是一次向量与矩阵相乘，
+观察是整张网格上的掩码运算，每次更新只需几微秒。
+"""
+import numpy as np
+
+from voyage.engine import opponent, unit_index
+
+
+TRANSITION_CACHE_SIZE = 64  # 转移矩阵缓存条目上限
+
+
+def mask_array(board, mask):
+    """位掩码转为长度 width * height 的布尔数组"""
+    data = np.frombuffer(mask.to_bytes((board.size + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(data, bitorder="little")[:board.size].astype(bool)
+
+
+class BeliefTracker:
+    """
+    player 一方对其对方位置的信念。
+
+    参数:
+      engine: 对局；只读取地图尺寸、出生点、移动半径与公开的墙体
+      player: 持有信念的一方
+    """
+
+    def __init__(self, engine, player):
+        self.player = player
+        self.opponent = opponent(player)
+        self.board = engine.board
+        self.width, self.height = engine.width, engine.height
+        self.movement_radius = engine.movement_radius
+        self.map_data = engine.map_data
+        self._coords = np.divmod(np.arange(self.board.size), self.width)[::-1]  # 各格的 (x, y)
+        self._transitions = {}  # (不可进入掩码, 半径) -> 转移矩阵，墙体不变时重复使用
+        self.reset()
+
+    def reset(self):
+        """对局开始：对方位于其出生点（地图数据公开）"""
+        spawn = tuple(list(self.map_data["spawn_points"].values())[unit_index(self.opponent)])
+        self.probs = np.zeros(self.board.size)
+        self.probs[self.board.index(spawn)] = 1.0
+        self.seen = 0  # 已处理的 turn_history 条数
+
+    def copy(self):
+        clone = BeliefTracker.__new__(BeliefTracker)
+        clone.__dict__.update(self.__dict__)
+        clone.probs = self.probs.copy()
+        return clone
+
+    # ---------------- 同步 ----------------
+    def sync(self, engine):
+        """处理 engine 中新增的回合记录，再用当前视野观察；对局重新开始时先 reset"""
+        history = engine.state.get("turn_history", [])
+        if len(history) < self.seen:
+            self.reset()
+        blocked = engine.walls.mask | self.board.bit(engine.unit_cell(self.player))
+        for entry in history[self.seen:]:
+            if entry["active_player"] == self.opponent:
+                self.predict_action(entry["action"], entry["extra_info"], blocked)
+        self.seen = len(history)
+        self.observe(engine)
+        return self
+
+    # ---------------- 预测 ----------------
+    def predict_action(self, action_type, extra_info="", blocked=0):
+        """对方执行了 action_type（switch_turn 的行动类型）之后的先验；blocked 为对方不能进入的格子掩码"""
+        if action_type == "move":
+            self.predict_move(self.movement_radius, blocked)
+        elif action_type == "teleport":
+            self.predict_move(int(extra_info or 0), blocked)
+        elif action_type == "enemy_move":
+            self.predict_patrol()
+
+    def predict_move(self, radius, blocked=0):
+        """对方均匀地移动到半径 radius 内的某个其他可进入格子；无处可去时留在原地"""
+        if radius <= 0:
+            return
+        self.probs = self.probs @ self._transition(radius, blocked)
+        self._normalize()
+
+    def _transition(self, radius, blocked):
+        """移动的转移矩阵 T[i, j]（从格 i 到格 j 的概率），按 (不可进入掩码, 半径) 缓存"""
+        key = (blocked, radius)
+        matrix = self._transitions.get(key)
+        if matrix is None:
+            free = ~mask_array(self.board, blocked)
+            x, y = self._coords
+            reach = np.maximum(np.abs(x[:, None] - x[None, :]), np.abs(y[:, None] - y[None, :])) <= radius
+            np.fill_diagonal(reach, False)
+            reach &= free[None, :]
+            degree = reach.sum(axis=1)
+            matrix = reach / np.maximum(degree, 1)[:, None]
+            stuck = np.flatnonzero(degree == 0)
+            matrix[stuck, stuck] = 1.0
+            if len(self._transitions) >= TRANSITION_CACHE_SIZE:
+                self._transitions.clear()
+            self._transitions[key] = matrix
+        return matrix
+
+    def predict_patrol(self):
+        """巡逻：沿所在列上下各一格（方向未知，各一半；在上下边缘只能往回走）"""
+        grid = self.probs.reshape(self.height, self.width)
+        moved = np.zeros_like(grid)
+        if self.height > 1:
+            moved[1:] += 0.5 * grid[:-1]
+            moved[:-1] += 0.5 * grid[1:]
+            moved[1] += 0.5 * grid[0]
+            moved[-2] += 0.5 * grid[-1]
+        else:
+            moved[:] = grid
+        self.probs = moved.reshape(-1)
+
+    # ---------------- 观察 ----------------
+    def observe(self, engine):
+        """
+        用 player 当前的视野观察：看到对方时定位，否则视野内的格子不可能有对方。
+        视野只含 player 自己施放的视野提升、侦察与激光暴露（见 GameEngine.vision_effects）。
+        """
+        visible = engine.vision_mask(self.player)
+        cell = engine.unit_cell(self.opponent)
+        if self.board.contains(visible, cell):
+            self.locate(cell)
+        else:
+            self.exclude(visible, fallback=engine.walls.mask | visible)
+
+    def locate(self, cell):
+        self.probs[:] = 0.0
+        self.probs[self.board.index(cell)] = 1.0
+
+    def exclude(self, mask, fallback=None):
+        """对方不在 mask 中；与信念矛盾（概率全部清零）时改为 fallback 以外的均匀分布"""
+        self.probs[mask_array(self.board, mask)] = 0.0
+        self._normalize(fallback if fallback is not None else mask)
+
+    def observe_cells(self, mask):
+        """对方在 mask 中（例如被激光命中时的十字）"""
+        inside = mask_array(self.board, mask)
+        self.probs[~inside] = 0.0
+        self._normalize(self.board.full & ~mask)
+
+    def observe_near(self, cell, radius=1):
+        """公告 "敌方在此周围"：对方在 cell 半径 radius 内"""
+        self.observe_cells(self.board.chebyshev(cell, radius))
+
+    def _normalize(self, fallback=None):
+        total = self.probs.sum()
+        if total > 0:
+            self.probs /= total
+        elif fallback is not None:
+            self.probs = (~mask_array(self.board, fallback)).astype(float)
+            self._normalize()
+
+    # ---------------- 查询 ----------------
+    def probability(self, cell):
+        return float(self.probs[self.board.index(cell)])
+
+    def most_likely(self):
+        return self.board.cell(int(np.argmax(self.probs)))
+
+    def support(self):
+        """概率非零的格子及其概率（两个等长列表，供 random.choices 采样）"""
+        indices = np.flatnonzero(self.probs)
+        return [self.board.cell(i) for i in indices.tolist()], self.probs[indices].tolist()
+
+    def sample(self, rng, count=1):
+        """按信念抽取 count 个格子；rng 为 numpy.random.Generator"""
+        cumulative = np.cumsum(self.probs)
+        indices = np.searchsorted(cumulative, rng.random(count) * cumulative[-1], side="right")
+        return [self.board.cell(i) for i in np.minimum(indices, self.board.size - 1).tolist()]
+
+    def entropy(self):
+        """信念的熵（比特），0 表示确切知道对方位置"""
+        p = self.probs[self.probs > 0]
+        return 0.0 - float((p * np.log2(p)).sum())
+
+
+def track(tracker, engine, player):
+    """
+    返回与 engine 同步后的 player 一方信念：tracker 为 None、属于另一方或另一张地图时新建。
+    AI 每次思考前调用，以代替直接读取对方的准确位置。
+    """
+    if tracker is None or tracker.player != player or tracker.map_data != engine.map_data:
+        tracker = BeliefTracker(engine, player)
+    return tracker.sync(engine)
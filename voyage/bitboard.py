@@ -0,0 +1,101 @@
+"""
+位棋盘：用一个整数位掩码表示一组格子，第 y * width + x 位对应格子 (x, y)。
+
+墙体、草丛、单位、视野、激光行列等属性都可以表示为掩码，
+"敌方是否在草丛中"、"非定向激光命中的格子"、"可建造/可闪现的目标格" 等查询
+只需几次位运算。Bitboard 预先计算每行、每列、每格十字（行|列）的掩码，
+切比雪夫半径掩码按 (格子, 半径) 计算一次后缓存。地图尺寸取自 map/*.json 的 "size"，不限于 12x9。
+"""
+
+
+class Bitboard:
+    """
+    某一地图尺寸的掩码表。
+
+    参数:
+      width, height: 地图尺寸（格）
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.full = (1 << self.size) - 1
+        row = (1 << width) - 1
+        # 每行第 0 列的位重复 height 次，与某一行的横向区间相乘即得对应的列区间
+        self._column_repeat = sum(1 << (y * width) for y in range(height))
+        self.row_masks = [row << (y * width) for y in range(height)]
+        self.col_masks = [self._column_repeat << x for x in range(width)]
+        self.cross_masks = [self.row_masks[i // width] | self.col_masks[i % width]
+                            for i in range(self.size)]
+        self._chebyshev_masks = {}
+
+    # ---------------- 格子与位 ----------------
+    def in_bounds(self, cell):
+        return 0 <= cell[0] < self.width and 0 <= cell[1] < self.height
+
+    def index(self, cell):
+        return cell[1] * self.width + cell[0]
+
+    def cell(self, index):
+        return (index % self.width, index // self.width)
+
+    def bit(self, cell):
+        """单个格子的掩码；地图外或 None 返回 0"""
+        if cell is None or not self.in_bounds(cell):
+            return 0
+        return 1 << self.index(cell)
+
+    def mask(self, cells):
+        """格子集合转为掩码，忽略地图外的格子"""
+        m = 0
+        for cell in cells:
+            m |= self.bit(cell)
+        return m
+
+    def cells(self, mask):
+        """按 y 再 x 的顺序（即位序）列出掩码中的格子"""
+        result = []
+        while mask:
+            low = mask & -mask
+            result.append(self.cell(low.bit_length() - 1))
+            mask ^= low
+        return result
+
+    def contains(self, mask, cell):
+        return bool(mask & self.bit(cell))
+
+    @staticmethod
+    def count(mask):
+        return bin(mask).count("1")
+
+    # ---------------- 预计算掩码 ----------------
+    def row(self, y):
+        return self.row_masks[y]
+
+    def col(self, x):
+        return self.col_masks[x]
+
+    def cross(self, cell):
+        """cell 所在整行与整列（非定向激光的命中范围）"""
+        if cell is None or not self.in_bounds(cell):
+            return 0
+        return self.cross_masks[self.index(cell)]
+
+    def chebyshev(self, cell, radius):
+        """与 cell 的切比雪夫距离不超过 radius 的全部格子（含 cell 本身，裁剪到地图内；cell 可在地图外）"""
+        key = (cell, radius)
+        mask = self._chebyshev_masks.get(key)
+        if mask is None:
+            x0 = max(cell[0] - radius, 0)
+            x1 = min(cell[0] + radius, self.width - 1)
+            y0 = max(cell[1] - radius, 0)
+            y1 = min(cell[1] + radius, self.height - 1)
+            if x0 > x1 or y0 > y1:
+                mask = 0
+            else:
+                rows = (1 << ((y1 + 1) * self.width)) - (1 << (y0 * self.width))
+                span = (1 << (x1 + 1)) - (1 << x0)
+                mask = rows & (span * self._column_repeat)
+            self._chebyshev_masks[key] = mask
+        return mask
@@ -0,0 +1,880 @@
+"""
+规则核心：GameEngine 持有地图、玩家、墙体与效果，结算类型化的行动并返回事件列表。
+
+整个模块不依赖 pygame，机器人、测试与批量模拟可以直接导入，不必打开窗口。
+主程序把鼠标操作翻译为行动交给 GameEngine，再根据返回的事件设置定时器、重绘地形等。
+
+事件是普通的 dict，"type" 字段取值：
+  announcement   公告       {"message"}
+  turn           回合切换   {"active_player", "turn_number"}
+  unit_moved     单位移动   {"player", "cell"}
+  unit_hit       单位受伤   {"player", "damage", "by"}
+  wall_built     建造墙体   {"cell", "health"}
+  wall_damaged   墙体受伤   {"cell", "health"}
+  wall_destroyed 墙体被击碎 {"cell", "owner", "gold"}
+  laser          激光效果   {"effect", "duration"}（duration 单位为毫秒）
+  skill_unlocked 解锁技能   {"player", "skill"}
+"""
+import copy
+import json
+import math
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from voyage.bitboard import Bitboard
+from voyage.projectiles import PLAYERS, SKILLS, ProjectilePool
+from voyage.spatial import SpatialHash
+from voyage.timestep import SIMULATION_STEP
+from voyage.walls import WallStore
+
+
+GRID_SIZE = 64             # 网格像素尺寸，子弹与激光以像素坐标运动
+SKILL_COST = 100           # 所有技能购买定价均为 100 金币
+MARISA_ATTACK = 2          # 魔理沙的攻击力（普通攻击瞬时激光的伤害）
+MOVEMENT_RADIUS = 1        # 允许的移动半径（Chebyshev 距离）
+VISION_RADIUS = 1          # 默认视野半径（Chebyshev 距离），阴阳宝玉生效时改用其半径
+BULLET_INTERVAL = 0.1      # 子弹发射队列的出膛间隔（模拟时间，秒）
+LASER_DURATION = 500       # 魔理沙普通攻击激光的显示时间（毫秒）
+NON_DIRECTIONAL_LASER_DURATION = 0.5  # 非定向激光效果的持续时间（秒）
+MAX_TRAJECTORY_STEPS = 100000  # 弹道预计算的步数上限（仅防止零方向子弹无限循环）
+TRAJECTORY_CACHE_SIZE = 256    # 弹道缓存条目上限
+
+DEFAULT_PLAYER_STATS = {
+    "P1": {"hp": 20, "max_hp": 20, "attack": 1, "mana": 25, "max_mana": 25, "gold": 100},
+    "P2": {"hp": 20, "max_hp": 20, "attack": 1, "mana": 10, "max_mana": 10, "gold": 100}
+}
+
+
+# 行动类型：direction 为单位向量（像素坐标系），target 为格子坐标 (x, y)
+@dataclass(frozen=True)
+class Move:
+    target: tuple
+
+
+@dataclass(frozen=True)
+class Build:
+    target: tuple
+    mana: int
+
+
+@dataclass(frozen=True)
+class Needle:
+    """霰術「Persuasion Needle」：沿 direction 连续发射 mana 枚封魔针"""
+    direction: tuple
+    mana: int
+
+
+@dataclass(frozen=True)
+class Amulet:
+    """霊耗「Homing Amulet」：沿 direction 发射一枚可穿透的符札"""
+    direction: tuple
+
+
+@dataclass(frozen=True)
+class Laser:
+    """魔理沙的非定向激光：打击 target 所在的整行与整列"""
+    target: tuple
+
+
+@dataclass(frozen=True)
+class NormalAttack:
+    target: tuple
+
+
+@dataclass(frozen=True)
+class Teleport:
+    """秘奧「G Free」"""
+    target: tuple
+    mana: int
+
+
+@dataclass(frozen=True)
+class Scout:
+    pass
+
+
+@dataclass(frozen=True)
+class Vision:
+    """策法「陰陽寶玉」"""
+    mana: int
+
+
+@dataclass(frozen=True)
+class BuySkill:
+    skill: int
+
+
+@dataclass(frozen=True)
+class Patrol:
+    """自动单位沿所在列上下往返移动一格"""
+    pass
+
+
+def load_map(path):
+    """读取 map/*.json 地图数据"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def opponent(player):
+    return "P2" if player == "P1" else "P1"
+
+
+def unit_index(player):
+    """玩家在 map_layout["start_positions"] 中的索引"""
+    return 0 if player == "P1" else 1
+
+
+def chebyshev(a, b):
+    return max(abs(a[0] - b[0]), abs(a[1] - b[1]))
+
+
+IMMUTABLE_TYPES = frozenset((int, float, str, bool, tuple, type(None)))
+
+
+def copy_state(value):
+    """
+    state 的深拷贝：逐层复制 dict、list 与 set，元组、字符串、数字等不可变值直接共享。
+    state 只包含这几类值，比 copy.deepcopy 快数倍（搜索时每个节点都要拷贝一次）。
+    """
+    if isinstance(value, dict):
+        return {key: item if type(item) in IMMUTABLE_TYPES else copy_state(item)
+                for key, item in value.items()}
+    if isinstance(value, list):
+        return [item if type(item) in IMMUTABLE_TYPES else copy_state(item) for item in value]
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+
+def wall_entity(cell):
+    """墙体在空间哈希中的实体 id"""
+    return ("wall", cell)
+
+
+def unit_entity(player):
+    """单位在空间哈希中的实体 id"""
+    return ("unit", player)
+
+
+class GameEngine:
+    """
+    无界面的游戏规则核心。
+
+    参数:
+      map_data: 地图数据（map/*.json 的内容）
+      characters: {"P1": 角色, "P2": 角色}
+      stats: 初始玩家数值，缺省为 DEFAULT_PLAYER_STATS；魔理沙的攻击力会被设为 marisa_attack
+      first_player: 每一轮先行动的玩家；该玩家行动后轮到对手，对手行动后回合数加一
+      marisa_attack: 魔理沙的攻击力
+    """
+
+    def __init__(self, map_data, characters=None, stats=None, first_player="P1",
+                 grid_size=GRID_SIZE, skill_cost=SKILL_COST, movement_radius=MOVEMENT_RADIUS,
+                 marisa_attack=MARISA_ATTACK):
+        characters = characters or {"P1": "reimu", "P2": "reimu"}
+        self.map_data = map_data
+        self.width, self.height = map_data["size"]
+        self.grid_size = grid_size
+        self.skill_cost = skill_cost
+        self.movement_radius = movement_radius
+        self.marisa_attack = marisa_attack
+        self.first_player = first_player
+
+        # 地图布局；墙体及其生命值、总生命值（击碎时按总生命值奖励金币）由 WallStore 保存
+        self.map_layout = {
+            "start_positions": [tuple(pos) for pos in map_data["spawn_points"].values()],
+            "grass": [tuple(pos) for pos in map_data["terrain"]["grass"]["positions"]],
+            "walls": WallStore(self.width, self.height,
+                               [tuple(pos) for pos in map_data["terrain"]["walls"]["positions"]],
+                               map_data["terrain"]["walls"]["health"])
+        }
+        # 位棋盘掩码表（只依赖地图尺寸，拷贝时共享）与静态的草丛掩码
+        self.board = Bitboard(self.width, self.height)
+        self.grass_mask = self.board.mask(self.map_layout["grass"])
+        # 飞行中的子弹与发射队列
+        self.projectiles = ProjectilePool()
+        # 弹道缓存（键包含墙体掩码与敌方位置，拷贝时共享）
+        self._trajectories = {}
+        # 空间哈希：每个格子中的墙体与单位，供子弹只查询所在格
+        self.spatial = SpatialHash(self.width, self.height)
+        for cell in self.walls:
+            self.spatial.insert(wall_entity(cell), cell)
+        for player in PLAYERS:
+            self.spatial.insert(unit_entity(player), self.unit_cell(player))
+
+        # 玩家数值；角色为 "marisa" 时攻击力设为 marisa_attack
+        self.stats = copy.deepcopy(stats or DEFAULT_PLAYER_STATS)
+        for pid, s in self.stats.items():
+            if characters[pid] == "marisa":
+                s["attack"] = marisa_attack
+
+        self.state = {
+            "current_turn": {"turn_number": 1, "active_player": first_player},
+            "players": {
+                pid: {"character": characters[pid], "hp": 20,
+                      "attack": marisa_attack if characters[pid] == "marisa" else 1, "mana": 20, "gold": 100}
+                for pid in ("P1", "P2")
+            },
+            "unlocked_skills": {pid: {1: False, 2: False, 3: False, 4: False} for pid in ("P1", "P2")},
+            "game_logs": ["遊戲開始"],    # 游戏公告日志
+            "announcements": [],         # 本回合暂存公告
+            "last_shot_time": 0,         # 最后发射时间（模拟时间）
+            "sim_time": 0.0,             # 模拟时钟，每次 tick 前进一个固定步长
+            "enemy_direction": 1         # 巡逻单位初始向下移动
+        }
+
+    # ---------------- 基础查询 ----------------
+    @property
+    def active_player(self):
+        return self.state["current_turn"]["active_player"]
+
+    def character(self, player):
+        return self.state["players"][player]["character"]
+
+    @property
+    def walls(self):
+        return self.map_layout["walls"]
+
+    @property
+    def wall_health(self):
+        return self.walls.health
+
+    @property
+    def wall_total(self):
+        return self.walls.total
+
+    def unit_cell(self, player):
+        return self.map_layout["start_positions"][unit_index(player)]
+
+    def set_unit_cell(self, player, cell):
+        """移动单位（移动、闪现、巡逻），同步更新空间哈希"""
+        self.map_layout["start_positions"][unit_index(player)] = cell
+        self.spatial.move(unit_entity(player), cell)
+
+    def in_bounds(self, cell):
+        return 0 <= cell[0] < self.width and 0 <= cell[1] < self.height
+
+    def cell_center(self, cell):
+        """格子中心的像素坐标"""
+        return (cell[0] * self.grid_size + self.grid_size // 2,
+                cell[1] * self.grid_size + self.grid_size // 2)
+
+    def pixel_cell(self, pos):
+        return (int(pos[0]) // self.grid_size, int(pos[1]) // self.grid_size)
+
+    # ---------------- 位棋盘查询 ----------------
+    def unit_mask(self):
+        """双方单位所在格子的掩码"""
+        return self.board.mask(self.map_layout["start_positions"])
+
+    def in_grass(self, player):
+        return bool(self.grass_mask & self.board.bit(self.unit_cell(player)))
+
+    def move_targets(self, player):
+        """移动半径内、不是墙体也没有单位的格子"""
+        center = self.unit_cell(player)
+        return (self.board.chebyshev(center, self.movement_radius)
+                & ~self.walls.mask & ~self.unit_mask())
+
+    def build_targets(self, player, radius):
+        """以自机为中心、半径 radius 内可建造墙体的格子（不能是墙体或任一单位所在格）"""
+        center = self.unit_cell(player)
+        return self.board.chebyshev(center, radius) & ~self.walls.mask & ~self.unit_mask()
+
+    def teleport_targets(self, player, radius):
+        """秘奧「G Free」半径 radius 内可闪现的格子（不能是墙体或任一单位所在格）"""
+        center = self.unit_cell(player)
+        return self.board.chebyshev(center, radius) & ~self.walls.mask & ~self.unit_mask()
+
+    def winner(self):
+        """对方生命值耗尽的一方获胜；尚未分出胜负或双方同时耗尽时返回 None"""
+        down = [pid for pid in PLAYERS if self.stats[pid]["hp"] <= 0]
+        if len(down) == 1:
+            return opponent(down[0])
+        return None
+
+    def is_over(self):
+        return any(self.stats[pid]["hp"] <= 0 for pid in PLAYERS)
+
+    def reveal_mask(self, center, radius, recon_position=None, laser_reveal=None):
+        """视野：center 半径 radius 内的格子，加上侦察暴露的格子与激光暴露的整行整列"""
+        return (self.board.chebyshev(center, radius)
+                | self.board.bit(recon_position)
+                | self.board.cross(laser_reveal))
+
+    def vision_boost(self, player):
+        """player 自己施放的阴阳宝玉视野提升效果；没有或属于对方时返回 None"""
+        boost = self.state.get("vision_boost")
+        return boost if boost and boost["player"] == player else None
+
+    def vision_effects(self, player):
+        """
+        player 一方的视野参数 (视野半径, 侦察暴露的格子, 激光暴露的目标格)。
+        视野提升、侦察与激光暴露只对施放者生效，对方施放的效果不计入。
+        """
+        state = self.state
+        boost = self.vision_boost(player)
+        recon = state.get("recon_position") if state.get("recon_player") == player else None
+        laser = state.get("laser_reveal") if state.get("laser_reveal_player") == player else None
+        return (boost["radius"] if boost else VISION_RADIUS), recon, laser
+
+    def vision_mask(self, player):
+        """player 一方当前看得到的格子：自机视野（含视野提升）、侦察暴露的格子与激光暴露的整行整列"""
+        return self.reveal_mask(self.unit_cell(player), *self.vision_effects(player))
+
+    def copy(self):
+        """拷贝整个规则状态（地图原始数据只读共享），供搜索与模拟使用"""
+        clone = copy.copy(self)
+        clone.map_layout = {
+            "start_positions": list(self.map_layout["start_positions"]),
+            "grass": self.map_layout["grass"],
+            "walls": self.walls.copy()
+        }
+        clone.stats = {pid: dict(s) for pid, s in self.stats.items()}
+        clone.state = copy_state(self.state)
+        clone.projectiles = self.projectiles.copy()
+        clone.spatial = self.spatial.copy()
+        return clone
+
+    def __getstate__(self):
+        """序列化（例如把快照交给后台进程）时不带弹道缓存，缓存可能很大且可以重新生成"""
+        state = self.__dict__.copy()
+        state["_trajectories"] = {}
+        return state
+
+    # ---------------- 公告与回合 ----------------
+    def add_announcement(self, msg):
+        """新增公告訊息，暫存公告只保留當前回合的訊息"""
+        self.state["announcements"] = [msg]
+
+    def finalize_turn_announcements(self):
+        """結算公告：將暫存公告複製到 game_logs，並清空暫存公告"""
+        self.state["game_logs"] = self.state["announcements"][:]
+        self.state["announcements"] = []
+
+    def switch_turn(self, action_type, extra_info=""):
+        """
+        统一管理回合切换：记录本回合操作、生成公告，并切换到下一玩家。
+        先手玩家行动后轮到对手；对手行动后更新阴阳宝玉的视野提升效果、
+        清除侦察效果，再切换回先手玩家并增加回合数。
+        """
+        state = self.state
+        active = self.active_player
+        state.setdefault("turn_history", []).append({
+            "turn": state["current_turn"]["turn_number"],
+            "active_player": active,
+            "action": action_type,
+            "extra_info": extra_info,
+            "timestamp": time.time()
+        })
+
+        current_character = self.character(active)
+        if action_type == "move":
+            msg = f"{current_character} 進行了移動"
+        elif action_type == "build":
+            msg = f"{current_character} 進行了建造"
+        elif action_type == "needle":
+            msg = f"霰術：「Persuasion Needle」\n{current_character} 發射了封魔針"
+        elif action_type == "amulet":
+            msg = f"霊耗：「Homing Amulet」\n{current_character} 發射了符札"
+        elif action_type == "teleport":
+            msg = f"秘奧：「G Free」\n{current_character} 閃現到了\n半徑為[{extra_info}]內的一格"
+        elif action_type == "normal":
+            msg = f"{current_character} 發動了普通攻擊"
+        elif action_type == "vision":
+            msg = f"策法：「陰陽寶玉」\n{current_character} 獲得了\n半徑為[{extra_info}]的視野"
+        elif action_type == "scout":
+            msg = f"{current_character} 發動了偵察，\n暴露敵方位置1回合"
+        else:
+            msg = f"{current_character} 進行了行動"
+        self.add_announcement(msg)
+        self.finalize_turn_announcements()
+
+        if active == self.first_player:
+            state["current_turn"]["active_player"] = opponent(active)
+        else:
+            self.update_vision_boost()
+            state.pop("recon_position", None)
+            state.pop("recon_player", None)
+            state["current_turn"]["active_player"] = self.first_player
+            state["current_turn"]["turn_number"] += 1
+        return [
+            {"type": "announcement", "message": msg},
+            {"type": "turn", "active_player": self.active_player,
+             "turn_number": state["current_turn"]["turn_number"]}
+        ]
+
+    def update_vision_boost(self):
+        """减少视野提升效果剩余回合数，耗尽时撤销该效果"""
+        if "vision_boost" in self.state:
+            self.state["vision_boost"]["remaining"] -= 1
+            if self.state["vision_boost"]["remaining"] <= 0:
+                del self.state["vision_boost"]
+
+    # ---------------- 伤害结算 ----------------
+    def damage_wall(self, cell, damage, owner=None):
+        """
+        对墙体造成 damage 点伤害。墙体被击碎时移除，
+        并根据其总生命值 N 给击碎者 owner 4 * N 金币。
+        """
+        health = self.walls.damage(cell, damage)
+        if health > 0:
+            return [{"type": "wall_damaged", "cell": cell, "health": health}]
+        N = self.wall_total[cell]
+        gold = 4 * N if owner else 0
+        if owner:
+            self.stats[owner]["gold"] += gold
+        self.walls.remove(cell)
+        self.spatial.remove(wall_entity(cell))
+        return [{"type": "wall_destroyed", "cell": cell, "owner": owner, "gold": gold}]
+
+    def damage_unit(self, player, damage, by=None):
+        self.stats[player]["hp"] -= damage
+        return [{"type": "unit_hit", "player": player, "damage": damage, "by": by}]
+
+    # ---------------- 行动结算 ----------------
+    def apply(self, action, now=None):
+        """
+        由当前行动玩家执行 action，返回事件列表。
+        条件不满足（越界、灵力不足等）时不改变状态，返回空列表或仅含公告的列表。
+        """
+        now = time.time() if now is None else now
+        handler = getattr(self, "_apply_" + type(action).__name__.lower())
+        return handler(action, self.active_player, now)
+
+    def _apply_move(self, action, player, now):
+        unit_cell = self.unit_cell(player)
+        target = action.target
+        # 越界、墙体、其他角色所在格或超出移动半径时移动无效
+        if not self.board.contains(self.move_targets(player), target):
+            return []
+        dx = target[0] - unit_cell[0]
+        dy = target[1] - unit_cell[1]
+        self.set_unit_cell(player, target)
+        # 沿直线（非斜向）移动回复 1 灵力
+        if dx == 0 or dy == 0:
+            self.stats[player]["mana"] += 1
+        events = [{"type": "unit_moved", "player": player, "cell": target}]
+        return events + self.switch_turn("move")
+
+    def _apply_build(self, action, player, now):
+        """建造：目标合法且灵力足够时建造生命值为 mana 的墙体；无论成功与否都结束回合"""
+        target = action.target
+        events = []
+        if (self.board.contains(self.build_targets(player, action.mana), target)
+                and self.stats[player]["mana"] >= action.mana):
+            self.stats[player]["mana"] -= action.mana
+            self.walls.add(target, action.mana)
+            self.spatial.insert(wall_entity(target), target)
+            events.append({"type": "wall_built", "cell": target, "health": action.mana})
+        return events + self.switch_turn("build")
+
+    def _apply_needle(self, action, player, now):
+        if action.mana <= 0 or self.stats[player]["mana"] < action.mana:
+            return []
+        self.stats[player]["mana"] -= action.mana
+        start_pixel = self.cell_center(self.unit_cell(player))
+        # 封魔针取代发射队列中尚未出膛的子弹
+        self.projectiles.queue.clear()
+        for _ in range(action.mana):
+            self.projectiles.enqueue(start_pixel, action.direction, self.grid_size // 8, 1, player)
+        return self.switch_turn("needle")
+
+    def _apply_amulet(self, action, player, now):
+        if self.stats[player]["mana"] < 1:
+            return []
+        self.stats[player]["mana"] -= 1
+        self.projectiles.enqueue(self.cell_center(self.unit_cell(player)), action.direction,
+                                 self.grid_size // 8, 2, player)
+        return self.switch_turn("amulet")
+
+    def _apply_laser(self, action, player, now):
+        """非定向激光：固定消耗 2 灵力，对目标格所在整行、整列造成 1 点伤害并暴露该行列"""
+        grid_x, grid_y = action.target
+        if not self.in_bounds(action.target):
+            return []
+        if self.stats[player]["mana"] < 2:
+            self.add_announcement("灵力不足，无法释放激光")
+            return [{"type": "announcement", "message": "灵力不足，无法释放激光"}]
+        self.stats[player]["mana"] -= 2
+        damage = 1  # 激光伤害固定1
+
+        events = []
+        # 先结算目标行、再结算目标列上的墙体（目标格的墙体两次都会受到伤害）
+        for cell in self.board.cells(self.walls.mask & self.board.row(grid_y)):
+            events += self.damage_wall(cell, damage, player)
+        for cell in self.board.cells(self.walls.mask & self.board.col(grid_x)):
+            events += self.damage_wall(cell, damage, player)
+        # 敌方处理：若敌方机体在目标行或列上
+        enemy = opponent(player)
+        enemy_cell = self.unit_cell(enemy)
+        if enemy_cell[0] == grid_x or enemy_cell[1] == grid_y:
+            events += self.damage_unit(enemy, damage, player)
+
+        self.state["non_directional_laser_effect"] = {
+            "target_cell": action.target,
+            "created_at": now,
+            "duration": NON_DIRECTIONAL_LASER_DURATION  # 单位：秒
+        }
+        # 激光经过的行列在效果持续期间暴露
+        self.state["laser_reveal"] = action.target
+        self.state["laser_reveal_player"] = player
+        return events + self.switch_turn("non_directional_laser")
+
+    def _apply_normalattack(self, action, player, now):
+        """普通攻击：魔理沙发射瞬时激光，其他角色发射 attack 枚阴阳玉"""
+        start_pixel = self.cell_center(self.unit_cell(player))
+        target_center = self.cell_center(action.target)
+        dx_pixel = target_center[0] - start_pixel[0]
+        dy_pixel = target_center[1] - start_pixel[1]
+        length = math.sqrt(dx_pixel**2 + dy_pixel**2)
+        if length == 0:
+            return []
+        direction = (dx_pixel/length, dy_pixel/length)
+
+        if self.character(player) != "marisa":
+            bullet_speed = (self.grid_size/8)/2
+            for _ in range(self.stats[player]["attack"]):
+                self.projectiles.enqueue(start_pixel, direction, bullet_speed, "normal", player)
+            return self.switch_turn("normal")
+
+        attack_power = self.marisa_attack
+        self.stats[player]["attack"] = attack_power
+        end_pos, collided_wall, collided_enemy = self.cast_laser(
+            start_pixel, direction, enemy_cell=self.unit_cell(opponent(player)))
+        laser_effect = {
+            "start_pos": start_pixel,
+            "end_pos": end_pos,
+            "direction": direction,
+            "created_at": now,
+            "duration": LASER_DURATION,
+            "owner": player,
+        }
+        self.state.setdefault("laser_effects", []).append(laser_effect)
+        events = [{"type": "laser", "effect": laser_effect, "duration": LASER_DURATION}]
+        if collided_wall:
+            events += self.damage_wall(collided_wall, attack_power, player)
+        if collided_enemy:
+            events += self.damage_unit(opponent(player), attack_power, player)
+        return events + self.switch_turn("normal")
+
+    def _apply_teleport(self, action, player, now):
+        if action.mana <= 0 or self.stats[player]["mana"] < action.mana:
+            return []
+        # 越界、墙体、任一单位所在格或超出闪现半径时闪现无效
+        if not self.board.contains(self.teleport_targets(player, action.mana), action.target):
+            return []
+        self.stats[player]["mana"] -= action.mana
+        self.set_unit_cell(player, action.target)
+        events = [{"type": "unit_moved", "player": player, "cell": action.target}]
+        return events + self.switch_turn("teleport", extra_info=str(action.mana))
+
+    def _apply_scout(self, action, player, now):
+        """侦察：固定消耗 1 灵力，暴露敌方当前位置直到本轮结束"""
+        # 每次侦察前先清除之前的侦察效果，防止残留
+        self.state.pop("recon_position", None)
+        self.state.pop("recon_player", None)
+        if self.stats[player]["mana"] < 1:
+            return []
+        self.stats[player]["mana"] -= 1
+        self.state["recon_position"] = self.unit_cell(opponent(player))
+        self.state["recon_player"] = player
+        return self.switch_turn("scout")
+
+    def _apply_vision(self, action, player, now):
+        if action.mana <= 0 or self.stats[player]["mana"] < action.mana:
+            return []
+        self.stats[player]["mana"] -= action.mana
+        # 持续回合数和扩展视野半径均为 mana
+        self.state["vision_boost"] = {"player": player, "remaining": action.mana, "radius": action.mana}
+        return self.switch_turn("vision", extra_info=str(action.mana))
+
+    def _apply_buyskill(self, action, player, now):
+        """购买技能：不结束回合"""
+        if self.stats[player]["gold"] < self.skill_cost:
+            self.add_announcement("金币不足，无法购买技能")
+            return [{"type": "announcement", "message": "金币不足，无法购买技能"}]
+        self.stats[player]["gold"] -= self.skill_cost
+        self.state["unlocked_skills"][player][action.skill] = True
+        return [{"type": "skill_unlocked", "player": player, "skill": action.skill}]
+
+    def _apply_patrol(self, action, player, now):
+        enemy_pos = list(self.unit_cell(player))
+        direction = self.state.get("enemy_direction", 1)
+        if enemy_pos[1] + direction < 0 or enemy_pos[1] + direction >= self.height:
+            direction = -direction
+            self.state["enemy_direction"] = direction
+        enemy_pos[1] += direction
+        target = tuple(enemy_pos)
+        self.set_unit_cell(player, target)
+        events = [{"type": "unit_moved", "player": player, "cell": target}]
+        return events + self.switch_turn("enemy_move")
+
+    # ---------------- 激光与子弹 ----------------
+    def cast_laser(self, start_pos, direction, max_distance=1000, enemy_cell=None):
+        """
+        从 start_pos 沿 direction 投射激光，返回 (终点, 命中墙体, 命中敌方)。
+
+        结果与以 1 像素为步长逐点检测（检测 d = 0, 1, ..., max_distance - 1 处的像素点，
+        遇到越界、墙体或敌方单位即停止）完全一致，但只沿射线逐格遍历经过的格子（DDA），
+        仅在跨越格子边界的附近按像素点精确复核，开销与经过的格子数成正比。
+        enemy_cell 缺省为当前行动玩家对手所在的格子。
+        """
+        if enemy_cell is None:
+            enemy_cell = self.unit_cell(opponent(self.active_player))
+        x, y = start_pos
+        dir_x, dir_y = direction
+        G = self.grid_size
+
+        def probe(d):
+            curr_x = x + dir_x * d
+            curr_y = y + dir_y * d
+            cell = self.pixel_cell((curr_x, curr_y))
+            if not self.in_bounds(cell):
+                return (curr_x, curr_y), None, None
+            if cell in self.walls:
+                return (curr_x, curr_y), cell, None
+            if cell == enemy_cell:
+                return (curr_x, curr_y), None, cell
+            return None
+
+        def boundary(pos, cell, step, axis_dir):
+            """射线离开 cell 时跨越的边界所对应的 d；pixel_cell 取整向零截断，故 0 号格的下边界为 -1"""
+            if step > 0:
+                return ((cell + 1) * G - pos) / axis_dir
+            if step < 0:
+                return ((cell * G if cell > 0 else -1) - pos) / axis_dir
+            return math.inf
+
+        cell_x, cell_y = self.pixel_cell(start_pos)
+        step_x = (dir_x > 0) - (dir_x < 0)
+        step_y = (dir_y > 0) - (dir_y < 0)
+        t_x = boundary(x, cell_x, step_x, dir_x)
+        t_y = boundary(y, cell_y, step_y, dir_y)
+        t = 0
+        checked = 0  # 已精确检测过的像素点个数（d < checked）
+        while t < max_distance:
+            # 边界前后 2 像素内的点可能因取整落入相邻格，逐点精确检测；
+            # 格子内部的点必然属于该格，格子若为墙体/敌方/越界，其第一个点一定落在此范围内
+            for d in range(max(checked, math.floor(t) - 2), min(math.ceil(t) + 3, max_distance)):
+                result = probe(d)
+                if result:
+                    return result
+                checked = d + 1
+            if not self.in_bounds((cell_x, cell_y)) and t > 0:
+                # 已离开地图但边界附近的点仍未越界（极端取整情况），逐点前进直到越界
+                for d in range(checked, max_distance):
+                    result = probe(d)
+                    if result:
+                        return result
+                break
+            if t_x < t_y:
+                t = t_x
+                cell_x += step_x
+                t_x = boundary(x, cell_x, step_x, dir_x)
+            else:
+                t = t_y
+                cell_y += step_y
+                t_y = boundary(y, cell_y, step_y, dir_y)
+        return (x + dir_x*max_distance, y + dir_y*max_distance), None, None
+
+    def plan_trajectory(self, pos, direction, speed, enemy_cell):
+        """
+        从 pos 出发按当前墙体布局与敌方位置推演整条弹道（不改变状态），返回 (path, hits)：
+          - path[k] 为第 k 步（每次 update_bullets 前进一步）后的位置，path[0] 为 pos；
+            位置按逐步累加计算，与子弹池逐步移动的浮点结果完全相同；len(path) 即飞出地图的步数；
+          - hits 为 (步数, 格子)，列出弹道进入墙体格与敌方所在格的一步。
+        update_bullets 在子弹出膛时用它推演命中点，resolve_projectiles 用它立即结算；
+        起点、方向和速度相同的弹道（例如同一轮封魔针）按参数缓存，只需推演一次。
+        """
+        # 以墙体掩码而非版本号为键：拷贝之后各自建造、拆除的墙体版本号可能相同而布局不同
+        key = (pos, direction, speed, enemy_cell, self.walls.mask)
+        cache = self._trajectories
+        plan = cache.get(key)
+        if plan is None:
+            # 按主轴上的位移估计飞出地图所需的步数，一次性生成整条弹道
+            travel = speed * max(abs(direction[0]), abs(direction[1]))
+            limit = MAX_TRAJECTORY_STEPS - 1
+            if travel > 0:
+                limit = min(limit, math.ceil(max(self.width, self.height) * self.grid_size / travel) + 1)
+            moves = np.empty((limit + 1, 2))
+            moves[0] = pos
+            moves[1:] = (direction[0] * speed, direction[1] * speed)
+            # cumsum 沿轴依次相加，与逐步累加的浮点结果相同
+            path = np.cumsum(moves, axis=0)
+            cells = np.trunc(path[1:]).astype(np.int64) // self.grid_size
+            outside = np.flatnonzero((cells[:, 0] < 0) | (cells[:, 0] >= self.width)
+                                     | (cells[:, 1] < 0) | (cells[:, 1] >= self.height))
+            if len(outside):
+                cells = cells[:outside[0]]
+            path = path[:len(cells) + 1]
+            # 弹道经过的格子不多，逐格判断是否为墙体或敌方所在格
+            visited, inverse = np.unique(cells[:, 1] * self.width + cells[:, 0], return_inverse=True)
+            visited = [self.board.cell(i) for i in visited.tolist()]
+            blocking = np.array([cell in self.walls or cell == enemy_cell for cell in visited], dtype=bool)
+            # 同一格内的后续各步结算结果与进入该格的一步相同（墙体新建、单位移动时会重新推演），只记进入的一步
+            inverse = inverse.reshape(-1)
+            entering = np.ones(len(inverse), dtype=bool)
+            entering[1:] = inverse[1:] != inverse[:-1]
+            steps = np.flatnonzero(blocking[inverse] & entering)
+            hits = tuple((k + 1, visited[i]) for k, i in zip(steps.tolist(), inverse[steps].tolist()))
+            plan = (path, hits)
+            if len(cache) >= TRAJECTORY_CACHE_SIZE:
+                cache.clear()
+            cache[key] = plan
+        return plan
+
+    def update_bullets(self, now=None):
+        """
+        更新子弹状态，返回事件：
+          - 发射队列每隔 BULLET_INTERVAL 秒出膛一枚；
+          - 技能2的子弹具有穿透效果，每个实体仅受一次伤害判定，命中敌方返还 1 灵力；
+          - 技能1及普通攻击（"normal"）在遇到实体时造成伤害后消失。
+        子弹出膛时按 plan_trajectory 推演好弹道上的命中点，每步只向量化地移动全部子弹、推进游标，
+        到达命中点的子弹按出膛顺序查询该格的实体并结算（敌方为归属玩家以外的单位）。
+        新建墙体或单位移动后从当前位置重新推演；墙体被击碎只会让命中点失效，结算时查询空间哈希即可跳过。
+        """
+        now = time.time() if now is None else now
+        state = self.state
+        pool = self.projectiles
+        events = []
+        released = None
+        if pool.queue and now - state["last_shot_time"] > BULLET_INTERVAL:
+            released = pool.release()
+            state["last_shot_time"] = now
+
+        slots = pool.live()
+        if not len(slots):
+            return events
+        mask = self.walls.mask
+        units = tuple(self.map_layout["start_positions"])
+        old = pool.plan_key
+        if old is None or units != old[1] or mask & ~old[0]:
+            for slot in slots.tolist():
+                self.plan_bullet(slot)
+        elif released is not None:
+            self.plan_bullet(released)
+        pool.plan_key = (mask, units)
+
+        pool.step(slots)
+        cx, cy = pool.cells(slots, self.grid_size)
+        inside = (cx >= 0) & (cx < self.width) & (cy >= 0) & (cy < self.height)
+        # 飞出地图的子弹直接回收
+        for slot in slots[~inside]:
+            pool.kill(slot)
+
+        for slot in pool.due(slots[inside]).tolist():
+            cell = pool.current_hit(slot)
+            skill = SKILLS[pool.skill[slot]]
+            owner = PLAYERS[pool.owner[slot]]
+            entities = self.spatial.query(cell)
+            # 检查是否撞到墙体（同一帧内先结算的子弹可能已击碎该墙体）
+            if wall_entity(cell) in entities:
+                if skill in [1, "normal"]:
+                    events += self.damage_wall(cell, 1, owner)
+                    pool.kill(slot)
+                    continue
+                elif skill == 2:
+                    # 技能2子弹穿透墙体，不消失
+                    if cell not in pool.hit_entities[slot]:
+                        pool.hit_entities[slot].add(cell)
+                        events += self.damage_wall(cell, 1, owner)
+
+            # 检查是否撞到敌方：根据子弹归属动态判断，所在格中归属玩家以外的单位都是敌方
+            enemies = [entity[1] for entity in entities if entity[0] == "unit" and entity[1] != owner]
+            if enemies:
+                if skill in [1, "normal"]:
+                    events += self.damage_unit(enemies[0], 1, owner)
+                    pool.kill(slot)
+                    continue
+                elif skill == 2:
+                    if cell not in pool.hit_entities[slot]:
+                        for enemy_id in enemies:
+                            events += self.damage_unit(enemy_id, 1, owner)
+                            self.stats[owner]["mana"] += 1  # 命中敌方返还 1 灵力
+                        pool.hit_entities[slot].add(cell)
+            pool.advance_hit(slot)
+        return events
+
+    def plan_bullet(self, slot):
+        """从子弹当前位置推演弹道，把命中点交给子弹池的游标"""
+        pool = self.projectiles
+        enemy_cell = self.unit_cell(opponent(PLAYERS[pool.owner[slot]]))
+        _, hits = self.plan_trajectory(tuple(pool.pos[slot].tolist()), tuple(pool.direction[slot].tolist()),
+                                       float(pool.speed[slot]), enemy_cell)
+        pool.set_plan(slot, hits)
+
+    def resolve_projectiles(self):
+        """
+        搜索用：立即结算全部飞行中与排队中的子弹，返回事件。
+        按出膛顺序逐枚沿 plan_trajectory 推演的弹道结算命中：封魔针与普通攻击停在第一个墙体或敌方，
+        符札穿透并对每个格子只判定一次。前一枚击碎墙体后，后一枚按新的墙体布局推演；
+        单位视为静止、不考虑子弹之间的先后时间，开销与子弹数成正比，而不是与飞行步数成正比。
+        """
+        pool = self.projectiles
+        if not len(pool) and not pool.queue:
+            return []
+        shots = [(tuple(pool.pos[slot].tolist()), tuple(pool.direction[slot].tolist()), float(pool.speed[slot]),
+                  SKILLS[pool.skill[slot]], PLAYERS[pool.owner[slot]], pool.hit_entities[slot])
+                 for slot in pool.live()]
+        shots += [(pos, direction, speed, skill, owner, set() if skill == 2 else None)
+                  for pos, direction, speed, skill, owner in pool.queue]
+        self.projectiles = ProjectilePool()
+        events = []
+        for pos, direction, speed, skill, owner, hit_entities in shots:
+            enemy = opponent(owner)
+            _, hits = self.plan_trajectory(pos, direction, speed, self.unit_cell(enemy))
+            if skill == 2:
+                for _, cell in hits:
+                    if cell in hit_entities:
+                        continue
+                    hit_entities.add(cell)
+                    if cell in self.walls:
+                        events += self.damage_wall(cell, 1, owner)
+                    elif cell == self.unit_cell(enemy):
+                        events += self.damage_unit(enemy, 1, owner)
+                        self.stats[owner]["mana"] += 1  # 命中敌方返还 1 灵力
+            elif hits:
+                cell = hits[0][1]
+                if cell in self.walls:
+                    events += self.damage_wall(cell, 1, owner)
+                else:
+                    events += self.damage_unit(enemy, 1, owner)
+        return events
+
+    def update_effects(self, now=None):
+        """非定向激光效果到期后移除，同时撤销激光暴露"""
+        now = time.time() if now is None else now
+        effect = self.state.get("non_directional_laser_effect")
+        if effect and now - effect["created_at"] > effect["duration"]:
+            del self.state["non_directional_laser_effect"]
+            self.state.pop("laser_reveal", None)
+            self.state.pop("laser_reveal_player", None)
+
+    def has_projectiles(self):
+        return bool(len(self.projectiles) or self.projectiles.queue)
+
+    def tick(self, dt=SIMULATION_STEP):
+        """
+        推进一个固定步长：模拟时钟前进 dt 秒，每枚子弹前进一步，返回事件。
+        子弹速度以每步像素计，因此弹道只取决于步数，与渲染帧率无关。
+        """
+        self.state["sim_time"] += dt
+        return self.update_bullets(self.state["sim_time"])
+
+    def settle(self, dt=SIMULATION_STEP, max_steps=100000):
+        """
+        无界面模拟用：以固定步长 dt（秒）推进子弹直到全部结算，返回事件。
+        使用模拟时钟，不受真实时间影响，可全速运行。
+        """
+        # 若曾以真实时间调用 update_bullets，让模拟时钟从最后发射时间继续
+        self.state["sim_time"] = max(self.state["sim_time"], self.state["last_shot_time"])
+        events = []
+        for _ in range(max_steps):
+            if not self.has_projectiles():
+                break
+            events += self.tick(dt)
+        return events
@@ -0,0 +1,249 @@
+"""
+蒙特卡洛树搜索 AI：只依据自己一方看得到的信息行动。
+
+迷雾中对方的位置是隐藏信息，对完整状态做 minimax 等于偷看。本搜索每次迭代先确定化：
+按己方的信念（voyage.belief）抽取一个对方位置，再在这个局面上沿树选择、扩展、
+随机模拟并回传结果；对方在视野内时信念集中在其所在格。
+各次迭代的确定化不同，同一行动（例如瞄准某格的封魔针）只在部分确定化下可行，因此树按行动索引，
+选择时只比较本次可行的子节点，UCB 中的父节点访问数改用该子节点的可行次数（single-observer information set MCTS）。
+
+并行方式为根并行：choose 把同一快照交给进程池中的每个工作进程，各自以不同的随机种子独立建树，
+到时间后只返回根节点上各行动的访问数与累计收益，主进程求和后选访问数最多的行动。
+进程之间除快照、结果与一个共享的停止标记外没有通信，迭代次数随核数近似线性增长。
+在 voyage.worker.BackgroundAI 的工作进程中使用时应取 workers=1，不再嵌套一层进程池。
+"""
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from voyage.ai import AI_TIME_BUDGET, candidate_actions, evaluate
+from voyage.belief import track
+from voyage.engine import Patrol, opponent
+from voyage.worker import default_context
+
+
+EXPLORATION = 1.4      # UCB 探索系数（收益在 0~1 之间）
+ROLLOUT_DEPTH = 6      # 随机模拟的行动数上限，之后用局面评估代替终局结果
+ROLLOUT_GREEDY = 0.5   # 随机模拟中选择静态先验最高行动的概率，其余时候均匀随机
+ROLLOUT_SCALE = 50.0   # 局面评估压缩到 0~1 的尺度（约等于 5 点生命差）
+STOP_POLL = 0.02       # 多进程搜索时检查 should_stop 的间隔（秒）
+
+# 工作进程中的全局状态：主进程共享的停止标记
+_stop = None
+
+
+def determinize(engine, player, rng, cells, weights):
+    """在 engine 上（原地）把 player 的对方放到按 weights 从 cells 中抽取的一格"""
+    engine.set_unit_cell(opponent(player), rng.choices(cells, weights)[0])
+    return engine
+
+
+def outcome(engine, player):
+    """以 player 的视角给局面打分（0~1）：胜 1、负 0、同归于尽 0.5，未分胜负时压缩局面评估"""
+    if engine.is_over():
+        winner = engine.winner()
+        if winner is None:
+            return 0.5
+        return 1.0 if winner == player else 0.0
+    return 1.0 / (1.0 + math.exp(-evaluate(engine, player) / ROLLOUT_SCALE))
+
+
+def rollout(engine, rng, depth=ROLLOUT_DEPTH):
+    """在 engine 上（原地）随机模拟至多 depth 个行动"""
+    for _ in range(depth):
+        if engine.is_over():
+            break
+        actions = candidate_actions(engine, engine.active_player)
+        action = actions[0] if rng.random() < ROLLOUT_GREEDY else rng.choice(actions)
+        if engine.apply(action):
+            engine.resolve_projectiles()
+    return engine
+
+
+class Node:
+    """树节点；value 为走到本节点的一方（player）累计的收益"""
+    __slots__ = ("player", "children", "invalid", "visits", "value", "available")
+
+    def __init__(self, player=None):
+        self.player = player
+        self.children = {}
+        self.invalid = set()   # 执行后状态未改变的行动
+        self.visits = 0
+        self.value = 0.0
+        self.available = 0     # 父节点被访问且本行动可行的次数
+
+    def ucb(self):
+        return (self.value / self.visits
+                + EXPLORATION * math.sqrt(math.log(self.available) / self.visits))
+
+
+class TreeSearch:
+    """
+    单个进程内的搜索树。
+
+    参数:
+      root: 已结算子弹的根局面（不会被修改）
+      player: 搜索方
+      cells, weights: 确定化时对方可能所在的格子及其概率，见 BeliefTracker.support
+      rng: random.Random 实例
+    """
+
+    def __init__(self, root, player, cells, weights, rng):
+        self.root = root
+        self.player = player
+        self.cells = cells
+        self.weights = weights
+        self.rng = rng
+        self.tree = Node()
+        self.iterations = 0
+
+    def run(self, time_budget, iterations=None, should_stop=None):
+        deadline = time.perf_counter() + time_budget
+        while iterations is None or self.iterations < iterations:
+            self.iterate()
+            if (time.perf_counter() >= deadline
+                    or (should_stop is not None and should_stop())):
+                break
+        return self
+
+    def iterate(self):
+        engine = determinize(self.root.copy(), self.player, self.rng, self.cells, self.weights)
+        node = self.tree
+        path = [node]
+        # 选择与扩展：遇到尚未尝试的可行行动时按静态先验顺序扩展一个，随后进入随机模拟
+        while not engine.is_over():
+            mover = engine.active_player
+            legal = [a for a in candidate_actions(engine, mover) if a not in node.invalid]
+            children = node.children
+            untried = []
+            for action in legal:
+                child = children.get(action)
+                if child is None:
+                    untried.append(action)
+                else:
+                    child.available += 1
+            expanded = None
+            for action in untried:
+                if engine.apply(action):
+                    expanded = action
+                    break
+                node.invalid.add(action)
+            if expanded is not None:
+                engine.resolve_projectiles()
+                child = children[expanded] = Node(mover)
+                child.available = 1
+                path.append(child)
+                break
+            legal = [a for a in legal if a in children]
+            if not legal:
+                engine.apply(Patrol())
+                engine.resolve_projectiles()
+                break
+            action = max(legal, key=lambda a: children[a].ucb())
+            engine.apply(action)
+            engine.resolve_projectiles()
+            node = children[action]
+            path.append(node)
+
+        reward = outcome(rollout(engine, self.rng), self.player)
+        for node in path:
+            node.visits += 1
+            if node.player is not None:
+                node.value += reward if node.player == self.player else 1.0 - reward
+        self.iterations += 1
+
+    def root_stats(self):
+        """根节点各行动的 (访问数, 累计收益)"""
+        return {action: (child.visits, child.value) for action, child in self.tree.children.items()}
+
+
+def _init_worker(stop):
+    global _stop
+    _stop = stop
+
+
+def _run_search(root, player, cells, weights, seed, time_budget, iterations):
+    """工作进程：独立建树，返回根节点统计与迭代次数；主进程置位停止标记时提前结束"""
+    search = TreeSearch(root, player, cells, weights, random.Random(seed))
+    search.run(time_budget, iterations, lambda: _stop.value)
+    return search.root_stats(), search.iterations
+
+
+class MCTSAI:
+    """
+    根并行的信息集蒙特卡洛树搜索。
+
+    参数:
+      time_budget: 每次 choose 的思考时间（秒）
+      workers: 工作进程数，缺省为 CPU 核数；为 1 时在当前进程中搜索，不创建进程池
+      iterations: 每个进程的迭代次数上限（缺省只受时间限制）
+      seed: 随机种子
+      should_stop: 可选的无参函数，返回 True 时提前结束搜索；多进程搜索时由主进程检查并通知各工作进程
+    """
+
+    def __init__(self, time_budget=AI_TIME_BUDGET, workers=None, iterations=None, seed=None, should_stop=None):
+        self.time_budget = time_budget
+        self.workers = workers or os.cpu_count() or 1
+        self.iterations = iterations
+        self.should_stop = should_stop
+        self.rng = random.Random(seed)
+        self.belief = None         # 对方位置的信念，每次 choose 前同步
+        self.stats = {}            # 上一次 choose 合并后的根节点统计
+        self.total_iterations = 0  # 上一次 choose 所有进程的迭代次数之和
+        self._executor = None
+        self._stop = None
+
+    def _pool(self):
+        if self._executor is None:
+            context = default_context()
+            # 停止标记只能在创建进程时传入（共享对象不能随任务序列化）
+            self._stop = context.Value("b", 0)
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                                 initializer=_init_worker, initargs=(self._stop,))
+        return self._executor
+
+    def choose(self, engine, player=None):
+        """在 engine 的拷贝上搜索，返回 player（缺省为当前行动方）访问数最多的行动"""
+        player = player or engine.active_player
+        self.belief = track(self.belief, engine, player)
+        cells, weights = self.belief.support()
+        root = engine.copy()
+        root.state.pop("turn_history", None)
+        root.resolve_projectiles()
+        self.stats = {}
+        self.total_iterations = 0
+
+        seeds = [self.rng.getrandbits(32) for _ in range(self.workers)]
+        if self.workers == 1:
+            search = TreeSearch(root, player, cells, weights, random.Random(seeds[0]))
+            search.run(self.time_budget, self.iterations, self.should_stop)
+            results = [(search.root_stats(), search.iterations)]
+        else:
+            pool = self._pool()
+            self._stop.value = 0
+            futures = [pool.submit(_run_search, root, player, cells, weights, seed, self.time_budget, self.iterations)
+                       for seed in seeds]
+            pending = futures
+            while pending:
+                if self.should_stop is not None and self.should_stop():
+                    self._stop.value = 1
+                pending = wait(pending, timeout=STOP_POLL).not_done
+            results = [future.result() for future in futures]
+
+        for stats, iterations in results:
+            self.total_iterations += iterations
+            for action, (visits, value) in stats.items():
+                merged = self.stats.get(action, (0, 0.0))
+                self.stats[action] = (merged[0] + visits, merged[1] + value)
+        if not self.stats:
+            return Patrol()
+        return max(self.stats, key=lambda a: self.stats[a][0])
+
+    def shutdown(self):
+        """停止进行中的搜索并关闭进程池"""
+        if self._executor is not None:
+            self._stop.value = 1
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,196 @@
+"""
+子弹池：以结构数组（struct of arrays）保存所有飞行中的子弹。
+
+位置、上一步位置、方向、速度、归属、技能与存活标记各占一个 NumPy 数组，
+移动、越界判断与所在格计算对全部子弹一次完成；空槽位由空闲栈回收，
+发射队列使用 deque，出膛为 O(1)。命中结算（伤害、金币、穿透）仍由 GameEngine 负责。
+
+每枚子弹出膛时由 GameEngine.plan_trajectory 推演好弹道上的命中点，池中只记游标：
+已走步数 steps 与下一个命中点的步数 next_hit，每步只需比较两者，到点的子弹才结算。
+朝向分桶 heading 也在出膛时算好，绘制时按分桶取旋转好的精灵图，不必每帧求角度。
+"""
+import math
+from collections import deque
+
+import numpy as np
+
+from voyage.timestep import interpolate
+
+
+# 技能与玩家在数组中的编码
+SKILLS = ("normal", 1, 2)
+SKILL_CODES = {skill: code for code, skill in enumerate(SKILLS)}
+PLAYERS = ("P1", "P2")
+PLAYER_CODES = {player: code for code, player in enumerate(PLAYERS)}
+HEADING_BUCKETS = 360  # 子弹朝向的量化分桶数（一周）
+NO_HIT = np.iinfo(np.int64).max  # 弹道上没有剩余命中点
+
+
+def heading_bucket(direction):
+    """采样图正上方旋转到 direction 所需的角度（度），按 HEADING_BUCKETS 量化后的分桶编号"""
+    angle = -math.degrees(math.atan2(direction[0], -direction[1]))
+    return round(angle * HEADING_BUCKETS / 360) % HEADING_BUCKETS
+
+
+class ProjectilePool:
+    """
+    子弹池。
+
+    参数:
+      capacity: 初始槽位数，不足时按两倍扩容
+    """
+
+    def __init__(self, capacity=64):
+        self.pos = np.zeros((capacity, 2))
+        self.prev = np.zeros((capacity, 2))       # 上一步位置，用于插值绘制
+        self.direction = np.zeros((capacity, 2))
+        self.speed = np.zeros(capacity)
+        self.owner = np.zeros(capacity, dtype=np.int8)
+        self.skill = np.zeros(capacity, dtype=np.int8)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.serial = np.zeros(capacity, dtype=np.int64)  # 出膛序号，决定同一帧内的结算顺序
+        self.heading = np.zeros(capacity, dtype=np.int16)  # 朝向分桶，见 heading_bucket
+        # 弹道游标：自推演起点已走的步数、下一个命中点的步数及其在 plans 中的下标
+        self.steps = np.zeros(capacity, dtype=np.int64)
+        self.next_hit = np.full(capacity, NO_HIT, dtype=np.int64)
+        self.cursor = np.zeros(capacity, dtype=np.int64)
+        # 每枚子弹推演出的命中点 ((步数, 格子), ...)
+        self.plans = [()] * capacity
+        # 推演弹道时的墙体与单位布局；布局改变后需要重新推演
+        self.plan_key = None
+        # 技能2（穿透）子弹已经判定过的格子
+        self.hit_entities = [None] * capacity
+        self.free = list(range(capacity - 1, -1, -1))
+        # 发射队列：(pos, direction, speed, skill, owner)
+        self.queue = deque()
+        self.next_serial = 0
+        self.count = 0
+
+    @property
+    def capacity(self):
+        return len(self.alive)
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self):
+        old = self.capacity
+        new = old * 2
+        for name in ("pos", "prev", "direction"):
+            array = np.zeros((new, 2))
+            array[:old] = getattr(self, name)
+            setattr(self, name, array)
+        for name in ("speed", "owner", "skill", "alive", "serial", "heading", "steps", "next_hit", "cursor"):
+            old_array = getattr(self, name)
+            array = np.zeros(new, dtype=old_array.dtype)
+            array[:old] = old_array
+            setattr(self, name, array)
+        self.next_hit[old:] = NO_HIT
+        self.plans.extend([()] * old)
+        self.hit_entities.extend([None] * old)
+        self.free.extend(range(new - 1, old - 1, -1))
+
+    # ---------------- 发射队列 ----------------
+    def enqueue(self, pos, direction, speed, skill, owner):
+        self.queue.append((pos, direction, speed, skill, owner))
+
+    def release(self):
+        """发射队列最前面的子弹出膛，返回其槽位"""
+        return self.spawn(*self.queue.popleft())
+
+    # ---------------- 槽位管理 ----------------
+    def spawn(self, pos, direction, speed, skill, owner):
+        if not self.free:
+            self._grow()
+        slot = self.free.pop()
+        self.pos[slot] = pos
+        self.prev[slot] = pos
+        self.direction[slot] = direction
+        self.speed[slot] = speed
+        self.skill[slot] = SKILL_CODES[skill]
+        self.owner[slot] = PLAYER_CODES[owner]
+        self.alive[slot] = True
+        self.serial[slot] = self.next_serial
+        self.heading[slot] = heading_bucket(direction)
+        self.set_plan(slot, ())
+        self.next_serial += 1
+        self.hit_entities[slot] = set() if skill == 2 else None
+        self.count += 1
+        return slot
+
+    def kill(self, slot):
+        self.alive[slot] = False
+        self.hit_entities[slot] = None
+        self.plans[slot] = ()
+        self.free.append(int(slot))
+        self.count -= 1
+
+    def live(self):
+        """存活子弹的槽位，按出膛顺序排列"""
+        slots = np.flatnonzero(self.alive)
+        return slots[np.argsort(self.serial[slots], kind="stable")]
+
+    # ---------------- 弹道游标 ----------------
+    def set_plan(self, slot, hits):
+        """从子弹当前位置起的命中点 hits（见 GameEngine.plan_trajectory），游标归零"""
+        self.plans[slot] = hits
+        self.steps[slot] = 0
+        self.cursor[slot] = 0
+        self.next_hit[slot] = hits[0][0] if hits else NO_HIT
+
+    def current_hit(self, slot):
+        """游标所指的命中格"""
+        return self.plans[slot][self.cursor[slot]][1]
+
+    def advance_hit(self, slot):
+        """游标移到下一个命中点"""
+        cursor = self.cursor[slot] + 1
+        hits = self.plans[slot]
+        self.cursor[slot] = cursor
+        self.next_hit[slot] = hits[cursor][0] if cursor < len(hits) else NO_HIT
+
+    def due(self, slots):
+        """本步到达命中点的子弹（保持 slots 的顺序）"""
+        return slots[self.steps[slots] == self.next_hit[slots]]
+
+    # ---------------- 向量化更新 ----------------
+    def step(self, slots):
+        """slots 中的子弹各沿方向前进 speed 像素，游标前进一步"""
+        self.prev[slots] = self.pos[slots]
+        self.pos[slots] += self.direction[slots] * self.speed[slots, None]
+        self.steps[slots] += 1
+
+    def cells(self, slots, grid_size):
+        """子弹所在格 (cx, cy)；与 int(x) // grid_size 相同，坐标向零截断后再整除"""
+        grid = np.trunc(self.pos[slots]).astype(np.int64) // grid_size
+        return grid[:, 0], grid[:, 1]
+
+    def render_list(self, alpha=1.0):
+        """绘制用：[(插值位置, 朝向分桶, 技能, 归属)]，按出膛顺序"""
+        slots = self.live()
+        if alpha >= 1.0:
+            pos = self.pos[slots]
+        else:
+            pos = interpolate(self.prev[slots], self.pos[slots], alpha)
+        return [
+            (tuple(p), heading, SKILLS[skill], PLAYERS[owner])
+            for p, heading, skill, owner in zip(pos.tolist(), self.heading[slots].tolist(),
+                                                self.skill[slots].tolist(), self.owner[slots].tolist())
+        ]
+
+    def copy(self):
+        clone = ProjectilePool.__new__(ProjectilePool)
+        for name in ("pos", "prev", "direction", "speed", "owner", "skill", "alive", "serial",
+                     "heading", "steps", "next_hit", "cursor"):
+            setattr(clone, name, getattr(self, name).copy())
+        clone.plans = list(self.plans)
+        clone.plan_key = self.plan_key
+        clone.hit_entities = [set(hits) if hits is not None else None for hits in self.hit_entities]
+        clone.free = list(self.free)
+        clone.queue = deque(self.queue)
+        clone.next_serial = self.next_serial
+        clone.count = self.count
+        return clone
+
+    def __deepcopy__(self, memo):
+        return self.copy()
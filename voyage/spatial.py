@@ -0,0 +1,58 @@
+"""
+均匀网格空间哈希：记录每个格子中有哪些实体（墙体、单位，以及之后的召唤物）。
+
+子弹只需查询自己所在格，碰撞开销与子弹数量成正比，而不是子弹数 × 实体数；
+单位数量也不再限于两名。实体移动、闪现、建造与击碎时增量更新。
+"""
+
+
+class SpatialHash:
+    """
+    实体用可哈希的 id 表示，例如单位 ("unit", "P1")、墙体 ("wall", (x, y))（见 engine.unit_entity / wall_entity）。
+
+    参数:
+      width, height: 地图尺寸（格）
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.cells = {}      # 格子 -> 实体列表（按加入顺序）
+        self.positions = {}  # 实体 -> 格子
+
+    def insert(self, entity, cell):
+        cell = tuple(cell)
+        self.positions[entity] = cell
+        self.cells.setdefault(cell, []).append(entity)
+
+    def remove(self, entity):
+        cell = self.positions.pop(entity)
+        entities = self.cells[cell]
+        entities.remove(entity)
+        if not entities:
+            del self.cells[cell]
+
+    def move(self, entity, cell):
+        """实体移动到 cell（移动、闪现、巡逻）"""
+        if self.positions.get(entity) == tuple(cell):
+            return
+        self.remove(entity)
+        self.insert(entity, cell)
+
+    def query(self, cell):
+        """cell 中的全部实体"""
+        return self.cells.get(cell, ())
+
+    def position(self, entity):
+        return self.positions.get(entity)
+
+    def copy(self):
+        clone = SpatialHash.__new__(SpatialHash)
+        clone.width = self.width
+        clone.height = self.height
+        clone.cells = {cell: list(entities) for cell, entities in self.cells.items()}
+        clone.positions = dict(self.positions)
+        return clone
+
+    def __deepcopy__(self, memo):
+        return self.copy()
@@ -0,0 +1,62 @@
+"""
+固定步长模拟时钟。
+
+子弹速度以 "每步像素" 定义、发射队列以模拟时间计时，因此规则结算必须以固定步长推进，
+与渲染帧率无关：渲染慢时一帧内补跑多步，渲染快时某些帧不推进，
+绘制时用 alpha（累积余量 / 步长）在上一步与当前步之间插值。
+无界面运行不需要本时钟，直接循环调用 GameEngine.tick() 即可全速推进。
+"""
+import time
+
+
+SIMULATION_STEP = 1 / 60  # 模拟步长（秒）；子弹速度按此步长设计
+MAX_STEPS_PER_FRAME = 30  # 单帧最多补跑的步数，超出部分丢弃，避免卡顿后连锁落后
+
+
+class FixedTimestep:
+    """
+    累积真实经过的时间，换算成应推进的模拟步数。
+
+    参数:
+      step: 模拟步长（秒）
+      max_steps: 单次 advance 最多返回的步数
+      clock: 返回秒数的计时函数
+    """
+
+    def __init__(self, step=SIMULATION_STEP, max_steps=MAX_STEPS_PER_FRAME, clock=time.perf_counter):
+        self.step = step
+        self.max_steps = max_steps
+        self.clock = clock
+        self.accumulator = 0.0
+        self.last = None
+
+    def advance(self, elapsed=None):
+        """
+        累积 elapsed 秒（缺省为距上次调用的真实时间），返回本帧应推进的模拟步数。
+        """
+        now = self.clock()
+        if elapsed is None:
+            elapsed = 0.0 if self.last is None else now - self.last
+        self.last = now
+        self.accumulator += elapsed
+        steps = int(self.accumulator // self.step)
+        if steps > self.max_steps:
+            steps = self.max_steps
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= steps * self.step
+        return steps
+
+    @property
+    def alpha(self):
+        """当前时刻处于两步之间的比例（0~1），用于插值绘制"""
+        return min(self.accumulator / self.step, 1.0)
+
+    def reset(self):
+        self.accumulator = 0.0
+        self.last = None
+
+
+def interpolate(previous, current, alpha):
+    """在上一步位置与当前位置之间线性插值（数值或 NumPy 数组均可）"""
+    return previous + (current - previous) * alpha
@@ -0,0 +1,219 @@
+"""
+自我对弈锦标赛：在多个工作进程中批量运行 AI 对 AI 的无界面对局，用于平衡性调整。
+
+对每张地图与每种角色组合（P1/P2 各为 reimu 或 marisa）各下 N 局，
+每局结束即把结果以一行 JSON 追加到结果文件，最后打印各组合的胜率及其 95% Wilson 置信区间、
+吞吐量（局/秒）与每个工作进程的利用率（下棋时间 / 总耗时）。
+技能价格、双方初始灵力与魔理沙的攻击力可以从命令行调整，例如：
+
+    python -m voyage.tournament --games 50 --skill-cost 80 --p2-mana 12 --out results.jsonl
+
+AI 缺省按固定的搜索深度（alphabeta）或迭代次数（mcts）思考，结果不受机器快慢与进程数影响；
+给出 --time-budget 时改为按时间思考。同一局面下 AI 的着法基本确定，
+因此每局开头双方先按种子随机走 --opening-moves 步，使各局不同。
+"""
+import argparse
+import glob
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from voyage.ai import AlphaBetaAI, candidate_actions
+from voyage.engine import DEFAULT_PLAYER_STATS, MARISA_ATTACK, SKILL_COST, GameEngine, Patrol, load_map
+from voyage.mcts import MCTSAI
+from voyage.worker import default_context
+
+
+CHARACTERS = ("reimu", "marisa")
+SEARCH_DEPTH = 2               # alphabeta 的搜索深度
+MCTS_ITERATIONS = 200          # mcts 每步的迭代次数
+MAX_TURNS = 60                 # 超过该回合数仍未分出胜负记为平局
+OPENING_MOVES = 2              # 每局开头的随机步数
+MAX_ACTIONS_PER_TURN = 8       # 同一回合内不结束回合的行动（购买技能）上限，之后强制巡逻
+Z_95 = 1.96
+
+
+def make_ai(job, seed):
+    """
+    按 job 创建 AI：kind 为 "alphabeta" 或 "mcts"，time_budget 为 None 时按深度或迭代次数搜索。
+    锦标赛按对局并行，单个 AI 不再开进程池。
+    """
+    time_budget = job["time_budget"]
+    if job["ai"] == "mcts":
+        if time_budget is None:
+            return MCTSAI(time_budget=math.inf, workers=1, iterations=job["iterations"], seed=seed)
+        return MCTSAI(time_budget=time_budget, workers=1, seed=seed)
+    if time_budget is None:
+        return AlphaBetaAI(time_budget=math.inf, max_depth=job["depth"])
+    return AlphaBetaAI(time_budget=time_budget)
+
+
+def wilson_interval(successes, n, z=Z_95):
+    """二项比例的 Wilson 置信区间；n 为 0 时返回 (0, 1)"""
+    if n == 0:
+        return 0.0, 1.0
+    p = successes / n
+    denominator = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denominator
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def play_game(job):
+    """
+    工作进程：按 job 下一局，返回结果记录。
+    job 字段：game, map, characters, seed, ai, depth, iterations, time_budget, max_turns, opening_moves,
+             skill_cost, mana, marisa_attack
+    """
+    start = time.perf_counter()
+    rng = random.Random(job["seed"])
+    stats = {pid: dict(s) for pid, s in DEFAULT_PLAYER_STATS.items()}
+    for pid, mana in job["mana"].items():
+        stats[pid]["mana"] = stats[pid]["max_mana"] = mana
+    characters = dict(zip(("P1", "P2"), job["characters"]))
+    engine = GameEngine(load_map(job["map"]), characters=characters, stats=stats,
+                        skill_cost=job["skill_cost"], marisa_attack=job["marisa_attack"])
+    ais = {pid: make_ai(job, rng.getrandbits(32)) for pid in ("P1", "P2")}
+
+    actions = 0
+    turn_actions = 0
+    while not engine.is_over() and engine.state["current_turn"]["turn_number"] <= job["max_turns"]:
+        player = engine.active_player
+        if actions < job["opening_moves"]:
+            action = rng.choice(candidate_actions(engine, player))
+        elif turn_actions >= MAX_ACTIONS_PER_TURN:
+            action = Patrol()
+        else:
+            action = ais[player].choose(engine, player)
+        events = engine.apply(action, now=engine.state["sim_time"])
+        if not events:
+            # 行动未被执行时退回巡逻，保证回合能够结束
+            events = engine.apply(Patrol(), now=engine.state["sim_time"])
+        engine.settle()
+        actions += 1
+        turn_actions = 0 if any(event["type"] == "turn" for event in events) else turn_actions + 1
+
+    return {
+        "game": job["game"],
+        "map": os.path.basename(job["map"]),
+        "P1": characters["P1"],
+        "P2": characters["P2"],
+        "winner": engine.winner(),
+        # 达到回合上限时 turn_number 已进入下一回合，记为上限
+        "turns": min(engine.state["current_turn"]["turn_number"], job["max_turns"]),
+        "actions": actions,
+        "hp": {pid: s["hp"] for pid, s in engine.stats.items()},
+        "seed": job["seed"],
+        "seconds": time.perf_counter() - start,
+        "worker": os.getpid(),
+    }
+
+
+def build_jobs(args):
+    maps = sorted(args.maps or glob.glob(os.path.join("map", "*.json")))
+    pairings = list(itertools.product(CHARACTERS, repeat=2))
+    rng = random.Random(args.seed)
+    mana = {pid: m for pid, m in (("P1", args.p1_mana), ("P2", args.p2_mana)) if m is not None}
+    jobs = []
+    for path, pairing in itertools.product(maps, pairings):
+        for _ in range(args.games):
+            jobs.append({
+                "game": len(jobs),
+                "map": path,
+                "characters": pairing,
+                "seed": rng.getrandbits(32),
+                "ai": args.ai,
+                "depth": args.depth,
+                "iterations": args.iterations,
+                "time_budget": args.time_budget,
+                "max_turns": args.max_turns,
+                "opening_moves": args.opening_moves,
+                "skill_cost": args.skill_cost,
+                "mana": mana,
+                "marisa_attack": args.marisa_attack,
+            })
+    return jobs
+
+
+def summarize(results, elapsed, out=sys.stdout):
+    """打印各组合的胜率与置信区间、吞吐量与工作进程利用率"""
+    groups = {}
+    for r in results:
+        groups.setdefault((r["map"], r["P1"], r["P2"]), []).append(r)
+    print(f"{'map':<20}{'P1':>8}{'P2':>8}{'games':>7}{'P1 win':>9}{'95% CI':>18}{'P2 win':>9}{'draw':>7}{'turns':>7}", file=out)
+    for (map_name, p1, p2), games in sorted(groups.items()):
+        n = len(games)
+        p1_wins = sum(r["winner"] == "P1" for r in games)
+        p2_wins = sum(r["winner"] == "P2" for r in games)
+        low, high = wilson_interval(p1_wins, n)
+        turns = sum(r["turns"] for r in games) / n
+        print(f"{map_name:<20}{p1:>8}{p2:>8}{n:>7}{p1_wins / n:>9.1%}{f'[{low:.1%}, {high:.1%}]':>18}"
+              f"{p2_wins / n:>9.1%}{(n - p1_wins - p2_wins) / n:>7.1%}{turns:>7.1f}", file=out)
+
+    # 各角色在非镜像对局中的胜率（不分先后手）
+    for character in CHARACTERS:
+        played = [r for r in results if r["P1"] != r["P2"] and character in (r["P1"], r["P2"])]
+        wins = sum(r["winner"] is not None and r[r["winner"]] == character for r in played)
+        low, high = wilson_interval(wins, len(played))
+        rate = wins / len(played) if played else 0.0
+        print(f"{character}: {wins}/{len(played)} = {rate:.1%} [{low:.1%}, {high:.1%}]（非镜像对局）", file=out)
+
+    print(f"{len(results)} 局，用时 {elapsed:.1f} 秒，{len(results) / elapsed:.2f} 局/秒", file=out)
+    busy = {}
+    for r in results:
+        games, seconds = busy.get(r["worker"], (0, 0.0))
+        busy[r["worker"]] = (games + 1, seconds + r["seconds"])
+    for worker, (games, seconds) in sorted(busy.items()):
+        print(f"  进程 {worker}: {games} 局，下棋 {seconds:.1f} 秒，利用率 {seconds / elapsed:.0%}", file=out)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m voyage.tournament", description="AI 自我对弈锦标赛")
+    parser.add_argument("--games", type=int, default=10, help="每张地图、每种角色组合的对局数")
+    parser.add_argument("--maps", nargs="*", help="地图文件，缺省为 map/*.json")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="工作进程数")
+    parser.add_argument("--out", default="tournament.jsonl", help="逐局结果（JSON Lines）")
+    parser.add_argument("--ai", choices=("alphabeta", "mcts"), default="alphabeta")
+    parser.add_argument("--depth", type=int, default=SEARCH_DEPTH, help="alphabeta 的搜索深度")
+    parser.add_argument("--iterations", type=int, default=MCTS_ITERATIONS, help="mcts 每步的迭代次数")
+    parser.add_argument("--time-budget", type=float, default=None, help="改为按时间思考（秒/步）")
+    parser.add_argument("--max-turns", type=int, default=MAX_TURNS)
+    parser.add_argument("--opening-moves", type=int, default=OPENING_MOVES)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--skill-cost", type=int, default=SKILL_COST)
+    parser.add_argument("--p1-mana", type=int, default=None, help="P1 初始灵力（同时作为上限）")
+    parser.add_argument("--p2-mana", type=int, default=None, help="P2 初始灵力（同时作为上限）")
+    parser.add_argument("--marisa-attack", type=int, default=MARISA_ATTACK)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    jobs = build_jobs(args)
+    mana = {pid: DEFAULT_PLAYER_STATS[pid]["mana"] for pid in ("P1", "P2")}
+    mana.update(jobs[0]["mana"] if jobs else {})
+    print(f"{len(jobs)} 局，{args.workers} 个进程；技能价格 {args.skill_cost}，"
+          f"初始灵力 P1={mana['P1']} P2={mana['P2']}，魔理沙攻击力 {args.marisa_attack}")
+    results = []
+    start = time.perf_counter()
+    with open(args.out, "w", encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=args.workers, mp_context=default_context()) as pool:
+        futures = [pool.submit(play_game, job) for job in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            print(f"\r{len(results)}/{len(jobs)}", end="", file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+    summarize(results, time.perf_counter() - start)
+    return results
+
+
+if __name__ == "__main__":
+    main()
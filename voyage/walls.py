@@ -0,0 +1,123 @@
+"""
+墙体存储：按格子 O(1) 查询、建造与拆除，并保持墙体的插入顺序。
+
+墙体集合用 dict 的键保存（dict 保持插入顺序，成员判断、插入、删除均为 O(1)），
+生命值与总生命值保存在按 y * width + x 排列的稠密数组中，
+同样按该位序维护一个墙体位掩码（见 voyage.bitboard）。
+WallStore 兼容原先 map_layout["walls"] 列表的用法（in / 迭代 / len / remove），建造墙体改用 add，
+health 与 total 两个视图兼容原先 wall_health / wall_total 字典的用法。
+"""
+from collections.abc import Mapping
+
+
+class WallValues(Mapping):
+    """稠密数组上的字典视图：只包含当前存在的墙体，按插入顺序迭代"""
+
+    def __init__(self, store, values):
+        self._store = store
+        self._values = values
+
+    def __getitem__(self, cell):
+        if cell not in self._store:
+            raise KeyError(cell)
+        return self._values[self._store.index(cell)]
+
+    def __setitem__(self, cell, value):
+        if cell not in self._store:
+            raise KeyError(cell)
+        self._values[self._store.index(cell)] = value
+
+    def __iter__(self):
+        return iter(self._store)
+
+    def __len__(self):
+        return len(self._store)
+
+
+class WallStore:
+    """
+    地图上的墙体集合。
+
+    参数:
+      width, height: 地图尺寸，决定稠密数组大小
+      cells: 初始墙体格子
+      health: 初始墙体的生命值（同时作为总生命值）
+    """
+
+    def __init__(self, width, height, cells=(), health=5):
+        self.width = width
+        self.height = height
+        self._cells = {}
+        self._health = [0] * (width * height)
+        self._total = [0] * (width * height)
+        # 第 y * width + x 位为 1 表示该格有墙体
+        self.mask = 0
+        # 每次建造或拆除墙体时加一，供缓存判断墙体布局是否变化
+        self.version = 0
+        for cell in cells:
+            self.add(cell, health)
+        self.health = WallValues(self, self._health)
+        self.total = WallValues(self, self._total)
+
+    def index(self, cell):
+        """格子在稠密数组中的下标"""
+        return cell[1] * self.width + cell[0]
+
+    def __contains__(self, cell):
+        return cell in self._cells
+
+    def __iter__(self):
+        return iter(self._cells)
+
+    def __len__(self):
+        return len(self._cells)
+
+    def __repr__(self):
+        return f"WallStore({list(self._cells)})"
+
+    def add(self, cell, health):
+        """在 cell 建造生命值为 health 的墙体（总生命值同为 health）"""
+        cell = tuple(cell)
+        if not (0 <= cell[0] < self.width and 0 <= cell[1] < self.height):
+            raise ValueError(f"墙体超出地图范围: {cell}")
+        i = self.index(cell)
+        self._cells[cell] = None
+        self._health[i] = health
+        self._total[i] = health
+        self.mask |= 1 << i
+        self.version += 1
+
+    def remove(self, cell):
+        """拆除墙体；生命值与总生命值一并清零"""
+        del self._cells[cell]
+        i = self.index(cell)
+        self._health[i] = 0
+        self._total[i] = 0
+        self.mask &= ~(1 << i)
+        self.version += 1
+
+    def damage(self, cell, damage):
+        """扣除 cell 墙体的生命值，返回剩余生命值（不拆除墙体）"""
+        i = self.index(cell)
+        self._health[i] -= damage
+        return self._health[i]
+
+    def key(self):
+        """墙体布局与各墙体生命值组成的可哈希键（与插入顺序无关），供搜索的置换表使用"""
+        return (self.mask, tuple(self._health))
+
+    def copy(self):
+        clone = WallStore.__new__(WallStore)
+        clone.width = self.width
+        clone.height = self.height
+        clone._cells = dict(self._cells)
+        clone._health = self._health[:]
+        clone._total = self._total[:]
+        clone.mask = self.mask
+        clone.version = self.version
+        clone.health = WallValues(clone, clone._health)
+        clone.total = WallValues(clone, clone._total)
+        return clone
+
+    def __deepcopy__(self, memo):
+        return self.copy()
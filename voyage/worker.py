@@ -0,0 +1,108 @@
+"""
+后台 AI：在独立的工作进程中搜索，界面线程不被阻塞。
+
+submit 把规则核心的快照（GameEngine.copy()）交给工作进程，进程中常驻一个 AI（缺省为 AlphaBetaAI，
+其置换表与历史启发分在回合之间保留）。搜索是纯 Python 计算，放在线程中会与渲染争用 GIL，
+因此使用单进程的 ProcessPoolExecutor。
+
+每次提交都有递增的任务号；cancel() 把进程间共享的取消号推进到最新任务号，
+工作进程中的搜索在下一次检查时间时停止，结果不再回调。本模块不依赖 pygame，
+完成通知由调用方提供的 callback 在后台线程中发出（例如 pygame.event.post）。
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from voyage.ai import AI_TIME_BUDGET, AlphaBetaAI
+
+
+# 工作进程中的全局状态
+_worker_ai = None
+_cancelled = None
+
+
+def _init_worker(cancelled, factory, time_budget):
+    global _worker_ai, _cancelled
+    _cancelled = cancelled
+    _worker_ai = factory(time_budget=time_budget)
+
+
+def _search(snapshot, player, job):
+    """工作进程：为 player 搜索，任务号不大于取消号时提前停止"""
+    _worker_ai.should_stop = lambda: _cancelled.value >= job
+    return _worker_ai.choose(snapshot, player)
+
+
+def _shutdown_worker():
+    """工作进程：释放 AI 自己持有的资源（例如 MCTSAI 的进程池），否则工作进程无法退出"""
+    shutdown = getattr(_worker_ai, "shutdown", None)
+    if shutdown is not None:
+        shutdown()
+
+
+def default_context():
+    """POSIX 上用 fork（不重新导入主程序），其他平台用 spawn"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+
+
+class BackgroundAI:
+    """
+    在工作进程中运行的搜索 AI。
+
+    参数:
+      time_budget: 每次搜索的思考时间（秒）
+      context: multiprocessing 上下文，缺省见 default_context
+      factory: AI 类（或可序列化的工厂函数），以 factory(time_budget=...) 创建，
+               创建出的对象需提供 choose(engine, player) 与 should_stop 属性，可选的 shutdown() 在关闭时调用；
+               MCTSAI 应以 workers=1 创建（例如 functools.partial(MCTSAI, workers=1)），不在工作进程中再开进程池
+    """
+
+    def __init__(self, time_budget=AI_TIME_BUDGET, context=None, factory=AlphaBetaAI):
+        context = context or default_context()
+        self._cancelled = context.Value("q", 0)
+        self._executor = ProcessPoolExecutor(
+            max_workers=1, mp_context=context,
+            initializer=_init_worker, initargs=(self._cancelled, factory, time_budget))
+        self._job = 0
+        self._future = None
+
+    @property
+    def thinking(self):
+        """是否有尚未完成的搜索"""
+        return self._future is not None and not self._future.done()
+
+    def is_current(self, job):
+        """job 是最新的任务且未被取消"""
+        return job == self._job and self._cancelled.value < job
+
+    def submit(self, engine, player, callback):
+        """
+        在 engine 的快照上为 player 搜索，返回任务号。
+        完成且未被取消时在后台线程中调用 callback(job, action)；搜索出错时 action 为 None。
+        """
+        self._job += 1
+        job = self._job
+        future = self._executor.submit(_search, engine.copy(), player, job)
+        self._future = future
+
+        def done(f):
+            if f.cancelled() or not self.is_current(job):
+                return
+            action = None if f.exception() is not None else f.result()
+            callback(job, action)
+
+        future.add_done_callback(done)
+        return job
+
+    def cancel(self):
+        """取消进行中与排队中的搜索，它们的结果不再回调"""
+        self._cancelled.value = self._job
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+
+    def shutdown(self):
+        """取消搜索，并让工作进程在退出前关闭 AI"""
+        self.cancel()
+        self._executor.submit(_shutdown_worker)
+        self._executor.shutdown(wait=False)